@@ -1,271 +1,316 @@
-#!/usr/bin/env python3
-
-"""
-Copyright (c) 2022 - 2023, Chris Perkins
-Licence: BSD 3-Clause
-
-Dynamic auditing of certificates installed on phones. Running against the publisher finds all the phones in a cluster.
-First pulls list of SEP devices from AXL API, then uses this list to retrieve IP addresses of registered phones via the RIS API.
-Then connects via HTTPS to each IP address & outputs the certificate's issuer, subject & the expiry date.
-Application user requires Standard AXL API Access, Standard RealtimeAndTraceCollection & Standard Serviceability roles.
-
-v1.3 - implemented proper rate limiting of API requests
-v1.2 - switched to displaying the full certificate issuer & subject to provide more information
-v1.1 - added fallback from TLS v1.2 to v1.0 for older phones
-v1.0 - original release
-
-Portions of this code from cucm-compare-reg-status, (c) Paul Tursan 2018, https://github.com/ptursan/cucm-compare-reg-status/ & used under the MIT license
-Portions of this code from https://stackoverflow.com/questions/16903528/how-to-get-response-ssl-certificate-from-requests-in-python
-
-I have no idea how the OpenSSL stuff works, it's magic ;)
-"""
-
-import sys
-import requests
-import urllib3
-import socket
-import json
-import OpenSSL
-import time
-from zeep import Client
-from zeep.cache import SqliteCache
-from zeep.transports import Transport
-from zeep.exceptions import Fault
-from zeep.plugins import HistoryPlugin
-from requests import Session
-from requests.auth import HTTPBasicAuth
-from urllib3 import disable_warnings
-from urllib3.exceptions import InsecureRequestWarning
-from lxml import etree
-from OpenSSL.SSL import Connection, Context, SSLv23_METHOD, TLSv1_METHOD, TLSv1_2_METHOD
-from datetime import datetime
-from time import sleep
-from OpenSSL.crypto import X509
-from getpass import getpass
-
-TLS_METHODS = (TLSv1_2_METHOD, TLSv1_METHOD, SSLv23_METHOD)
-MAX_API_CALLS_A_MINUTE = 15
-
-
-def show_history(history):
-    """Output error messages from Zeep"""
-    for hist in [history.last_sent, history.last_received]:
-        print(etree.tostring(hist["envelope"], encoding="unicode", pretty_print=True))
-
-
-def main():
-    """Program entry point, reads config"""
-    if len(sys.argv) != 2:
-        print(f"Usage: {sys.argv[0]} <AXL config JSON>")
-        sys.exit(1)
-
-    # Load JSON configuration parameters
-    try:
-        with open(sys.argv[1]) as f:
-            axl_json_data = json.load(f)
-            for axl_json in axl_json_data:
-                try:
-                    if not axl_json["fqdn"]:
-                        print("Config Error: CUCM FQDN must be specified.")
-                        sys.exit(1)
-                except KeyError:
-                    print("Config Error: CUCM FQDN must be specified.")
-                    sys.exit(1)
-                try:
-                    if not axl_json["username"]:
-                        print("Config Error: AXL username must be specified.")
-                        sys.exit(1)
-                except KeyError:
-                    print("Config Error: AXL username must be specified.")
-                    sys.exit(1)
-                try:
-                    if not axl_json["wsdl_file"]:
-                        print("Config Error: WSDL file must be specified.")
-                        sys.exit(1)
-                except KeyError:
-                    print("Config Error: WSDL file must be specified.")
-                    sys.exit(1)
-    except FileNotFoundError:
-        print(f"Error: Unable to open JSON config file {sys.argv[1]}.")
-        sys.exit(1)
-    except json.decoder.JSONDecodeError:
-        print(f"Error: Unable to parse JSON config file {sys.argv[1]}.")
-        sys.exit(1)
-
-    username = axl_json["username"]
-    password = getpass("Password: ")
-    server = axl_json["fqdn"]
-    axl_wsdl = axl_json["wsdl_file"]
-
-    # Common Plugins
-    history = HistoryPlugin()
-
-    # Build Client object for AXL Service
-    axl_location = f"https://{server}:8443/axl/"
-    axl_binding = "{http://www.cisco.com/AXLAPIService/}AXLAPIBinding"
-
-    axl_session = Session()
-    axl_session.verify = False
-    axl_session.auth = HTTPBasicAuth(username, password)
-
-    axl_transport = Transport(cache=SqliteCache(), session=axl_session, timeout=20)
-    axl_client = Client(wsdl=axl_wsdl, transport=axl_transport, plugins=[history])
-    axl_service = axl_client.create_service(axl_binding, axl_location)
-
-    # Build Client object for RisPort70 Service
-    wsdl = f"https://{server}:8443/realtimeservice2/services/RISService70?wsdl"
-
-    session = Session()
-    session.verify = False
-    session.auth = HTTPBasicAuth(username, password)
-
-    transport = Transport(cache=SqliteCache(), session=session, timeout=20)
-    client = Client(wsdl=wsdl, transport=transport, plugins=[history])
-    service = client.create_service(
-        "{http://schemas.cisco.com/ast/soap}RisBinding",
-        f"https://{server}:8443/realtimeservice2/services/RISService70",
-    )
-
-    # Get list of Phones to query via AXL, required when using SelectCmDeviceExt
-    try:
-        resp = axl_service.listPhone(
-            searchCriteria={"name": "SEP%"}, returnedTags={"name": ""}
-        )
-    except Fault:
-        show_history(history)
-        raise
-
-    # Build item list for RisPort70 SelectCmDeviceExt
-    items = []
-    for phone in resp["return"].phone:
-        items.append(phone.name)
-    print(f"{len(items)} SEP devices found in configuration.\n")
-    # Run SelectCmDeviceExt on each Phone
-    cntr_success = 0
-    cntr_fail = 0
-    cntr_iterations = 0
-    timer = 0.0
-    for phone in items:
-        last_time = time.perf_counter()
-        cntr_iterations += 1
-        CmSelectionCriteria = {
-            "MaxReturnedDevices": "1",
-            "DeviceClass": "Phone",
-            "Model": "255",
-            "Status": "Registered",
-            "NodeName": "",
-            "SelectBy": "Name",
-            "SelectItems": {"item": phone},
-            "Protocol": "Any",
-            "DownloadStatus": "Any",
-        }
-
-        StateInfo = ""
-        try:
-            resp = service.selectCmDeviceExt(
-                CmSelectionCriteria=CmSelectionCriteria, StateInfo=StateInfo
-            )
-        except Fault:
-            show_history(history)
-            raise
-
-        CmNodes = resp.SelectCmDeviceResult.CmNodes.item
-        for CmNode in CmNodes:
-            if len(CmNode.CmDevices.item) > 0:
-                # If the node has returned CmDevices
-                for item in CmNode.CmDevices.item:
-                    # Older phones don't support TLS 1.2
-                    for method in TLS_METHODS:
-                        try:
-                            try:
-                                ssl_connection_setting = Context(method)
-                            except ValueError:
-                                continue
-                            ssl_connection_setting.set_timeout(1)
-                            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                                s.connect((item["IPAddress"]["item"][0]["IP"], 443))
-                                c = Connection(ssl_connection_setting, s)
-                                c.set_tlsext_host_name(
-                                    str.encode(item["IPAddress"]["item"][0]["IP"])
-                                )
-                                c.set_connect_state()
-                                c.do_handshake()
-                                cert = c.get_peer_certificate()
-                                # Convert issuer & subject into dictionaries, parse expiry date + time
-                                issuer_list = cert.get_issuer().get_components()
-                                cert_issuer = {}
-                                for thing in issuer_list:
-                                    cert_issuer.update(
-                                        {
-                                            thing[0]
-                                            .decode("utf-8"): thing[1]
-                                            .decode("utf-8")
-                                        }
-                                    )
-                                subject_list = cert.get_subject().get_components()
-                                cert_subject = {}
-                                for thing in subject_list:
-                                    cert_subject.update(
-                                        {
-                                            thing[0]
-                                            .decode("utf-8"): thing[1]
-                                            .decode("utf-8")
-                                        }
-                                    )
-                                end_date = datetime.strptime(
-                                    str(cert.get_notAfter().decode("utf-8")),
-                                    "%Y%m%d%H%M%SZ",
-                                )
-                                diff = end_date - datetime.now()
-                                # if cert.has_expired() or diff.days <= 7:
-                                #    print(f"FIX ME! {item['Name']}, {item['IPAddress']['item'][0]['IP']}, issuer {cert_issuer}, subject {cert_subject}, expires {str(end_date)}.")
-                                print(
-                                    f"{item['Name']}, {item['IPAddress']['item'][0]['IP']}, issuer {cert_issuer}, subject {cert_subject}, expires {str(end_date)}."
-                                )
-                                c.shutdown()
-                                s.close()
-                                cntr_success += 1
-                                break
-                        except (
-                            TimeoutError,
-                            ConnectionRefusedError,
-                            socket.timeout,
-                            urllib3.exceptions.ConnectTimeoutError,
-                            urllib3.exceptions.MaxRetryError,
-                            requests.exceptions.ConnectTimeout,
-                        ):
-                            print(
-                                f"{item['Name']}, {item['IPAddress']['item'][0]['IP']}, unable to connect."
-                            )
-                            cntr_fail += 1
-                            break
-                        except OpenSSL.SSL.Error:
-                            continue
-                    else:
-                        print(
-                            f"{item['Name']}, {item['IPAddress']['item'][0]['IP']}, unable to connect."
-                        )
-                        cntr_fail += 1
-
-        # Rate limiting to MAX_API_CALLS_A_MINUTE in 60s
-        timer += time.perf_counter() - last_time
-        if cntr_iterations >= MAX_API_CALLS_A_MINUTE and timer < 60:
-            wait_time = 61.0 - timer
-            # print(f"{cntr_iterations} iterations in {timer}s, waiting {wait_time}s")
-            time.sleep(wait_time)
-            cntr_iterations = 0
-            timer = 0.0
-        elif timer > 60:
-            timer.sleep(1.0)
-            cntr_iterations = 0
-            timer = 0.0
-
-    # Summarise
-    print(
-        f"\nOut of {cntr_success + cntr_fail} registered devices - {cntr_success} certificate confirmed, {cntr_fail} unable to connect via HTTPS."
-    )
-
-
-if __name__ == "__main__":
-    disable_warnings(InsecureRequestWarning)
-    main()
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2022 - 2023, Chris Perkins
+Licence: BSD 3-Clause
+
+Dynamic auditing of certificates installed on phones. Running against the publisher finds all the phones in a cluster.
+First pulls list of SEP devices from AXL API, then uses this list to retrieve IP addresses of registered phones via the RIS API.
+Then connects via HTTPS to each IP address & outputs the certificate's issuer, subject & the expiry date.
+Application user requires Standard AXL API Access, Standard RealtimeAndTraceCollection & Standard Serviceability roles.
+
+v1.10 - RIS responses requested compressed
+v1.9 - Zeep, requests & OpenSSL only imported once a cluster is audited, for fast startup
+v1.8 - AXL & RIS calls retried on transient errors, a RIS query that still fails is reported & skipped
+v1.7 - phones looked up via RIS in chunks, with the chunks queried concurrently
+v1.6 - SOAP errors show the recent calls traced & the faulting request & response
+v1.5 - added phase timing & SOAP latency metrics, written to the metrics_file in the AXL JSON
+v1.4 - audits every cluster in the AXL config JSON concurrently, each with its own rate budget
+v1.3 - implemented proper rate limiting of API requests
+v1.2 - switched to displaying the full certificate issuer & subject to provide more information
+v1.1 - added fallback from TLS v1.2 to v1.0 for older phones
+v1.0 - original release
+
+Portions of this code from cucm-compare-reg-status, (c) Paul Tursan 2018, https://github.com/ptursan/cucm-compare-reg-status/ & used under the MIT license
+Portions of this code from https://stackoverflow.com/questions/16903528/how-to-get-response-ssl-certificate-from-requests-in-python
+
+I have no idea how the OpenSSL stuff works, it's magic ;)
+"""
+
+import sys
+import socket
+import json
+import threading
+from datetime import datetime
+from functools import partial
+from time import perf_counter, sleep
+from getpass import getpass
+from axl_common import (
+    AXLConfigError,
+    error_message,
+    TRACE_SAMPLE_RATE,
+    RateLimiter,
+    fan_out,
+    metrics,
+    read_axl_json,
+    run_concurrently,
+    write_metrics,
+)
+
+MAX_API_CALLS_A_MINUTE = 15
+# Maximum number of devices RisPort70 returns from a single SelectCmDeviceExt query
+RIS_ITEMS_PER_QUERY = 1000
+print_lock = threading.Lock()
+
+
+def show_trace(trace):
+    """Output recent SOAP calls & the faulting request & response from Zeep"""
+    output(trace.report())
+
+
+def output(message):
+    """Print a line of results, clusters are audited concurrently"""
+    with print_lock:
+        print(message)
+
+
+def audit_cluster(axl_json, password, prefix):
+    """Audit phone certificates on one cluster, returns count of successes & failures"""
+    # Zeep, requests & OpenSSL are only imported once a cluster is audited, so usage errors are reported at once
+    import requests
+    import urllib3
+    import OpenSSL
+    from zeep import Client
+    from zeep.cache import SqliteCache
+    from zeep.exceptions import Fault, TransportError
+    from OpenSSL.SSL import (
+        Connection,
+        Context,
+        SSLv23_METHOD,
+        TLSv1_METHOD,
+        TLSv1_2_METHOD,
+    )
+    from axl_client import (
+        AXLConnection,
+        InstrumentedTransport,
+        TracePlugin,
+        soap_session,
+    )
+
+    tls_methods = (TLSv1_2_METHOD, TLSv1_METHOD, SSLv23_METHOD)
+    username = axl_json["username"]
+    server = axl_json["fqdn"]
+
+    # Build Client object for AXL Service
+    axl = AXLConnection(axl_json, password, timeout=20)
+
+    # Build Client object for RisPort70 Service
+    wsdl = f"https://{server}:8443/realtimeservice2/services/RISService70?wsdl"
+
+    session = soap_session(username, password)
+
+    trace = TracePlugin(
+        sample_rate=axl_json.get("trace_sample_rate", TRACE_SAMPLE_RATE)
+    )
+    transport = InstrumentedTransport(
+        server, cache=SqliteCache(), session=session, timeout=20
+    )
+    with metrics.phase("wsdl_load"):
+        client = Client(wsdl=wsdl, transport=transport, plugins=[trace])
+    service = client.create_service(
+        "{http://schemas.cisco.com/ast/soap}RisBinding",
+        f"https://{server}:8443/realtimeservice2/services/RISService70",
+    )
+    # Each cluster has its own rate budget
+    rate_limiter = RateLimiter(
+        axl_json.get("max_api_calls_a_minute", MAX_API_CALLS_A_MINUTE)
+    )
+
+    # Get list of Phones to query via AXL, required when using SelectCmDeviceExt
+    try:
+        resp = axl.retry(
+            partial(
+                axl.service.listPhone,
+                searchCriteria={"name": "SEP%"},
+                returnedTags={"name": ""},
+            )
+        )
+    except Fault:
+        show_trace(axl.trace)
+        raise
+
+    # Build item list for RisPort70 SelectCmDeviceExt
+    items = []
+    for phone in resp["return"].phone:
+        items.append(phone.name)
+    output(f"{prefix}{len(items)} SEP devices found in configuration.\n")
+
+    def select_cm_devices(phones):
+        """Run SelectCmDeviceExt on a chunk of Phones, returns None if it fails so the other chunks are still
+        audited"""
+        CmSelectionCriteria = {
+            "MaxReturnedDevices": str(len(phones)),
+            "DeviceClass": "Phone",
+            "Model": "255",
+            "Status": "Registered",
+            "NodeName": "",
+            "SelectBy": "Name",
+            "SelectItems": {"item": [{"Item": phone} for phone in phones]},
+            "Protocol": "Any",
+            "DownloadStatus": "Any",
+        }
+
+        StateInfo = ""
+
+        def select():
+            # Rate limiting to MAX_API_CALLS_A_MINUTE in 60s
+            rate_limiter.wait()
+            return service.selectCmDeviceExt(
+                CmSelectionCriteria=CmSelectionCriteria, StateInfo=StateInfo
+            )
+
+        # RIS runs on the same publisher, so shares the AXL connection's retry budget & circuit breaker
+        try:
+            return axl.retry(select)
+        except (Fault, TransportError, requests.exceptions.RequestException) as e:
+            if isinstance(e, Fault):
+                show_trace(trace)
+            output(
+                f"{prefix}RIS query of {len(phones)} phones failed: {error_message(e)}"
+            )
+            return None
+
+    # Run SelectCmDeviceExt on the Phones in chunks, the chunks are independent so run concurrently
+    responses = run_concurrently(
+        [
+            partial(
+                select_cm_devices,
+                items[chunk_start : chunk_start + RIS_ITEMS_PER_QUERY],
+            )
+            for chunk_start in range(0, len(items), RIS_ITEMS_PER_QUERY)
+        ],
+        axl.max_in_flight,
+    )
+    cntr_success = 0
+    cntr_fail = 0
+    for resp in responses:
+        if resp is None:
+            continue
+        CmNodes = resp.SelectCmDeviceResult.CmNodes.item
+        certificate_start = perf_counter()
+        for CmNode in CmNodes:
+            if len(CmNode.CmDevices.item) > 0:
+                # If the node has returned CmDevices
+                for item in CmNode.CmDevices.item:
+                    # Older phones don't support TLS 1.2
+                    for method in tls_methods:
+                        try:
+                            try:
+                                ssl_connection_setting = Context(method)
+                            except ValueError:
+                                continue
+                            ssl_connection_setting.set_timeout(1)
+                            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+                                s.connect((item["IPAddress"]["item"][0]["IP"], 443))
+                                c = Connection(ssl_connection_setting, s)
+                                c.set_tlsext_host_name(
+                                    str.encode(item["IPAddress"]["item"][0]["IP"])
+                                )
+                                c.set_connect_state()
+                                c.do_handshake()
+                                cert = c.get_peer_certificate()
+                                # Convert issuer & subject into dictionaries, parse expiry date + time
+                                issuer_list = cert.get_issuer().get_components()
+                                cert_issuer = {}
+                                for thing in issuer_list:
+                                    cert_issuer.update(
+                                        {
+                                            thing[0]
+                                            .decode("utf-8"): thing[1]
+                                            .decode("utf-8")
+                                        }
+                                    )
+                                subject_list = cert.get_subject().get_components()
+                                cert_subject = {}
+                                for thing in subject_list:
+                                    cert_subject.update(
+                                        {
+                                            thing[0]
+                                            .decode("utf-8"): thing[1]
+                                            .decode("utf-8")
+                                        }
+                                    )
+                                end_date = datetime.strptime(
+                                    str(cert.get_notAfter().decode("utf-8")),
+                                    "%Y%m%d%H%M%SZ",
+                                )
+                                diff = end_date - datetime.now()
+                                # if cert.has_expired() or diff.days <= 7:
+                                #    print(f"FIX ME! {item['Name']}, {item['IPAddress']['item'][0]['IP']}, issuer {cert_issuer}, subject {cert_subject}, expires {str(end_date)}.")
+                                output(
+                                    f"{prefix}{item['Name']}, {item['IPAddress']['item'][0]['IP']}, issuer {cert_issuer}, subject {cert_subject}, expires {str(end_date)}."
+                                )
+                                c.shutdown()
+                                s.close()
+                                cntr_success += 1
+                                break
+                        except (
+                            TimeoutError,
+                            ConnectionRefusedError,
+                            socket.timeout,
+                            urllib3.exceptions.ConnectTimeoutError,
+                            urllib3.exceptions.MaxRetryError,
+                            requests.exceptions.ConnectTimeout,
+                        ):
+                            output(
+                                f"{prefix}{item['Name']}, {item['IPAddress']['item'][0]['IP']}, unable to connect."
+                            )
+                            cntr_fail += 1
+                            break
+                        except OpenSSL.SSL.Error:
+                            continue
+                    else:
+                        output(
+                            f"{prefix}{item['Name']}, {item['IPAddress']['item'][0]['IP']}, unable to connect."
+                        )
+                        cntr_fail += 1
+        metrics.add_phase("certificate_fetch", perf_counter() - certificate_start)
+
+    return cntr_success, cntr_fail
+
+
+def main():
+    """Program entry point, reads config"""
+    if len(sys.argv) != 2:
+        print(f"Usage: {sys.argv[0]} <AXL config JSON>")
+        sys.exit(1)
+
+    # Load JSON configuration parameters
+    try:
+        clusters = read_axl_json(sys.argv[1])
+    except FileNotFoundError:
+        print(f"Error: Unable to open JSON config file {sys.argv[1]}.")
+        sys.exit(1)
+    except json.decoder.JSONDecodeError:
+        print(f"Error: Unable to parse JSON config file {sys.argv[1]}.")
+        sys.exit(1)
+    except AXLConfigError as e:
+        print(f"Config Error: {e}")
+        sys.exit(1)
+
+    password = getpass("Password: ")
+
+    # Audit every cluster concurrently, output tagged by cluster if more than one
+    def audit(axl_json):
+        prefix = f"{axl_json['fqdn']}, " if len(clusters) > 1 else ""
+        return audit_cluster(axl_json, password, prefix)
+
+    cntr_success = 0
+    cntr_fail = 0
+    for cluster, result, error in fan_out(clusters, audit):
+        if error:
+            print(f"{cluster}, error: {error}")
+            continue
+        cntr_success += result[0]
+        cntr_fail += result[1]
+
+    # Summarise
+    print(
+        f"\nOut of {cntr_success + cntr_fail} registered devices - {cntr_success} certificate confirmed, {cntr_fail} unable to connect via HTTPS."
+    )
+    if not write_metrics(clusters):
+        print("Error: Unable to write metrics file.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,570 @@
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2026, Chris Perkins
+Licence: BSD 3-Clause
+
+AXL connection & Zeep plumbing shared by the tools, split from axl_common so Zeep, requests & lxml are only
+imported once a tool connects to a cluster. Each AXLConnection has its own rate budget, retry budget, circuit
+breaker & adaptive page size, with every SOAP call instrumented in the metrics & traced in a ring buffer.
+Certificate verification is off as CUCM is usually self-signed, so the insecure request warning is disabled.
+Loading the AXL WSDL & schema takes seconds, so the loaded WSDL is pickled to a cache on disk shared by every
+tool & process, keyed by the AXL version, a hash of the WSDL & schema files & the Zeep version. As unpickling
+can run code, the cache is only used if it's owned by the user & not writable by anyone else, & failures to
+load or write it are logged as warnings.
+Responses are requested compressed, bulk queries over a WAN being bound by bandwidth, & the bytes received
+are counted as sent on the wire.
+
+v1.2 - added shared session asking for compressed responses, bytes received counted before decompression
+v1.1 - added on-disk cache of the loaded AXL WSDL
+v1.0 - initial release, split from axl_common v1.7
+
+Original AXL SQL query code courtesy of Jonathan Els - https://afterthenumber.com/2018/04/27/serializing-thin-axl-sql-query-responses-with-python-zeep/
+"""
+
+import gc, hashlib, logging, os, pickle, random, re, stat, threading, time
+import zeep
+import requests
+from collections import OrderedDict, deque
+from functools import partial
+from zeep import Client, Settings
+from zeep.cache import SqliteCache
+from zeep.transports import Transport
+from zeep.plugins import Plugin
+from zeep.exceptions import Fault, TransportError
+from zeep.helpers import serialize_object
+from zeep.wsdl import Document
+from requests import Session
+from requests.adapters import HTTPAdapter
+from requests.auth import HTTPBasicAuth
+from urllib3 import disable_warnings
+from urllib3.exceptions import InsecureRequestWarning
+from lxml import etree
+from axl_common import (
+    ACCEPT_ENCODING,
+    AXL_BINDING_NAME,
+    AXL_VERSION_PATTERN,
+    RETRY_ATTEMPTS,
+    RETRY_BACKOFF,
+    RETRY_MAX_BACKOFF,
+    ROWS_TOO_LARGE_PATTERN,
+    SCHEMA_LOCATION_PATTERN,
+    SOAP_FAULT_PATH,
+    THROTTLE_BACKOFF,
+    TRACE_BUFFER_SIZE,
+    TRACE_SAMPLE_RATE,
+    WSDL_CACHE_DIR,
+    CircuitBreaker,
+    PageSize,
+    RateLimiter,
+    RetryBudget,
+    TraceRecord,
+    is_throttle_fault,
+    max_in_flight,
+    metrics,
+    run_concurrently,
+)
+
+disable_warnings(InsecureRequestWarning)
+logger = logging.getLogger(__name__)
+# Flags creating a new cache file, binary as Windows otherwise opens files in text mode
+CACHE_FILE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+# Modules of the classes Zeep creates for each schema type, which pickle can't import so are recreated
+ZEEP_DYNAMIC_MODULES = ("zeep.xsd.dynamic_types", "zeep.objects")
+
+
+class TracePlugin(Plugin):
+    """Zeep plugin keeping compact records of recent SOAP calls in a ring buffer. Unlike HistoryPlugin the
+    envelopes are only serialised & kept for faults & sampled calls, so tracing every call costs little
+    """
+
+    def __init__(self, size=TRACE_BUFFER_SIZE, sample_rate=TRACE_SAMPLE_RATE):
+        """Constructor initialises attributes"""
+        self.records = deque(maxlen=size)
+        self.sample_rate = int(sample_rate or 0)
+        self.calls = 0
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def egress(self, envelope, http_headers, operation, binding_options):
+        """Note start of a call, the request envelope is only referenced until it's known if it's kept"""
+        self.local.started = time.time()
+        self.local.start = time.perf_counter()
+        self.local.envelope = envelope
+        return envelope, http_headers
+
+    def ingress(self, envelope, http_headers, operation):
+        """Record a call, capturing both envelopes if it's a fault or sampled"""
+        seconds = time.perf_counter() - getattr(
+            self.local, "start", time.perf_counter()
+        )
+        fault = envelope.find(SOAP_FAULT_PATH)
+        fault_code = None
+        if fault is not None:
+            fault_code = fault.findtext("faultcode") or "Fault"
+        with self.lock:
+            self.calls += 1
+            is_sampled = self.sample_rate > 0 and self.calls % self.sample_rate == 0
+        envelopes = None
+        if fault_code is not None or is_sampled:
+            sent = getattr(self.local, "envelope", None)
+            envelopes = (
+                (
+                    etree.tostring(sent, encoding="unicode", pretty_print=True)
+                    if sent is not None
+                    else ""
+                ),
+                etree.tostring(envelope, encoding="unicode", pretty_print=True),
+            )
+        self.local.envelope = None
+        content_length = http_headers.get("Content-Length", "")
+        self.records.append(
+            TraceRecord(
+                operation.name if operation is not None else "",
+                getattr(self.local, "started", time.time()),
+                seconds,
+                int(content_length) if content_length.isdigit() else None,
+                fault_code,
+                envelopes,
+            )
+        )
+        return envelope, http_headers
+
+    def report(self, num_calls=10):
+        """Return text summary of the most recent calls, plus the envelopes of the most recent fault or
+        sampled call"""
+        records = list(self.records)
+        lines = [f"Last {min(num_calls, len(records))} SOAP calls:"]
+        for record in records[-num_calls:]:
+            size = (
+                ""
+                if record.bytes_received is None
+                else f", {record.bytes_received} bytes"
+            )
+            fault = "" if record.fault_code is None else f", fault {record.fault_code}"
+            lines.append(
+                f"{time.strftime('%H:%M:%S', time.localtime(record.started))} {record.operation}, "
+                f"{record.seconds:.3f}s{size}{fault}"
+            )
+        for record in reversed(records):
+            if record.envelopes is not None:
+                lines.append(f"{record.operation} request & response:")
+                lines.extend(record.envelopes)
+                break
+        return "\n".join(lines)
+
+
+class InstrumentedTransport(Transport):
+    """Zeep transport recording the round-trip time & size of every SOAP call in metrics, & per thread
+    for the caller to read back"""
+
+    def __init__(self, cluster, *args, **kwargs):
+        """Constructor initialises attributes"""
+        super().__init__(*args, **kwargs)
+        self.cluster = cluster
+        self.local = threading.local()
+
+    def post(self, address, message, headers):
+        """Send SOAP request & record the time taken & bytes transferred"""
+        start = time.perf_counter()
+        response = super().post(address, message, headers)
+        seconds = time.perf_counter() - start
+        # Page size is adapted to the response size once decompressed, metrics record the bytes on the wire
+        self.local.seconds = getattr(self.local, "seconds", 0.0) + seconds
+        self.local.bytes_received = getattr(self.local, "bytes_received", 0) + len(
+            response.content
+        )
+        metrics.record_call(self.cluster, seconds, len(message), wire_bytes(response))
+        return response
+
+    def round_trip(self):
+        """Return & clear the time this thread has spent waiting on SOAP responses & the bytes received"""
+        seconds = getattr(self.local, "seconds", 0.0)
+        bytes_received = getattr(self.local, "bytes_received", 0)
+        self.local.seconds = 0.0
+        self.local.bytes_received = 0
+        return seconds, bytes_received
+
+
+def soap_session(username, password, pool_maxsize=10):
+    """Return requests session for a cluster's SOAP services, asking for compressed responses"""
+    session = Session()
+    # Connection pool large enough for every request in flight to reuse a connection
+    session.mount("https://", HTTPAdapter(pool_maxsize=max(10, pool_maxsize)))
+    session.verify = False
+    session.auth = HTTPBasicAuth(username, password)
+    session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+    return session
+
+
+def wire_bytes(response):
+    """Return size of a response body as received, before decompression. urllib3 only counts the bytes read
+    of responses with a Content-Length, so chunked responses are counted decompressed"""
+    try:
+        received = response.raw.tell()
+    except AttributeError:
+        received = 0
+    return received or len(response.content)
+
+
+class WSDLPickler(pickle.Pickler):
+    """Pickler of a loaded Zeep WSDL Document. The transport & settings are left out to be supplied when it's
+    loaded, lxml elements are pickled as XML, QNames as their text so each is only created once when loaded
+    & the classes Zeep creates for each schema type are recreated"""
+
+    def __init__(self, file):
+        """Constructor uses the fastest pickle protocol"""
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def persistent_id(self, obj):
+        """Return ID of an object to be supplied by WSDLUnpickler, or None to pickle it"""
+        if isinstance(obj, Transport):
+            return "transport"
+        if isinstance(obj, Settings):
+            return "settings"
+        if isinstance(obj, etree.QName):
+            return obj.text
+        return None
+
+    def reducer_override(self, obj):
+        """Return how to recreate objects pickle can't handle itself"""
+        if isinstance(obj, etree._Element):
+            return etree.fromstring, (etree.tostring(obj, with_tail=False),)
+        if isinstance(obj, type) and obj.__module__ in ZEEP_DYNAMIC_MODULES:
+            attributes = {
+                name: value
+                for name, value in vars(obj).items()
+                if name in ("__module__", "_xsd_name", "_xsd_type")
+            }
+            return type, (obj.__name__, obj.__bases__, attributes)
+        return NotImplemented
+
+
+class WSDLUnpickler(pickle.Unpickler):
+    """Unpickler of a Zeep WSDL Document pickled by WSDLPickler, with the transport & settings to use"""
+
+    def __init__(self, file, transport, settings):
+        """Constructor initialises attributes"""
+        super().__init__(file)
+        self.transport = transport
+        self.settings = settings
+        self.qnames = {}
+
+    def persistent_load(self, pid):
+        """Return object left out by WSDLPickler"""
+        if pid == "transport":
+            return self.transport
+        if pid == "settings":
+            return self.settings
+        qname = self.qnames.get(pid)
+        if qname is None:
+            qname = self.qnames[pid] = etree.QName(pid)
+        return qname
+
+
+class AXLConnection:
+    """AXL service for a single cluster, each with its own rate budget"""
+
+    def __init__(self, axl_json, password, timeout=60):
+        """Constructor builds the Zeep client, raises FileNotFoundError if the WSDL file is missing"""
+        self.cluster = axl_json["fqdn"]
+        self.rate_limiter = RateLimiter(axl_json.get("max_api_calls_a_minute", 0))
+        self.max_in_flight = max_in_flight(axl_json)
+        self.page_size = PageSize()
+        self.retry_budget = RetryBudget()
+        self.breaker = CircuitBreaker()
+        self.session = soap_session(
+            axl_json["username"], password, pool_maxsize=self.max_in_flight
+        )
+        self.transport = InstrumentedTransport(
+            self.cluster, cache=SqliteCache(), session=self.session, timeout=timeout
+        )
+        self.trace = TracePlugin(
+            sample_rate=axl_json.get("trace_sample_rate", TRACE_SAMPLE_RATE)
+        )
+        settings = Settings()
+        with metrics.phase("wsdl_load"):
+            client = Client(
+                wsdl=load_wsdl(
+                    axl_json["wsdl_file"],
+                    self.transport,
+                    settings,
+                    axl_json.get("wsdl_cache_dir", WSDL_CACHE_DIR),
+                ),
+                transport=self.transport,
+                plugins=[self.trace],
+                settings=settings,
+            )
+        self.service = client.create_service(
+            AXL_BINDING_NAME, f"https://{axl_json['fqdn']}:8443/axl/"
+        )
+
+    def sql_query(self, sql_statement):
+        """Execute SQL query via AXL and return results. If it matches more rows than AXL returns in one
+        response, it's re-run in pages with SKIP & FIRST, so the statement must ORDER BY columns ending in a
+        unique key such as a pkid. Informix doesn't keep the order of ties between queries, so rows could be
+        repeated or missed where pages meet. Transient errors are retried, with pages cut back after throttle
+        faults
+        """
+        rows = []
+        page_rows = None
+
+        def query_page():
+            if page_rows is None:
+                return self.sql_query_page(sql_statement)
+            return self.sql_query_page(
+                re.sub(
+                    r"^\s*SELECT\s",
+                    f"SELECT SKIP {len(rows)} FIRST {page_rows} ",
+                    sql_statement,
+                    count=1,
+                    flags=re.IGNORECASE,
+                )
+            )
+
+        def before_retry(error):
+            nonlocal page_rows
+            if page_rows is not None and is_throttle_fault(error):
+                page_rows = self.page_size.throttled()
+
+        while True:
+            try:
+                page, seconds, bytes_received = self.retry(query_page, before_retry)
+            except Fault as e:
+                match = ROWS_TOO_LARGE_PATTERN.search(e.message or "")
+                if match and page_rows != self.page_size.min_rows:
+                    page_rows = self.page_size.too_large(int(match.group(2)), page_rows)
+                    continue
+                raise
+            if page_rows is None:
+                return page
+            rows.extend(page)
+            if len(page) < page_rows:
+                return rows
+            page_rows = self.page_size.adapt(seconds, bytes_received)
+
+    def sql_query_page(self, sql_statement):
+        """Execute a single SQL query via AXL, returns its rows plus the round-trip time & bytes received"""
+        self.rate_limiter.wait()
+        start = time.perf_counter()
+        self.transport.round_trip()
+        axl_resp = self.service.executeSQLQuery(sql=sql_statement)
+        try:
+            rows = element_list_to_ordered_dict(
+                serialize_object(axl_resp)["return"]["rows"]
+            )
+        except KeyError:
+            # Single tuple response
+            rows = element_list_to_ordered_dict(
+                serialize_object(axl_resp)["return"]["row"]
+            )
+        except TypeError:
+            # No SQL tuples
+            rows = []
+        seconds, bytes_received = self.record_xml_time(start, len(rows))
+        return rows, seconds, bytes_received
+
+    def sql_update(self, sql_statement):
+        """Execute SQL update via AXL and return rows updated, transient errors are retried as setting a
+        column by pkid can safely be repeated"""
+
+        def update():
+            self.rate_limiter.wait()
+            start = time.perf_counter()
+            self.transport.round_trip()
+            axl_resp = self.service.executeSQLUpdate(sql=sql_statement)
+            rows_updated = serialize_object(axl_resp)["return"]["rowsUpdated"]
+            self.record_xml_time(start, 0)
+            return rows_updated
+
+        return self.retry(update)
+
+    def retry(self, call, before_retry=None):
+        """Make a call to the cluster, retrying transient errors within its retry budget & circuit breaker"""
+        return call_with_retry(call, self.retry_budget, self.breaker, before_retry)
+
+    def record_xml_time(self, start, rows):
+        """Record time since start of a call not spent waiting on the SOAP response, building the request
+        & deserialising the response, plus rows returned. Returns the round-trip time & bytes received
+        """
+        seconds = time.perf_counter() - start
+        round_trip_seconds, bytes_received = self.transport.round_trip()
+        metrics.add_phase("xml", seconds - round_trip_seconds)
+        metrics.record_rows(self.cluster, rows, seconds)
+        return round_trip_seconds, bytes_received
+
+    def sql_query_all(self, sql_statements):
+        """Execute independent SQL queries concurrently, returns list of results in the order of
+        sql_statements"""
+        return run_concurrently(
+            [
+                partial(self.sql_query, sql_statement)
+                for sql_statement in sql_statements
+            ],
+            self.max_in_flight,
+        )
+
+
+def wsdl_cache_filename(wsdl_file):
+    """Return name of the cache file of a local WSDL file, from the AXL version & a hash of the WSDL & the
+    local schema files it imports, plus the Zeep version as the cache depends on its internals. Raises
+    FileNotFoundError if the WSDL file is missing"""
+    digest = hashlib.sha256()
+    axl_version = "unknown"
+    pending = [os.path.abspath(wsdl_file)]
+    seen = set()
+    while pending:
+        filename = pending.pop()
+        if filename in seen:
+            continue
+        seen.add(filename)
+        with open(filename, "rb") as f:
+            data = f.read()
+        digest.update(data)
+        match = AXL_VERSION_PATTERN.search(data)
+        if match and axl_version == "unknown":
+            axl_version = match.group(1).decode("ascii")
+        for location in SCHEMA_LOCATION_PATTERN.findall(data):
+            schema_file = os.path.join(
+                os.path.dirname(filename), location.decode("utf-8")
+            )
+            if os.path.isfile(schema_file):
+                pending.append(os.path.abspath(schema_file))
+    return f"axl_{axl_version}_{digest.hexdigest()[:32]}_zeep_{zeep.__version__}.pickle"
+
+
+def is_private(stat_result):
+    """Check a file or directory is owned by the user & not writable by the group or others, so no one else
+    can have planted a cache file to be unpickled. Always true on Windows, which has no POSIX owner
+    """
+    if not hasattr(os, "getuid"):
+        return True
+    return stat_result.st_uid == os.getuid() and not stat_result.st_mode & (
+        stat.S_IWGRP | stat.S_IWOTH
+    )
+
+
+def load_wsdl(wsdl_file, transport, settings, cache_dir=WSDL_CACHE_DIR):
+    """Return Zeep Document of a WSDL file, from the cache if a process has loaded it before, otherwise
+    loaded & added to the cache. Each cache file is written to a temporary file & renamed into place, so tools
+    run in parallel never read a partly written one. The cache isn't used if the directory or file isn't
+    private to the user. Raises FileNotFoundError if the WSDL file is missing
+    """
+    if not cache_dir or "://" in wsdl_file:
+        return Document(wsdl_file, transport, settings=settings)
+    cache_file = os.path.join(cache_dir, wsdl_cache_filename(wsdl_file))
+    try:
+        # Only the user can read the cache, as unpickling a file can run code
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        if not is_private(os.stat(cache_dir)):
+            logger.warning(
+                "WSDL cache %s not used, it must be owned by the user & not writable by others",
+                cache_dir,
+            )
+            return Document(wsdl_file, transport, settings=settings)
+    except OSError as e:
+        logger.warning("WSDL cache %s not used: %s", cache_dir, e)
+        return Document(wsdl_file, transport, settings=settings)
+
+    # Unpickling creates a lot of objects, so garbage collection is paused rather than run repeatedly
+    is_gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with open(cache_file, "rb") as f:
+            if is_private(os.fstat(f.fileno())):
+                return WSDLUnpickler(f, transport, settings).load()
+            logger.warning(
+                "WSDL cache file %s not loaded, it must be owned by the user & not writable by others",
+                cache_file,
+            )
+    except FileNotFoundError:
+        pass
+    except (
+        OSError,
+        EOFError,
+        pickle.UnpicklingError,
+        AttributeError,
+        ImportError,
+        IndexError,
+        KeyError,
+        TypeError,
+        ValueError,
+        RecursionError,
+    ):
+        # Unreadable or corrupt, replaced below
+        logger.warning("Unable to load WSDL cache file %s", cache_file, exc_info=True)
+    finally:
+        if is_gc_enabled:
+            gc.enable()
+
+    document = Document(wsdl_file, transport, settings=settings)
+    temp_filename = f"{cache_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with os.fdopen(os.open(temp_filename, CACHE_FILE_FLAGS, 0o600), "wb") as f:
+            WSDLPickler(f).dump(document)
+        os.replace(temp_filename, cache_file)
+    except (OSError, pickle.PicklingError, AttributeError, TypeError, RecursionError):
+        # The cache is only an optimisation, so the loaded WSDL is still used
+        logger.warning("Unable to write WSDL cache file %s", cache_file, exc_info=True)
+        try:
+            os.remove(temp_filename)
+        except OSError:
+            pass
+    return document
+
+
+def element_list_to_ordered_dict(elements):
+    """Convert list to OrderedDict"""
+    return [
+        OrderedDict((element.tag, element.text) for element in row) for row in elements
+    ]
+
+
+def is_transient_error(error):
+    """Check if an error raised by a SOAP call may succeed if retried, throttle faults, HTTP errors from an
+    overloaded server & connection failures or timeouts"""
+    if isinstance(error, Fault):
+        return is_throttle_fault(error)
+    if isinstance(error, TransportError):
+        return error.status_code == 429 or error.status_code >= 500
+    return isinstance(
+        error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+    )
+
+
+def call_with_retry(
+    call, retry_budget, breaker, before_retry=None, attempts=RETRY_ATTEMPTS
+):
+    """Make a call, retrying transient errors with exponential backoff & jitter so concurrent callers don't
+    retry in step. Gives up after attempts or when the retry budget is spent, re-raising the last error.
+    before_retry(error) is called before each retry"""
+    for attempt in range(attempts):
+        breaker.wait()
+        try:
+            result = call()
+        except (
+            Fault,
+            TransportError,
+            requests.exceptions.ConnectionError,
+            requests.exceptions.Timeout,
+        ) as e:
+            if not is_transient_error(e):
+                raise
+            breaker.failure(e)
+            is_throttled = isinstance(e, Fault)
+            if attempt == attempts - 1 or not (is_throttled or retry_budget.spend()):
+                raise
+            backoff = min(
+                RETRY_MAX_BACKOFF,
+                (THROTTLE_BACKOFF if is_throttled else RETRY_BACKOFF) * 2**attempt,
+            )
+            # Equal jitter, at least half the backoff
+            delay = backoff / 2 + random.uniform(0, backoff / 2)
+            time.sleep(delay)
+            metrics.add_phase("retry_wait", delay)
+            if before_retry is not None:
+                before_retry(e)
+            continue
+        breaker.success()
+        retry_budget.earn()
+        return result
@@ -0,0 +1,880 @@
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2026, Chris Perkins
+Licence: BSD 3-Clause
+
+Shared AXL plumbing for the tools: AXL JSON config loading & validation, per-cluster rate & retry budgets,
+thin AXL SQL helpers & concurrent fan-out of an audit across every configured cluster.
+Bulk updates record each applied row in a journal so a restarted job resumes where it stopped.
+The line appearance checks are shared by the GUI tools & the headless line_appearance_audit, which then
+doesn't need tkinter.
+Records wall time of each phase of a run, per-cluster SOAP call latency, bytes transferred & rows returned,
+written as JSON or a Prometheus textfile to the metrics_file in the AXL JSON. Recent SOAP calls are traced
+in a ring buffer, with full envelopes kept only for faults & sampled calls. Independent calls can be run
+concurrently via asyncio, with a limit on the requests in flight to each cluster. A query matching more rows
+than AXL returns in one response is re-run in pages, with the page size adapted to the cluster's response
+times & sizes. Transient errors are retried with jittered exponential backoff within a per-cluster retry
+budget, & a circuit breaker pauses calls to a cluster that keeps failing or throttling.
+AXLConnection & the Zeep plugin & transport are in axl_client, so importing this module is cheap & tools only
+load Zeep, requests & lxml when they connect to a cluster
+
+v1.10 - added compressed response encodings
+v1.9 - added WSDL cache settings
+v1.8 - moved AXLConnection & the Zeep plugin & transport to axl_client, for fast startup
+v1.7 - added retry with backoff & a circuit breaker for transient errors & throttling
+v1.6 - added paging of queries too large for one response, with adaptive page size
+v1.5 - added concurrent independent calls with a per-cluster limit on requests in flight
+v1.4 - replaced HistoryPlugin with ring buffer SOAP call tracing
+v1.3 - added phase timing & SOAP latency metrics
+v1.2 - added pre-flight diff of bulk updates
+v1.1 - added update journal & bulk read of current values by pkid
+v1.0 - initial release
+"""
+
+import csv, json, os, re, sys, threading, time
+from bisect import bisect_left
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+AXL_BINDING_NAME = "{http://www.cisco.com/AXLAPIService/}AXLAPIBinding"
+# Keys every AXL JSON entry must have & the error to report when missing
+REQUIRED_AXL_KEYS = OrderedDict(
+    [
+        ("fqdn", "FQDN must be specified."),
+        ("username", "Username must be specified."),
+        ("wsdl_file", "WSDL file must be specified."),
+    ]
+)
+
+# Maximum number of concurrent requests to a cluster, overridden by max_in_flight in the AXL JSON
+MAX_IN_FLIGHT = 4
+# Maximum number of pkids in the IN list of a single AXL SQL query
+PKIDS_PER_QUERY = 100
+# Initial, minimum & maximum rows a page of a query too large for one response, the page size is adapted
+# between the limits to keep each page's round-trip time & response size within the targets
+PAGE_ROWS = 1000
+MIN_PAGE_ROWS = 50
+MAX_PAGE_ROWS = 50000
+PAGE_TARGET_SECONDS = 5.0
+PAGE_TARGET_BYTES = 4 * 1024 * 1024
+# Attempts at a call failing with a transient error, the backoff before each retry doubles from
+# RETRY_BACKOFF, or THROTTLE_BACKOFF after a throttle fault, up to RETRY_MAX_BACKOFF seconds & is jittered
+RETRY_ATTEMPTS = 5
+RETRY_BACKOFF = 1.0
+THROTTLE_BACKOFF = 5.0
+RETRY_MAX_BACKOFF = 60.0
+# Retries a cluster starts with & the retries earned back by each successful call, so a cluster failing most
+# calls soon stops being retried. Throttle faults don't spend the budget, the backoff is the remedy
+RETRY_BUDGET = 20
+RETRY_BUDGET_REFILL = 0.1
+# Consecutive failed attempts that open a cluster's circuit breaker, pausing every call to it, & the pause in
+# seconds, doubling each time it reopens without a call succeeding. After opening BREAKER_MAX_OPENS times in a
+# row the cluster is treated as down & calls to it fail immediately
+BREAKER_FAILURES = 5
+BREAKER_PAUSE = 30.0
+BREAKER_MAX_OPENS = 4
+# AXL fault when a query matches more rows than fit in one response
+ROWS_TOO_LARGE_PATTERN = re.compile(
+    r"Query request too large\. Total rows matched: (\d+) rows\. "
+    r"Suggestive Row Fetch: less than (\d+) rows"
+)
+# Compressed encodings asked for in SOAP responses, bulk XML responses shrink several-fold & urllib3
+# decompresses them as they're read
+ACCEPT_ENCODING = "gzip, deflate"
+# Directory of the cache of loaded AXL WSDLs shared by every tool, overridden by wsdl_cache_dir in the AXL JSON,
+# an empty string disables it
+WSDL_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "cucm_tools")
+# AXL schema version in the namespace of the WSDL & schema files, plus the schema files they import
+AXL_VERSION_PATTERN = re.compile(rb"http://www\.cisco\.com/AXL/API/([0-9.]+)")
+SCHEMA_LOCATION_PATTERN = re.compile(rb'\b(?:schemaLocation|location)="([^"]+)"')
+# Number of recent SOAP calls kept by TracePlugin & one in how many calls has its full envelopes captured,
+# 0 captures them only for faults. Sample rate is overridden by trace_sample_rate in the AXL JSON
+TRACE_BUFFER_SIZE = 200
+TRACE_SAMPLE_RATE = 0
+SOAP_FAULT_PATH = (
+    "{http://schemas.xmlsoap.org/soap/envelope/}Body/"
+    "{http://schemas.xmlsoap.org/soap/envelope/}Fault"
+)
+# Upper bounds in seconds of the SOAP call latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Result of running an audit against one cluster, error is None or a message string
+ClusterResult = namedtuple("ClusterResult", ["cluster", "result", "error"])
+# Outcome of update_by_pkid: count of updates made & writes avoided, rows that failed & (cluster, error) pairs
+UpdateResult = namedtuple(
+    "UpdateResult", ["updates", "skipped", "failed_rows", "errors"]
+)
+# Compact record of a SOAP call traced by TracePlugin, bytes_received is None if the response had no
+# Content-Length, fault_code is None unless it faulted & envelopes is None unless captured
+TraceRecord = namedtuple(
+    "TraceRecord",
+    ["operation", "started", "seconds", "bytes_received", "fault_code", "envelopes"],
+)
+
+
+class AXLConfigError(ValueError):
+    """AXL JSON entry is missing a required parameter"""
+
+
+class Metrics:
+    """Wall time of each phase of a run, plus per-cluster SOAP call latency histogram, bytes transferred &
+    rows returned. Time in phases running concurrently for several clusters is summed"""
+
+    def __init__(self):
+        """Constructor initialises attributes"""
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Clear metrics at the start of a run"""
+        with self.lock:
+            self.started = time.time()
+            self.phases = OrderedDict()
+            self.clusters = OrderedDict()
+
+    def cluster_metrics(self, cluster):
+        """Return metrics of a cluster, lock must be held"""
+        if cluster not in self.clusters:
+            self.clusters[cluster] = {
+                "calls": 0,
+                "latency_buckets": [0] * (len(LATENCY_BUCKETS) + 1),
+                "latency_seconds": 0.0,
+                "bytes_sent": 0,
+                "bytes_received": 0,
+                "rows": 0,
+                "query_seconds": 0.0,
+            }
+        return self.clusters[cluster]
+
+    def add_phase(self, name, seconds):
+        """Add time to a phase"""
+        with self.lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name):
+        """Context manager timing the code within it as a phase"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - start)
+
+    def record_call(self, cluster, seconds, bytes_sent, bytes_received):
+        """Record a SOAP call's round-trip time & size"""
+        with self.lock:
+            cluster_metrics = self.cluster_metrics(cluster)
+            cluster_metrics["calls"] += 1
+            cluster_metrics["latency_buckets"][
+                bisect_left(LATENCY_BUCKETS, seconds)
+            ] += 1
+            cluster_metrics["latency_seconds"] += seconds
+            cluster_metrics["bytes_sent"] += bytes_sent
+            cluster_metrics["bytes_received"] += bytes_received
+            self.phases["soap"] = self.phases.get("soap", 0.0) + seconds
+
+    def record_rows(self, cluster, rows, seconds):
+        """Record rows returned by a query & the time taken including deserialising them"""
+        with self.lock:
+            cluster_metrics = self.cluster_metrics(cluster)
+            cluster_metrics["rows"] += rows
+            cluster_metrics["query_seconds"] += seconds
+
+    def as_dict(self):
+        """Return metrics as a dictionary, latency histogram buckets are cumulative as in Prometheus"""
+        with self.lock:
+            clusters = OrderedDict()
+            for cluster, cluster_metrics in self.clusters.items():
+                buckets = OrderedDict()
+                count = 0
+                for bound, bucket_count in zip(
+                    LATENCY_BUCKETS + ("+Inf",), cluster_metrics["latency_buckets"]
+                ):
+                    count += bucket_count
+                    buckets[str(bound)] = count
+                query_seconds = cluster_metrics["query_seconds"]
+                clusters[cluster] = {
+                    "calls": cluster_metrics["calls"],
+                    "latency_buckets": buckets,
+                    "latency_seconds": round(cluster_metrics["latency_seconds"], 6),
+                    "bytes_sent": cluster_metrics["bytes_sent"],
+                    "bytes_received": cluster_metrics["bytes_received"],
+                    "rows": cluster_metrics["rows"],
+                    "rows_per_second": (
+                        round(cluster_metrics["rows"] / query_seconds, 1)
+                        if query_seconds
+                        else 0.0
+                    ),
+                }
+            return {
+                "tool": os.path.splitext(os.path.basename(sys.argv[0]))[0],
+                "started": self.started,
+                "duration_seconds": round(time.time() - self.started, 6),
+                "phases": {
+                    name: round(seconds, 6) for name, seconds in self.phases.items()
+                },
+                "clusters": clusters,
+            }
+
+    def prometheus_text(self):
+        """Return metrics in Prometheus text exposition format, for the node exporter textfile collector"""
+        metrics_data = self.as_dict()
+        tool = metrics_data["tool"].replace("\\", "\\\\").replace('"', '\\"')
+        lines = [
+            "# HELP cucm_tool_duration_seconds Wall time of the run.",
+            "# TYPE cucm_tool_duration_seconds gauge",
+            f'cucm_tool_duration_seconds{{tool="{tool}"}} {metrics_data["duration_seconds"]}',
+            "# HELP cucm_tool_phase_seconds Time spent in each phase of the run.",
+            "# TYPE cucm_tool_phase_seconds gauge",
+        ]
+        for name, seconds in metrics_data["phases"].items():
+            lines.append(
+                f'cucm_tool_phase_seconds{{tool="{tool}",phase="{name}"}} {seconds}'
+            )
+        lines.extend(
+            [
+                "# HELP cucm_soap_latency_seconds SOAP call round-trip time.",
+                "# TYPE cucm_soap_latency_seconds histogram",
+            ]
+        )
+        for cluster, cluster_metrics in metrics_data["clusters"].items():
+            labels = f'tool="{tool}",cluster="{cluster}"'
+            for bound, count in cluster_metrics["latency_buckets"].items():
+                lines.append(
+                    f'cucm_soap_latency_seconds_bucket{{{labels},le="{bound}"}} {count}'
+                )
+            lines.append(
+                f"cucm_soap_latency_seconds_sum{{{labels}}} {cluster_metrics['latency_seconds']}"
+            )
+            lines.append(
+                f"cucm_soap_latency_seconds_count{{{labels}}} {cluster_metrics['calls']}"
+            )
+        # Metric name, type, description & key in the cluster's metrics
+        for name, metric_type, description, key in (
+            ("cucm_soap_bytes_sent_total", "counter", "SOAP bytes sent.", "bytes_sent"),
+            (
+                "cucm_soap_bytes_received_total",
+                "counter",
+                "SOAP bytes received.",
+                "bytes_received",
+            ),
+            ("cucm_sql_rows_total", "counter", "AXL SQL rows returned.", "rows"),
+            (
+                "cucm_sql_rows_per_second",
+                "gauge",
+                "AXL SQL rows returned a second.",
+                "rows_per_second",
+            ),
+        ):
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for cluster, cluster_metrics in metrics_data["clusters"].items():
+                lines.append(
+                    f'{name}{{tool="{tool}",cluster="{cluster}"}} {cluster_metrics[key]}'
+                )
+        return "\n".join(lines) + "\n"
+
+    def write(self, filename):
+        """Write metrics to file, Prometheus textfile format if it ends in .prom otherwise JSON. Written to
+        a temporary file that's then renamed, so a collector never reads a partial file. Raises OSError
+        """
+        temp_filename = f"{filename}.{os.getpid()}.tmp"
+        with open(temp_filename, "w", encoding="utf-8") as f:
+            if filename.endswith(".prom"):
+                f.write(self.prometheus_text())
+            else:
+                json.dump(self.as_dict(), f, indent=2)
+        os.replace(temp_filename, filename)
+
+
+# Metrics of the current run, shared by every connection
+metrics = Metrics()
+
+
+class RateLimiter:
+    """Sliding window limit of API calls a minute, 0 means unlimited"""
+
+    def __init__(self, max_calls_a_minute=0):
+        """Constructor initialises attributes"""
+        self.max_calls_a_minute = int(max_calls_a_minute or 0)
+        self.call_times = deque()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        """Block until another call fits within the rate budget"""
+        if self.max_calls_a_minute <= 0:
+            return
+        with self.lock:
+            now = time.monotonic()
+            while self.call_times and now - self.call_times[0] >= 60.0:
+                self.call_times.popleft()
+            if len(self.call_times) >= self.max_calls_a_minute:
+                delay = 60.0 - (now - self.call_times[0])
+                time.sleep(delay)
+                metrics.add_phase("rate_limit_wait", delay)
+                self.call_times.popleft()
+            self.call_times.append(time.monotonic())
+
+
+class RetryBudget:
+    """Retries available to calls to a cluster, spent by each retry & earned back by successful calls"""
+
+    def __init__(self, retries=RETRY_BUDGET, refill=RETRY_BUDGET_REFILL):
+        """Constructor initialises attributes"""
+        self.max_retries = retries
+        self.retries = float(retries)
+        self.refill = refill
+        self.lock = threading.Lock()
+
+    def spend(self):
+        """Spend a retry, returns False if the budget is exhausted"""
+        with self.lock:
+            if self.retries < 1.0:
+                return False
+            self.retries -= 1.0
+            return True
+
+    def earn(self):
+        """Earn back part of a retry after a successful call"""
+        with self.lock:
+            self.retries = min(self.max_retries, self.retries + self.refill)
+
+
+class CircuitBreaker:
+    """Pauses every call to a cluster after consecutive failed attempts, so an overloaded publisher isn't
+    kept busy by retries. Calls resume after the pause & the first to fail reopens it for twice as long, until
+    it's opened max_opens times in a row & the error that last opened it is raised by every call
+    """
+
+    def __init__(
+        self,
+        failures=BREAKER_FAILURES,
+        pause=BREAKER_PAUSE,
+        max_opens=BREAKER_MAX_OPENS,
+    ):
+        """Constructor initialises attributes"""
+        self.max_failures = failures
+        self.min_pause = pause
+        self.max_opens = max_opens
+        self.failures = 0
+        self.pause = pause
+        self.opens = 0
+        self.open_until = 0.0
+        self.is_open = False
+        self.error = None
+        self.lock = threading.Lock()
+
+    def wait(self):
+        """Block while the breaker is open, raises the error that opened it if the cluster is down"""
+        with self.lock:
+            if self.opens >= self.max_opens:
+                raise self.error
+            delay = self.open_until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+            metrics.add_phase("breaker_wait", delay)
+
+    def success(self):
+        """Close the breaker after a successful call"""
+        with self.lock:
+            self.failures = 0
+            self.pause = self.min_pause
+            self.opens = 0
+            self.is_open = False
+
+    def failure(self, error):
+        """Count an attempt failing with error, opening the breaker if there have been too many in a row"""
+        with self.lock:
+            self.failures += 1
+            now = time.monotonic()
+            if self.failures >= self.max_failures or (
+                self.is_open and now >= self.open_until
+            ):
+                # Too many failures, or a call after the pause failed
+                self.open_until = now + self.pause
+                self.is_open = True
+                self.error = error
+                self.opens += 1
+                self.pause *= 2
+                self.failures = 0
+
+
+class PageSize:
+    """Rows a page of a query too large for one response, grown while pages come back well within the
+    round-trip time & response size targets & cut back when AXL rejects a page as too large or throttles.
+    Shared by every query on a connection, so later queries start from the size the cluster handled
+    """
+
+    def __init__(self, rows=PAGE_ROWS, min_rows=MIN_PAGE_ROWS, max_rows=MAX_PAGE_ROWS):
+        """Constructor initialises attributes"""
+        self.rows = rows
+        self.min_rows = min_rows
+        self.max_rows = max_rows
+        # Largest page size known to be accepted, pages are never grown past a rejected size
+        self.limit = max_rows
+        self.lock = threading.Lock()
+
+    def adapt(self, seconds, bytes_received):
+        """Adapt page size to a page's round-trip time & response size, returns the new size"""
+        with self.lock:
+            load = max(
+                seconds / PAGE_TARGET_SECONDS, bytes_received / PAGE_TARGET_BYTES
+            )
+            if load > 1.0:
+                # Over target, shrink in proportion
+                self.rows = max(self.min_rows, int(self.rows / load))
+            elif load < 0.5:
+                # Well under target, double up to the largest size known to be accepted
+                self.rows = min(self.limit, self.rows * 2)
+            return self.rows
+
+    def too_large(self, suggested_rows, rejected_rows=None):
+        """Cut page size below the row count AXL suggests after rejecting a query or a page of
+        rejected_rows, returns the new size"""
+        with self.lock:
+            if rejected_rows is not None:
+                suggested_rows = min(suggested_rows, rejected_rows)
+            self.limit = max(self.min_rows, min(self.limit, suggested_rows - 1))
+            self.rows = min(self.rows, self.limit)
+            return self.rows
+
+    def throttled(self):
+        """Halve page size after a throttle fault, returns the new size"""
+        with self.lock:
+            self.rows = max(self.min_rows, self.rows // 2)
+            return self.rows
+
+
+class UpdateJournal:
+    """Append-only CSV file of the cluster, pkid & value of each update confirmed by AXL, so a bulk update
+    that's interrupted can be restarted without repeating them"""
+
+    def __init__(self, filename):
+        """Constructor loads updates recorded by a previous run of the same job"""
+        self.filename = filename
+        self.lock = threading.Lock()
+        self.applied = set()
+        try:
+            with open(filename, newline="", encoding="utf-8") as f:
+                for row in csv.reader(f):
+                    if len(row) == 3:
+                        self.applied.add(tuple(row))
+        except FileNotFoundError:
+            pass
+
+    def is_applied(self, cluster, pkid, value):
+        """Check update of pkid to value has already been confirmed"""
+        return (cluster, pkid, value) in self.applied
+
+    def record(self, cluster, pkid, value):
+        """Record a confirmed update, written through to disk before returning"""
+        with self.lock, metrics.phase("journal"):
+            with open(self.filename, "a", newline="", encoding="utf-8") as f:
+                csv.writer(f).writerow([cluster, pkid, value])
+                f.flush()
+                os.fsync(f.fileno())
+            self.applied.add((cluster, pkid, value))
+
+    def remove(self):
+        """Delete journal once the job has completed"""
+        try:
+            os.remove(self.filename)
+        except FileNotFoundError:
+            pass
+
+
+def read_by_pkid(axl, table, column, pkids):
+    """Return dictionary of pkid to current value of column for rows of table, read in chunks of
+    PKIDS_PER_QUERY pkids. pkids that aren't found are left out of the dictionary"""
+    values = {}
+    pkids = list(dict.fromkeys(pkids))
+    for chunk_start in range(0, len(pkids), PKIDS_PER_QUERY):
+        pkid_list = ",".join(
+            "'{}'".format(pkid.replace("'", "''"))
+            for pkid in pkids[chunk_start : chunk_start + PKIDS_PER_QUERY]
+        )
+        sql_statement = f"SELECT pkid, {column} FROM {table} WHERE pkid IN ({pkid_list}) ORDER BY pkid"
+        for row in axl.sql_query(sql_statement):
+            try:
+                values[row["pkid"]] = row[column] if row[column] else ""
+            except TypeError:
+                continue
+    return values
+
+
+def diff_updates(cluster, rows, current_values, journal, pkid_index, value_index):
+    """Pre-flight diff of update rows against the current values read by read_by_pkid, returns lists of
+    rows that change a value, rows already at the desired value & rows whose pkid wasn't found.
+    The current values are trusted over the journal, as a journalled update may since have been reverted.
+    current_values is None if they couldn't be read, then rows in the journal are taken as already applied
+    """
+    changed_rows = []
+    unchanged_rows = []
+    missing_rows = []
+    for row in rows:
+        pkid = row[pkid_index]
+        value = row[value_index]
+        if current_values is None:
+            if journal.is_applied(cluster, pkid, value):
+                unchanged_rows.append(row)
+            else:
+                changed_rows.append(row)
+        elif pkid not in current_values:
+            missing_rows.append(row)
+        elif current_values[pkid] == value:
+            unchanged_rows.append(row)
+        else:
+            changed_rows.append(row)
+    return changed_rows, unchanged_rows, missing_rows
+
+
+def update_by_pkid(
+    clusters,
+    password,
+    cluster_rows,
+    column,
+    journal_filename,
+    table="devicenumplanmap",
+    pkid_index=6,
+    value_index=5,
+):
+    """Update column of table by pkid to the values in update rows grouped by cluster, every cluster is
+    updated concurrently. A pre-flight diff against the current values means only rows that change the
+    config are written, rows whose pkid isn't found are failures. Updates are journalled, the journal is
+    kept after an error so running the same job again resumes it. Returns UpdateResult
+    """
+    # Zeep & requests are only imported once there are updates to make, for fast startup
+    import requests
+    from zeep.exceptions import Fault, TransportError
+    from axl_client import AXLConnection
+
+    journal = UpdateJournal(journal_filename)
+    connections = {}
+    failed_rows = []
+    errors = []
+
+    def preflight(axl_json):
+        """Diff rows for one cluster against the current config, returns lists of changed, unchanged &
+        missing rows"""
+        cluster = axl_json["fqdn"]
+        axl = AXLConnection(axl_json, password)
+        connections[cluster] = axl
+        try:
+            current_values = read_by_pkid(
+                axl, table, column, [row[pkid_index] for row in cluster_rows[cluster]]
+            )
+        except (Fault, TransportError, requests.exceptions.RequestException):
+            # Without the current values, fall back to skipping the updates in the journal
+            current_values = None
+        return diff_updates(
+            cluster,
+            cluster_rows[cluster],
+            current_values,
+            journal,
+            pkid_index,
+            value_index,
+        )
+
+    changed_rows = {}
+    skipped = 0
+    for cluster, result, error in fan_out(clusters, preflight):
+        if error:
+            errors.append((cluster, error))
+            continue
+        changed_rows[cluster], unchanged_rows, missing_rows = result
+        skipped += len(unchanged_rows)
+        failed_rows.extend(missing_rows)
+
+    def update(axl_json):
+        """Make updates for one cluster, returns count of updates, failed rows & the last error"""
+        cluster = axl_json["fqdn"]
+        axl = connections[cluster]
+        updates = 0
+        cluster_failed_rows = []
+        error = None
+        for row in changed_rows[cluster]:
+            pkid = row[pkid_index]
+            value = row[value_index]
+            sql_statement = f"UPDATE {table} SET {column}='{value}' WHERE pkid='{pkid}'"
+            try:
+                num_results = axl.sql_update(sql_statement)
+            except (Fault, TransportError, requests.exceptions.RequestException) as e:
+                # Rows are still attempted, a cluster that's down fails them at once via its breaker
+                cluster_failed_rows.append(row)
+                error = error_message(e)
+                continue
+            if num_results < 1:
+                cluster_failed_rows.append(row)
+            else:
+                journal.record(cluster, pkid, value)
+                updates += 1
+        return updates, cluster_failed_rows, error
+
+    updates = 0
+    update_clusters = [
+        axl_json for axl_json in clusters if changed_rows.get(axl_json["fqdn"])
+    ]
+    if update_clusters:
+        for cluster, result, error in fan_out(update_clusters, update):
+            if result:
+                cluster_updates, cluster_failed_rows, error = result
+                updates += cluster_updates
+                failed_rows.extend(cluster_failed_rows)
+            if error:
+                errors.append((cluster, error))
+    if not errors:
+        journal.remove()
+    return UpdateResult(updates, skipped, failed_rows, errors)
+
+
+def check_mask(row, json_data):
+    """Return the approved External Phone Number Mask for a primary DN row in one of the dialplan.json
+    ranges whose mask doesn't match it, otherwise None"""
+    try:
+        # Handle None results
+        dnmap_e164mask = row["e164mask"] if row["e164mask"] else ""
+        p_name = row["pname"] if row["pname"] else ""
+        n_dnorpattern = row["dnorpattern"] if row["dnorpattern"] else ""
+    except TypeError:
+        return None
+    for range_data in json_data:
+        try:
+            range_start = int(range_data["range_start"])
+            range_end = int(range_data["range_end"])
+            dn = int(n_dnorpattern)
+            if (
+                p_name.upper() == range_data["partition"].upper()
+                and dn >= range_start
+                and dn <= range_end
+            ):
+                if dnmap_e164mask.upper() == range_data["mask"].upper():
+                    return None
+                else:
+                    return range_data["mask"]
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def check_label(row):
+    """Return Line Text Label in the standard of Initial Last Name-Extension for a line row whose label
+    doesn't include the DN, otherwise None"""
+    try:
+        # Handle None results
+        dnmap_label = row["label"] if row["label"] else ""
+        dnmap_display = row["display"] if row["display"] else ""
+        n_alertingname = row["alertingname"] if row["alertingname"] else ""
+        n_dnorpattern = row["dnorpattern"] if row["dnorpattern"] else ""
+    except TypeError:
+        return None
+    if n_dnorpattern in dnmap_label:
+        return None
+    # First choice to generate Initial & Last Name is display name, then alerting name
+    new_label = ""
+    name_words = ""
+    if dnmap_display:
+        name_words = dnmap_display.split()
+    elif n_alertingname:
+        name_words = n_alertingname.split()
+    if len(name_words) > 1:
+        new_label = f"{name_words[0][0]} {name_words[-1]}-{n_dnorpattern}"
+    elif len(name_words) == 1:
+        new_label = f"{name_words[0]}-{n_dnorpattern}"
+    return new_label.replace("'", "")
+
+
+def read_recording_config(axl, axl_json):
+    """Return list of phones & device profiles associated with the application user & list of pkids of
+    the recording profiles to match, both queries are independent so run concurrently"""
+    # Grab list of phones & device profiles associated with the application user, plus list of recording
+    # profile names & pkids
+    app_user_rows, rp_rows = axl.sql_query_all(
+        [
+            f"SELECT device.name FROM applicationuserdevicemap INNER JOIN device ON applicationuserdevicemap.fkdevice=device.pkid "
+            f"INNER JOIN applicationuser ON applicationuser.pkid=applicationuserdevicemap.fkapplicationuser WHERE applicationuser.name LIKE "
+            f"'{axl_json['application_user']}' ORDER BY applicationuserdevicemap.pkid",
+            "SELECT rp.pkid, rp.name FROM recordingprofile rp ORDER BY rp.pkid",
+        ]
+    )
+    app_user_devices = []
+    for row in app_user_rows:
+        try:
+            app_user_devices.append(row["name"])
+        except TypeError:
+            continue
+
+    # Store pkids of recording profiles to match
+    rp_pkids = []
+    for row in rp_rows:
+        try:
+            if row["name"].upper() in axl_json["recording_profiles"]:
+                rp_pkids.append(row["pkid"])
+        except TypeError:
+            continue
+    return app_user_devices, rp_pkids
+
+
+def check_recording(row, app_user_devices, rp_pkids):
+    """Check recording configuration of a phone or device profile line row, returns result row describing
+    the missing config or None if there's none"""
+    try:
+        # Handle None results
+        d_name = row["name"] if row["name"] else ""
+        d_description = row["description"] if row["description"] else ""
+        n_dnorpattern = row["dnorpattern"] if row["dnorpattern"] else ""
+        n_description = row["ndescription"] if row["ndescription"] else ""
+        d_tkclass = row["tkclass"] if row["tkclass"] else ""
+        d_tkstatus_builtinbridge = (
+            row["tkstatus_builtinbridge"] if row["tkstatus_builtinbridge"] else ""
+        )
+        dpd_tkstatus_callinfoprivate = (
+            row["tkstatus_callinfoprivate"] if row["tkstatus_callinfoprivate"] else ""
+        )
+        dnmap_fkrecordingprofile = (
+            row["fkrecordingprofile"] if row["fkrecordingprofile"] else ""
+        )
+        dnmap_tkpreferredmediasource = (
+            row["tkpreferredmediasource"] if row["tkpreferredmediasource"] else ""
+        )
+        rd_tkrecordingflag = row["tkrecordingflag"] if row["tkrecordingflag"] else ""
+    except TypeError:
+        return None
+
+    comments = ""
+    # Check phone or device profile is associated to application user
+    if d_name in app_user_devices:
+        user_associated = True
+    else:
+        user_associated = False
+    # Check for missing recording configuration, phones (tkclass=1) + device profiles
+    # (tkclass=254), device profiles have no built-in bridge
+    if d_tkclass not in ["1", "254"]:
+        return None
+    if d_tkclass == "1" and d_tkstatus_builtinbridge != "1":
+        comments += "built-in bridge incorrect, "
+    if dpd_tkstatus_callinfoprivate != "0":
+        comments += "privacy incorrect, "
+    if dnmap_fkrecordingprofile not in rp_pkids or dnmap_fkrecordingprofile == "":
+        comments += "recording profile incorrect, "
+    if dnmap_tkpreferredmediasource != "2":
+        comments += "media source not phone, "
+    if rd_tkrecordingflag != "1":
+        comments += "call recording not automatic, "
+    if not user_associated:
+        comments += "no application user association, "
+    # Describe the missing config
+    if not comments:
+        return None
+    return [
+        d_name,
+        d_description,
+        n_dnorpattern,
+        n_description,
+        user_associated,
+        comments.strip(", "),
+    ]
+
+
+def read_axl_json(filename, required_keys=None):
+    """Read AXL JSON file & validate every cluster entry, returns list of cluster dictionaries.
+    Raises FileNotFoundError, json.decoder.JSONDecodeError or AXLConfigError"""
+    required = OrderedDict(REQUIRED_AXL_KEYS)
+    if required_keys:
+        required.update(required_keys)
+    with open(filename) as f:
+        axl_json_data = json.load(f)
+    if not isinstance(axl_json_data, list) or len(axl_json_data) == 0:
+        raise AXLConfigError(REQUIRED_AXL_KEYS["fqdn"])
+    for axl_json in axl_json_data:
+        for key, message in required.items():
+            try:
+                if not axl_json[key]:
+                    raise AXLConfigError(message)
+            except (KeyError, TypeError):
+                raise AXLConfigError(message)
+    return axl_json_data
+
+
+def error_message(error):
+    """Return displayable message for an exception raised by an AXL call"""
+    from zeep.exceptions import Fault
+
+    if isinstance(error, Fault):
+        return error.message
+    return str(error)
+
+
+def is_throttle_fault(error):
+    """Check if a fault is AXL throttling requests"""
+    return "throttled" in (error.message or "")
+
+
+def max_in_flight(axl_json):
+    """Return maximum number of concurrent requests to a cluster from its AXL JSON entry"""
+    try:
+        return max(1, int(axl_json.get("max_in_flight", MAX_IN_FLIGHT)))
+    except (TypeError, ValueError):
+        return MAX_IN_FLIGHT
+
+
+async def gather_limited(calls, limit):
+    """Run blocking calls in threads with at most limit in flight at once, returns their results in order.
+    The first exception raised by a call is re-raised"""
+    import asyncio
+
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(call):
+        async with semaphore:
+            return await asyncio.to_thread(call)
+
+    return await asyncio.gather(*(run(call) for call in calls))
+
+
+def run_concurrently(calls, limit=MAX_IN_FLIGHT):
+    """Run independent blocking calls, e.g. SOAP requests, so they overlap & the total time approaches that
+    of the slowest, with at most limit in flight at once. Returns list of results in the order of calls
+    """
+    if len(calls) <= 1 or limit <= 1:
+        return [call() for call in calls]
+    import asyncio
+
+    return asyncio.run(gather_limited(calls, limit))
+
+
+def write_metrics(clusters):
+    """Write metrics to the metrics_file of the first cluster in the AXL JSON that has one, returns False if
+    it couldn't be written"""
+    for axl_json in clusters:
+        if axl_json.get("metrics_file"):
+            try:
+                metrics.write(axl_json["metrics_file"])
+            except OSError:
+                return False
+            break
+    return True
+
+
+def fan_out(clusters, audit, max_workers=None):
+    """Run audit(axl_json) against every cluster concurrently, so the total time is that of the slowest
+    cluster rather than the sum of them all. Returns list of ClusterResult in the order of clusters
+    """
+    import requests
+    from zeep.exceptions import Fault, TransportError
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max_workers or len(clusters)) as executor:
+        futures = [executor.submit(audit, axl_json) for axl_json in clusters]
+        for axl_json, future in zip(clusters, futures):
+            try:
+                results.append(ClusterResult(axl_json["fqdn"], future.result(), None))
+            except (
+                Fault,
+                TransportError,
+                requests.exceptions.RequestException,
+                FileNotFoundError,
+            ) as e:
+                results.append(ClusterResult(axl_json["fqdn"], None, error_message(e)))
+    return results
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2026, Chris Perkins
+Licence: BSD 3-Clause
+
+Benchmarks the dial plan parsing & line audit stages against synthetic Route Plans & line tables, to catch
+performance regressions before a production run does. Stages are:
+parse_regex - compiling & expanding each Route Plan pattern within a range, plus pathological patterns
+directory_numbers - building a range, marking used numbers, classifying & finding unused runs
+check_mask - External Phone Number Mask check of each line row
+check_label - Line Text Label check of each line row
+Reports throughput & peak memory allocated by each stage, excluding the synthetic input. Results can be
+saved as a baseline JSON file & later runs compared against it, exits with status 1 if any stage's
+throughput has dropped by more than the threshold.
+With --startup, instead times launching each tool in a new interpreter, importing the GUI tools without opening
+their window & running the headless tools to their usage message, & lists the heavy modules each loaded.
+With --wsdl, instead times loading an AXL WSDL file with Zeep & from the WSDL cache.
+
+v1.2 - added WSDL load & cache benchmark
+v1.1 - added startup time benchmark
+v1.0 - initial release
+"""
+
+import argparse, json, os, platform, subprocess, sys, tempfile, time, tracemalloc
+from collections import OrderedDict
+import dialplan_analyser
+from dialplan_analyser import DEFAULT_CLASSIFICATION, DirectoryNumbers, parse_regex
+from axl_common import check_label, check_mask
+
+DEFAULT_SIZES = "1000,10000,100000,1000000"
+RANGE_START = 1000000
+# Line rows are generated & checked in chunks so 1M row line tables don't need holding in memory
+ROWS_PER_CHUNK = 100000
+# Patterns which are slow to compile or expand, wide wildcards & deep exclusion sets
+PATHOLOGICAL_PATTERNS = [
+    "XXXXXXXXX",
+    "XXXXXXX",
+    "1XXXXXX!",
+    "[^0][^1][^2][^3][^4][^5][^6]",
+    "1[^02468][^13579][^0-4]XXX",
+    "[0-9][0-9][0-9][0-9][0-9][0-9][0-9]",
+    "\\+4420XXXXXXX",
+]
+# Arguments to the interpreter to launch each tool, without opening a window or prompting for a password
+STARTUP_COMMANDS = OrderedDict(
+    (
+        ("dialplan_analyser", ["-c", "import dialplan_analyser"]),
+        ("dn_recording_checker", ["-c", "import dn_recording_checker"]),
+        ("line_label_check", ["-c", "import line_label_check"]),
+        ("number_mask_check", ["-c", "import number_mask_check"]),
+        ("number_reference_finder", ["-c", "import number_reference_finder"]),
+        ("line_appearance_audit", ["line_appearance_audit.py"]),
+        ("Phone_LSC_Scraper", ["Phone_LSC_Scraper.py"]),
+    )
+)
+# Modules slow to import that the tools should only load when a code path needs them, the GUI tools need
+# tkinter to start but the headless tools shouldn't load it
+HEAVY_MODULES = ("numpy", "zeep", "requests", "urllib3", "lxml", "OpenSSL", "tkinter")
+MASK_RANGES = [
+    {
+        "range_start": str(RANGE_START + i * 200000),
+        "range_end": str(RANGE_START + i * 200000 + 199999),
+        "mask": f"+44207{i}XXXXXX",
+        "partition": "PT_INTERNAL",
+    }
+    for i in range(5)
+]
+
+
+def synthetic_route_plan(size):
+    """Return Route Plan of size (pattern, partition) entries covering a range of size numbers, mostly
+    plain DNs with some wildcard patterns & the pathological patterns"""
+    route_plan = []
+    for i in range(size):
+        dn = RANGE_START + (i * 7919) % size
+        if i % 20 == 19:
+            route_plan.append((f"{dn // 100}XX", "PT_INTERNAL"))
+        elif i % 10 == 9:
+            route_plan.append((str(dn), "PT_OTHER"))
+        else:
+            route_plan.append((str(dn), "PT_INTERNAL"))
+    route_plan.extend((pattern, "PT_INTERNAL") for pattern in PATHOLOGICAL_PATTERNS)
+    return route_plan
+
+
+def synthetic_lines(size):
+    """Yield lists of line rows as returned by AXLConnection.sql_query, in chunks of ROWS_PER_CHUNK. One
+    in twenty rows has a wrong mask & label"""
+    for chunk_start in range(0, size, ROWS_PER_CHUNK):
+        rows = []
+        for i in range(chunk_start, min(size, chunk_start + ROWS_PER_CHUNK)):
+            dn = str(RANGE_START + i)
+            is_wrong = i % 20 == 0
+            rows.append(
+                OrderedDict(
+                    (
+                        ("name", f"SEP{i:012X}"),
+                        ("description", f"First{i} Last{i}"),
+                        ("dnorpattern", dn),
+                        ("pname", "PT_INTERNAL"),
+                        (
+                            "e164mask",
+                            None if is_wrong else f"+44207{i // 200000}XXXXXX",
+                        ),
+                        ("alertingname", f"First{i} Last{i}"),
+                        ("display", None if i % 3 else f"First{i} Last{i}"),
+                        (
+                            "label",
+                            f"First{i} Last{i}" if is_wrong else f"F Last{i}-{dn}",
+                        ),
+                        ("pkid", f"{i:08x}-0000-4000-8000-{i:012x}"),
+                    )
+                )
+            )
+        yield rows
+
+
+def bench_parse_regex(size):
+    """Yield work for parsing a Route Plan within a range, with an empty pattern cache"""
+    route_plan = synthetic_route_plan(size)
+    range_end = RANGE_START + size - 1
+    dialplan_analyser.pattern_cache.compiled.clear()
+
+    def work():
+        for pattern, partition in route_plan:
+            parse_regex(pattern, RANGE_START, range_end)
+
+    yield work, len(route_plan)
+
+
+def bench_directory_numbers(size):
+    """Yield work for building a range, marking every other number used, classifying & finding runs"""
+    range_end = str(RANGE_START + size - 1)
+    used = [str(RANGE_START + i) for i in range(0, size, 2)]
+
+    def work():
+        directory_numbers = DirectoryNumbers(str(RANGE_START), range_end)
+        for num_str in used:
+            directory_numbers.is_used[directory_numbers.index(num_str)] = True
+        directory_numbers.classify(DEFAULT_CLASSIFICATION)
+        directory_numbers.unused_runs()
+
+    yield work, size
+
+
+def bench_check_mask(size):
+    """Yield work for checking the number mask of each line row, chunk by chunk"""
+    for rows in synthetic_lines(size):
+
+        def work(rows=rows):
+            return [check_mask(row, MASK_RANGES) for row in rows]
+
+        yield work, len(rows)
+
+
+def bench_check_label(size):
+    """Yield work for checking the line label of each line row, chunk by chunk"""
+    for rows in synthetic_lines(size):
+
+        def work(rows=rows):
+            return [check_label(row) for row in rows]
+
+        yield work, len(rows)
+
+
+STAGES = OrderedDict(
+    (
+        ("parse_regex", bench_parse_regex),
+        ("directory_numbers", bench_directory_numbers),
+        ("check_mask", bench_check_mask),
+        ("check_label", bench_check_label),
+    )
+)
+
+
+def run_stage(stage, size, trace_memory):
+    """Run a stage once, returns (seconds, rows, peak bytes). Only the work is timed & traced, not
+    generating its synthetic input"""
+    seconds = 0.0
+    rows = 0
+    peak = 0
+    for work, work_rows in STAGES[stage](size):
+        if trace_memory:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        work()
+        seconds += time.perf_counter() - start
+        rows += work_rows
+        if trace_memory:
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - base)
+    return seconds, rows, peak
+
+
+def benchmark(stage, size, repeat):
+    """Return result of a stage at a size, best time of repeat runs & peak memory of a separate traced
+    run as tracing slows it down"""
+    best = None
+    for _ in range(repeat):
+        seconds, rows, _ = run_stage(stage, size, False)
+        best = seconds if best is None else min(best, seconds)
+    tracemalloc.start()
+    try:
+        _, _, peak = run_stage(stage, size, True)
+    finally:
+        tracemalloc.stop()
+    return {
+        "rows": rows,
+        "seconds": round(best, 6),
+        "rows_per_second": round(rows / best) if best else 0,
+        "peak_memory_bytes": peak,
+    }
+
+
+def benchmark_startup(name, repeat):
+    """Return result of launching a tool, best time of repeat launches & the heavy modules loaded, found from
+    a separate launch with import timing as that slows it down. Throughput is launches a second
+    """
+    command = [sys.executable] + STARTUP_COMMANDS[name]
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=cwd, capture_output=True)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    # Each line of -X importtime output ends with the name of the module imported
+    import_times = subprocess.run(
+        [sys.executable, "-X", "importtime"] + STARTUP_COMMANDS[name],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+    ).stderr
+    imported = {
+        line.rsplit("|", 1)[-1].strip().split(".")[0]
+        for line in import_times.splitlines()
+        if line.startswith("import time:")
+    }
+    return {
+        "rows": 1,
+        "seconds": round(best, 6),
+        "rows_per_second": round(1 / best, 1) if best else 0,
+        "peak_memory_bytes": 0,
+        "heavy_modules": [module for module in HEAVY_MODULES if module in imported],
+    }
+
+
+def benchmark_wsdl(wsdl_file, repeat):
+    """Return results of loading a WSDL file with Zeep & from a WSDL cache, best time of repeat loads each.
+    Raises FileNotFoundError if the WSDL file is missing"""
+    from zeep import Settings
+    from zeep.transports import Transport
+    from axl_client import load_wsdl
+
+    results = OrderedDict()
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # Populate the cache, then time loads with it disabled & enabled
+        load_wsdl(wsdl_file, Transport(), Settings(), cache_dir)
+        for name, directory in (("parse", ""), ("cached", cache_dir)):
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                load_wsdl(wsdl_file, Transport(), Settings(), directory)
+                seconds = time.perf_counter() - start
+                best = seconds if best is None else min(best, seconds)
+            results[f"wsdl/{name}"] = {
+                "rows": 1,
+                "seconds": round(best, 6),
+                "rows_per_second": round(1 / best, 1) if best else 0,
+                "peak_memory_bytes": 0,
+            }
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print change in throughput against baseline, returns list of regressed result keys"""
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        old_rate = baseline[key]["rows_per_second"]
+        change = (result["rows_per_second"] - old_rate) / old_rate if old_rate else 0.0
+        memory_change = result["peak_memory_bytes"] - baseline[key]["peak_memory_bytes"]
+        flag = ""
+        if change < -threshold:
+            flag = " REGRESSION"
+            regressions.append(key)
+        print(
+            f"{key:<28} {change:+8.1%} throughput {memory_change / 1024:+12.0f} KiB{flag}"
+        )
+    return regressions
+
+
+def main():
+    """Program entry point, parses arguments, runs stages & saves or compares baseline"""
+    parser = argparse.ArgumentParser(description="Dial plan & audit benchmarks")
+    parser.add_argument(
+        "--sizes", default=DEFAULT_SIZES, help="Comma separated row counts"
+    )
+    parser.add_argument(
+        "--stages", default=",".join(STAGES), help="Comma separated stage names"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage")
+    parser.add_argument("--save", help="Save results as baseline JSON file")
+    parser.add_argument("--compare", help="Compare results with baseline JSON file")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Throughput drop reported as a regression",
+    )
+    parser.add_argument(
+        "--startup", action="store_true", help="Time tool startup instead of stages"
+    )
+    parser.add_argument(
+        "--wsdl",
+        help="Time loading WSDL file with & without the cache instead of stages",
+    )
+    args = parser.parse_args()
+
+    try:
+        sizes = [int(size) for size in args.sizes.split(",")]
+    except ValueError:
+        print("Error: Sizes must be integers.")
+        sys.exit(1)
+    stages = args.stages.split(",")
+    for stage in stages:
+        if stage not in STAGES:
+            print(f"Error: Unknown stage {stage}, choose from {', '.join(STAGES)}.")
+            sys.exit(1)
+
+    results = OrderedDict()
+    if args.startup:
+        print(f"{'Startup':<32} {'Seconds':>10}  Heavy modules loaded")
+        for name in STARTUP_COMMANDS:
+            result = benchmark_startup(name, max(1, args.repeat))
+            results[f"startup/{name}"] = result
+            print(
+                f"{'startup/' + name:<32} {result['seconds']:>10.3f}  "
+                f"{', '.join(result['heavy_modules']) or '-'}"
+            )
+    elif args.wsdl:
+        try:
+            results.update(benchmark_wsdl(args.wsdl, max(1, args.repeat)))
+        except FileNotFoundError:
+            print(f"Error: Unable to open WSDL file {args.wsdl}.")
+            sys.exit(1)
+        print(f"{'WSDL':<28} {'Seconds':>10}")
+        for key, result in results.items():
+            print(f"{key:<28} {result['seconds']:>10.3f}")
+    else:
+        print(
+            f"{'Stage/Size':<28} {'Rows':>9} {'Seconds':>10} {'Rows/s':>12} {'Peak KiB':>10}"
+        )
+        for stage in stages:
+            for size in sizes:
+                result = benchmark(stage, size, max(1, args.repeat))
+                key = f"{stage}/{size}"
+                results[key] = result
+                print(
+                    f"{key:<28} {result['rows']:>9} {result['seconds']:>10.3f} "
+                    f"{result['rows_per_second']:>12} {result['peak_memory_bytes'] / 1024:>10.0f}"
+                )
+
+    if args.save:
+        try:
+            with open(args.save, "w") as f:
+                json.dump(
+                    {
+                        "python": platform.python_version(),
+                        "machine": platform.machine(),
+                        "results": results,
+                    },
+                    f,
+                    indent=2,
+                )
+        except OSError:
+            print(f"Error: Unable to write baseline file {args.save}.")
+            sys.exit(1)
+    if args.compare:
+        try:
+            with open(args.compare) as f:
+                baseline = json.load(f)["results"]
+        except (OSError, json.decoder.JSONDecodeError, KeyError):
+            print(f"Error: Unable to read baseline file {args.compare}.")
+            sys.exit(1)
+        print(f"\nCompared with {args.compare}:")
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
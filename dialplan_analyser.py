@@ -1,508 +1,1218 @@
-#!/usr/bin/env python3
-
-"""
-Copyright (c) 2017 - 2019, Chris Perkins
-Licence: BSD 3-Clause
-
-Takes CUCM Route Plan Report exported as CSV or uses AXL, parses the regexs for the dial plan to find
-unused numbers in a given direct dial range. Number range to match against is defined in JSON format in dialplan.json.
-Won't parse dial plan entries with * or # as they're invalid for a direct dial range
-
-v1.5 - code tidying
-v1.4 - GUI adjustments & fixes some edge cases
-v1.3 – added AXL support
-v1.2 – bug fixes
-v1.1 – added GUI
-v1.0 – initial release with only CSV file support and CLI usage
-
-Original AXL SQL query code courtesy of Jonathan Els - https://afterthenumber.com/2018/04/27/serializing-thin-axl-sql-query-responses-with-python-zeep/
-
-To Do:
-Improve the GUI
-Add number classification, e.g. bronze, silver, gold & platinum
-"""
-
-import itertools, csv, sys, json
-import tkinter as tk
-import requests
-from tkinter import ttk
-from tkinter import filedialog, simpledialog, messagebox
-from collections import OrderedDict
-from zeep import Client
-from zeep.cache import SqliteCache
-from zeep.transports import Transport
-from zeep.plugins import HistoryPlugin
-from zeep.exceptions import Fault
-from zeep.helpers import serialize_object
-from requests import Session
-from requests.auth import HTTPBasicAuth
-from urllib3 import disable_warnings
-from urllib3.exceptions import InsecureRequestWarning
-from lxml import etree
-
-# Stores information about numbers in a range
-class DirectoryNumbers:
-    def __init__(self, start_num, end_num):
-        """Constructor initialises attributes"""
-        self.number = []
-        self.is_used = []
-        self.classification = []
-
-        for num in range(int(start_num), int(end_num) + 1):
-            num_str = str(num)
-            # For numbers with preceeding 0, conversion to int will strip, so prepend with 0 to match
-            #  length of source string
-            if len(num_str) < len(end_num):
-                pad_str = "0" * (len(end_num) - len(num_str))
-                num_str = pad_str + num_str
-            self.number.append(num_str)
-            self.is_used.append(False)
-            self.classification.append(0)
-
-
-# GUI and main code
-class GUIFrame(tk.Frame):
-    def __init__(self, parent):
-        """Constructor checks parameters and initialise variables"""
-        self.range_descriptions = []
-        self.numbers = []
-        self.input_filename = None
-        self.use_axl = False
-        self.axl_password = ""
-
-        try:
-            with open("dialplan.json") as f:
-                self.json_data = json.load(f)
-                for range_data in self.json_data:
-                    try:
-                        if len(range_data["range_start"]) != len(
-                            range_data["range_end"]
-                        ):
-                            tk.messagebox.showerror(
-                                title="Error",
-                                message="The first and last numbers"
-                                " in range must be of equal length.",
-                            )
-                            sys.exit()
-                        elif int(range_data["range_start"]) >= int(
-                            range_data["range_end"]
-                        ):
-                            tk.messagebox.showerror(
-                                title="Error",
-                                message="The last number in range"
-                                " must be greater than the first.",
-                            )
-                            sys.exit()
-                    except (TypeError, ValueError, KeyError):
-                        tk.messagebox.showerror(
-                            title="Error",
-                            message="Number range parameters incorrect." " formatted.",
-                        )
-                        sys.exit()
-                    try:
-                        if not range_data["description"]:
-                            tk.messagebox.showerror(
-                                title="Error", message="Description must be specified."
-                            )
-                            sys.exit()
-                        self.range_descriptions.append(range_data["description"])
-                    except KeyError:
-                        tk.messagebox.showerror(
-                            title="Error", message="Description must be specified."
-                        )
-                        sys.exit()
-                    try:
-                        pass
-                        # Remove pass & uncomment to disallow DNs not in a partition
-                        # if not range_data["partition"]:
-                        #    tk.messagebox.showerror(title="Error", message="Partition must be specified.")
-                        #    sys.exit()
-                    except KeyError:
-                        tk.messagebox.showerror(
-                            title="Error", message="Partition must be specified."
-                        )
-                        sys.exit()
-        except FileNotFoundError:
-            messagebox.showerror(title="Error", message="Unable to open JSON file.")
-            sys.exit()
-        except json.decoder.JSONDecodeError:
-            messagebox.showerror(title="Error", message="Unable to parse JSON file.")
-            sys.exit()
-
-        self.range_descriptions = sorted(self.range_descriptions)
-        for item in self.json_data:
-            if item["description"].upper() == self.range_descriptions[0].upper():
-                self.range_description = item["description"]
-                self.range_start = int(item["range_start"])
-                self.range_end = int(item["range_end"])
-                self.range_partition = item.get("partition", "")
-                self.directory_numbers = DirectoryNumbers(
-                    item["range_start"], item["range_end"]
-                )
-                break
-
-        tk.Frame.__init__(self, parent)
-        parent.geometry("320x480")
-        self.pack(fill=tk.BOTH, expand=True)
-        menu_bar = tk.Menu(self)
-        file_menu = tk.Menu(menu_bar, tearoff=0)
-        file_menu.add_command(label="Load AXL", command=self.open_json_file_dialog)
-        file_menu.add_command(label="Load CSV", command=self.open_csv_file_dialog)
-        file_menu.add_separator()
-        file_menu.add_command(label="Exit", command=self.quit)
-        menu_bar.add_cascade(label="File", menu=file_menu)
-        parent.config(menu=menu_bar)
-        tk.Label(self, text="DN Range:").place(relx=0.4, rely=0.0, height=22, width=62)
-        self.range_combobox = ttk.Combobox(
-            self, values=self.range_descriptions, state="readonly"
-        )
-        self.range_combobox.current(0)
-        self.range_combobox.bind("<<ComboboxSelected>>", self.combobox_update)
-        self.range_combobox.place(relx=0.02, rely=0.042, relheight=0.06, relwidth=0.96)
-        tk.Button(self, text="Find Unused DNs", command=self.find_unused_dns).place(
-            relx=0.35, rely=0.12, height=22, width=100
-        )
-        self.unused_label_text = tk.StringVar()
-        self.unused_label_text.set("Unused DNs: ")
-        tk.Label(self, textvariable=self.unused_label_text).place(
-            relx=0.35, rely=0.18, height=22, width=110
-        )
-        list_box_frame = tk.Frame(self, bd=2, relief=tk.SUNKEN)
-        list_box_scrollbar_y = tk.Scrollbar(list_box_frame)
-        list_box_scrollbar_x = tk.Scrollbar(list_box_frame, orient=tk.HORIZONTAL)
-        self.list_box = tk.Listbox(
-            list_box_frame,
-            xscrollcommand=list_box_scrollbar_x.set,
-            yscrollcommand=list_box_scrollbar_y.set,
-        )
-        list_box_frame.place(relx=0.02, rely=0.22, relheight=0.73, relwidth=0.96)
-        list_box_scrollbar_y.place(relx=0.94, rely=0.0, relheight=1.0, relwidth=0.06)
-        list_box_scrollbar_x.place(relx=0.0, rely=0.94, relheight=0.06, relwidth=0.94)
-        self.list_box.place(relx=0.0, rely=0.0, relheight=0.94, relwidth=0.94)
-        list_box_scrollbar_y.config(command=self.list_box.yview)
-        list_box_scrollbar_x.config(command=self.list_box.xview)
-        self.entries_label_text = tk.StringVar()
-        self.entries_label_text.set("Dial Plan Entries Parsed: ")
-        tk.Label(self, textvariable=self.entries_label_text).place(
-            relx=0.21, rely=0.95, height=22, width=220
-        )
-
-    def parse_regex(self, pattern, range_start, range_end):
-        """Parse CUCM regex pattern and return list of the digit strings the regex matches within the
-        number range specified"""
-        is_set = False
-        is_range = False
-        is_negate = False
-        num_digits = 0
-        digits = []
-        numbers_in_use = []
-
-        # Parse regex and store digits in jagged list
-        for column in range(16):
-            digits.append([])
-        for char in pattern:
-            if char == "[":
-                is_set = True
-            elif char == "^" and is_set == True:
-                is_negate = True
-            elif char == "]":
-                is_set = False
-                if is_negate == True:
-                    negate_set = []
-                    for range_char in [
-                        "0",
-                        "1",
-                        "2",
-                        "3",
-                        "4",
-                        "5",
-                        "6",
-                        "7",
-                        "8",
-                        "9",
-                    ]:
-                        if range_char not in digits[num_digits]:
-                            negate_set.append(range_char)
-                    digits[num_digits] = negate_set[:]
-                    is_negate = False
-                num_digits += 1
-            elif char in ["0", "1", "2", "3", "4", "5", "6", "7", "8", "9"]:
-                if is_range == False:
-                    digits[num_digits].append(char)
-                    if is_set == False:
-                        num_digits += 1
-                else:
-                    for range_char in range(
-                        int(digits[num_digits][-1]) + 1, int(char) + 1
-                    ):
-                        digits[num_digits].append(str(range_char))
-                    is_range = False
-            elif char == "-" and is_set == True:
-                is_range = True
-            elif char == "X":
-                digits[num_digits] = ["0", "1", "2", "3", "4", "5", "6", "7", "8", "9"]
-                num_digits += 1
-            elif char == "*" or char == "#":
-                # Strings containing * or # can't be parsed as an integer so return empty list as also
-                # not a valid PSTN number
-                return []
-
-        # Strip empty lists
-        digits2 = [x for x in digits if x != []]
-
-        # Use itertools.product() to convert jagged list of digits to list of permutation strings
-        #  >= range_start & <= range_end
-        for plist in itertools.product(*digits2):
-            char_string = "".join([str(char) for char in plist])
-            if char_string:
-                number = int(char_string)
-                if number >= range_start and number <= range_end:
-                    numbers_in_use.append(char_string)
-
-        return numbers_in_use
-
-    def element_list_to_ordered_dict(self, elements):
-        """Convert list to OrderedDict"""
-        return [
-            OrderedDict((element.tag, element.text) for element in row)
-            for row in elements
-        ]
-
-    def sql_query(self, service, sql_statement):
-        """Execute SQL query via AXL and return results"""
-        try:
-            axl_resp = service.executeSQLQuery(sql=sql_statement)
-            try:
-                return self.element_list_to_ordered_dict(
-                    serialize_object(axl_resp)["return"]["rows"]
-                )
-            except KeyError:
-                # Single tuple response
-                return self.element_list_to_ordered_dict(
-                    serialize_object(axl_resp)["return"]["row"]
-                )
-            except TypeError:
-                # No SQL tuples
-                return serialize_object(axl_resp)["return"]
-        except requests.exceptions.ConnectionError as e:
-            tk.messagebox.showerror(title="Error", message=str(e))
-            return None
-
-    def read_axl(self):
-        """Read and parse Route Plan via AXL"""
-        try:
-            self.list_box.delete(0, tk.END)
-            with open(self.input_filename) as f:
-                axl_json_data = json.load(f)
-                for axl_json in axl_json_data:
-                    try:
-                        if not axl_json["fqdn"]:
-                            tk.messagebox.showerror(
-                                title="Error", message="FQDN must be specified."
-                            )
-                            return
-                    except KeyError:
-                        tk.messagebox.showerror(
-                            title="Error", message="FQDN must be specified."
-                        )
-                        return
-                    try:
-                        if not axl_json["username"]:
-                            tk.messagebox.showerror(
-                                title="Error", message="Username must be specified."
-                            )
-                            return
-                    except KeyError:
-                        tk.messagebox.showerror(
-                            title="Error", message="Username must be specified."
-                        )
-                        return
-                    try:
-                        if not axl_json["wsdl_file"]:
-                            tk.messagebox.showerror(
-                                title="Error", message="WSDL file must be specified."
-                            )
-                            return
-                    except KeyError:
-                        tk.messagebox.showerror(
-                            title="Error", message="WSDL file must be specified."
-                        )
-                        return
-        except FileNotFoundError:
-            messagebox.showerror(title="Error", message="Unable to open JSON file.")
-            return
-        except json.decoder.JSONDecodeError:
-            messagebox.showerror(title="Error", message="Unable to parse JSON file.")
-            return
-
-        sql_statement = (
-            "SELECT n.dnorpattern, p.name FROM numplan n LEFT JOIN routepartition p ON "
-            "n.fkroutepartition=p.pkid"
-        )
-        axl_binding_name = "{http://www.cisco.com/AXLAPIService/}AXLAPIBinding"
-        axl_address = f"https://{axl_json['fqdn']}:8443/axl/"
-        session = Session()
-        session.verify = False
-        session.auth = HTTPBasicAuth(axl_json["username"], self.axl_password)
-        transport = Transport(cache=SqliteCache(), session=session, timeout=60)
-        history = HistoryPlugin()
-        try:
-            client = Client(
-                wsdl=axl_json["wsdl_file"], transport=transport, plugins=[history]
-            )
-        except FileNotFoundError as e:
-            tk.messagebox.showerror(title="Error", message=str(e))
-            return
-        axl = client.create_service(axl_binding_name, axl_address)
-
-        try:
-            raw_route_plan = []
-            for row in self.sql_query(service=axl, sql_statement=sql_statement):
-                # Ignore entries not in the correct partition and update directory_numbers with numbers
-                # found to be in use
-                pname = row["name"] if row["name"] else ""
-                if pname.upper() == self.range_partition.upper():
-                    for char_string in self.parse_regex(
-                        row["dnorpattern"], self.range_start, self.range_end
-                    ):
-                        raw_route_plan.append(char_string)
-                        try:
-                            dn_index = self.directory_numbers.number.index(char_string)
-                            self.directory_numbers.is_used[dn_index] = True
-                        except (IndexError, ValueError):
-                            continue
-        except TypeError:
-            return
-        except Fault as thin_axl_error:
-            tk.messagebox.showerror(title="Error", message=thin_axl_error.message)
-            return
-
-        # Update TKinter display objects with results
-        self.entries_label_text.set(
-            f"Dial Plan Entries Parsed: {str(len(raw_route_plan))}"
-        )
-        cntr = 0
-        for num in range(0, len(self.directory_numbers.number)):
-            if self.directory_numbers.is_used[num] == False:
-                cntr += 1
-                self.list_box.insert(
-                    tk.END,
-                    f"{self.directory_numbers.number[num]} / {self.range_partition}",
-                )
-        self.unused_label_text.set(f"Unused DNs: {str(cntr)}")
-
-    def read_csv_file(self):
-        """Read and parse Route Plan Report CSV file"""
-        column_index = []
-
-        try:
-            self.list_box.delete(0, tk.END)
-            # encoding="utf-8-sig" is necessary for correct parsing fo UTF-8 encoding of CUCM Route
-            # Plan Report CSV file
-            with open(self.input_filename, encoding="utf-8-sig") as f:
-                reader = csv.reader(f)
-                header_row = next(reader)
-                for index, column_header in enumerate(header_row):
-                    if column_header == "Pattern or URI":
-                        column_index.append(index)
-                    elif column_header == "Pattern/Directory Number":
-                        column_index.append(index)
-                    elif column_header == "Partition":
-                        column_index.append(index)
-                if len(column_index) != 2:
-                    tk.messagebox.showerror(
-                        title="Error", message="Unable to parse CSV file."
-                    )
-                    return
-                raw_route_plan = []
-                for row in reader:
-                    # Ignore entries not in the correct partition and update directory_numbers with
-                    # numbers found to be in use
-                    if row[column_index[1]].upper() == self.range_partition.upper():
-                        for char_string in self.parse_regex(
-                            row[column_index[0]], self.range_start, self.range_end
-                        ):
-                            raw_route_plan.append(char_string)
-                            try:
-                                dn_index = self.directory_numbers.number.index(
-                                    char_string
-                                )
-                                self.directory_numbers.is_used[dn_index] = True
-                            except (IndexError, ValueError):
-                                pass
-        except FileNotFoundError:
-            tk.messagebox.showerror(title="Error", message="Unable to open CSV file.")
-            return
-
-        # Update TKinter display objects
-        self.entries_label_text.set(
-            f"Dial Plan Entries Parsed: {str(len(raw_route_plan))}"
-        )
-        cntr = 0
-        for num in range(0, len(self.directory_numbers.number)):
-            if self.directory_numbers.is_used[num] == False:
-                cntr += 1
-                self.list_box.insert(
-                    tk.END,
-                    f"{self.directory_numbers.number[num]} / {self.range_partition}",
-                )
-        self.unused_label_text.set(f"Unused DNs: {str(cntr)}")
-
-    def find_unused_dns(self):
-        """Check AXL or CSV selected and hand over to correct method to handle"""
-        if self.use_axl:
-            if not self.input_filename:
-                tk.messagebox.showerror(title="Error", message="No AXL file selected.")
-                return
-            else:
-                self.read_axl()
-        else:
-            if not self.input_filename:
-                tk.messagebox.showerror(title="Error", message="No CSV file selected.")
-                return
-            else:
-                self.read_csv_file()
-
-    def open_csv_file_dialog(self):
-        """Dialogue to prompt for CSV file to open"""
-        self.input_filename = tk.filedialog.askopenfilename(
-            initialdir="/", filetypes=(("CSV files", "*.csv"), ("All files", "*.*"))
-        )
-        self.use_axl = False
-        self.axl_password = ""
-
-    def open_json_file_dialog(self):
-        """Dialogue to prompt for JSON file to open and AXL password"""
-        self.input_filename = tk.filedialog.askopenfilename(
-            initialdir="/", filetypes=(("JSON files", "*.json"), ("All files", "*.*"))
-        )
-        self.use_axl = True
-        self.axl_password = tk.simpledialog.askstring(
-            "Input", "AXL Password?", show="*"
-        )
-
-    def combobox_update(self, event):
-        """Populate range variables when Combobox item selected"""
-        self.list_box.delete(0, tk.END)
-        self.unused_label_text.set("Unused DNs: ")
-        self.entries_label_text.set("Dial Plan Entries Parsed: ")
-        value = self.range_combobox.get()
-        for item in self.json_data:
-            if item["description"].upper() == value.upper():
-                self.range_description = item["description"]
-                self.range_start = int(item["range_start"])
-                self.range_end = int(item["range_end"])
-                self.range_partition = item["partition"]
-                self.directory_numbers = DirectoryNumbers(
-                    item["range_start"], item["range_end"]
-                )
-                break
-
-
-if __name__ == "__main__":
-    disable_warnings(InsecureRequestWarning)
-    # Initialise TKinter GUI objects
-    root = tk.Tk()
-    root.title("Dial Plan Analyser v1.5")
-    GUIFrame(root)
-    root.mainloop()
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2017 - 2019, Chris Perkins
+Licence: BSD 3-Clause
+
+Takes CUCM Route Plan Report exported as CSV or uses AXL, parses the regexs for the dial plan to find
+unused numbers in a given direct dial range. Number range to match against is defined in JSON format in dialplan.json.
+Won't parse dial plan entries with * or # as they're invalid for a direct dial range.
+Analyse menu builds a digit trie of every pattern to find overlapping or shadowed patterns within a partition,
+or the closest match for dialled digits, and allocates blocks of consecutive free numbers in the range.
+Numbers are classified as bronze, silver, gold or platinum by repeated, sequential & trailing zero digits,
+with premium numbers optionally hidden from the unused DNs. Unused DNs can be collapsed into runs of consecutive
+numbers & exported to CSV
+
+v1.14 - Zeep, requests & numpy only imported when needed, for fast startup when only opening a CSV file
+v1.13 - added phase timing & SOAP latency metrics, written to the metrics_file in the AXL JSON
+v1.12 - faster Route Plan Report CSV parsing, partition lookup & plain DN matching, fixed column order
+v1.11 - added collapsed runs of unused DNs & export of unused DNs
+v1.10 - added number classification
+v1.9 - added free block allocation & range utilisation
+v1.8 - compiled patterns cached & expanded only within the range, Route Plan kept when switching ranges
+v1.7 - added overlapping/shadowed pattern & closest match analysis
+v1.6 - queries every cluster in the AXL JSON file concurrently
+v1.5 - code tidying
+v1.4 - GUI adjustments & fixes some edge cases
+v1.3 – added AXL support
+v1.2 – bug fixes
+v1.1 – added GUI
+v1.0 – initial release with only CSV file support and CLI usage
+
+Original AXL SQL query code courtesy of Jonathan Els - https://afterthenumber.com/2018/04/27/serializing-thin-axl-sql-query-responses-with-python-zeep/
+
+To Do:
+Improve the GUI
+"""
+
+import csv, sys, json, threading
+import tkinter as tk
+from tkinter import ttk
+from tkinter import filedialog, simpledialog, messagebox
+from array import array
+from collections import OrderedDict
+from operator import itemgetter
+from axl_common import (
+    AXLConfigError,
+    fan_out,
+    metrics,
+    read_axl_json,
+    write_metrics,
+)
+
+# Stores information about numbers in a range
+class DirectoryNumbers:
+    def __init__(self, start_num, end_num):
+        """Constructor initialises attributes"""
+        self.number = []
+        self.is_used = []
+        self.classification = []
+
+        for num in range(int(start_num), int(end_num) + 1):
+            num_str = str(num)
+            # For numbers with preceeding 0, conversion to int will strip, so prepend with 0 to match
+            #  length of source string
+            if len(num_str) < len(end_num):
+                pad_str = "0" * (len(end_num) - len(num_str))
+                num_str = pad_str + num_str
+            self.number.append(num_str)
+            self.is_used.append(False)
+            self.classification.append(0)
+
+    def index(self, num_str):
+        """Return index of number string, raises ValueError if it's not in the range"""
+        dn_index = int(num_str) - int(self.number[0])
+        if (
+            dn_index < 0
+            or dn_index >= len(self.number)
+            or self.number[dn_index] != num_str
+        ):
+            raise ValueError(f"{num_str} is not in range")
+        return dn_index
+
+    def classify(self, rules):
+        """Classify every number in the range using the classification rules"""
+        self.classification = classify_numbers(
+            int(self.number[0]), int(self.number[-1]), rules
+        ).tolist()
+
+    def unused_runs(self, hide_tier=None):
+        """Return list of (first index, last index) of each run of consecutive unused numbers, numbers
+        classified as hide_tier or above are treated as used"""
+        import numpy as np
+
+        unused = ~np.array(self.is_used, dtype=bool)
+        if hide_tier is not None:
+            unused &= np.array(self.classification) < hide_tier
+        edges = np.diff(np.concatenate(([0], unused.astype(np.int8), [0])))
+        firsts = np.flatnonzero(edges == 1)
+        lasts = np.flatnonzero(edges == -1) - 1
+        return list(zip(firsts.tolist(), lasts.tolist()))
+
+
+# Number classification tiers, lowest first. A number's last digits are classified into the highest tier where
+# it has at least one of: a run of the same digit ("repeat"), an ascending or descending sequence
+# ("sequence") or trailing zeros ("zeros") of the given length. Overridden per range in dialplan.json by a
+# "classification" dictionary, tiers from "premium" upwards can be hidden from the unused DNs
+CLASSIFICATION_TIERS = ["bronze", "silver", "gold", "platinum"]
+DEFAULT_CLASSIFICATION = {
+    "digits": 4,
+    "premium": "gold",
+    "silver": {"repeat": 2, "zeros": 1},
+    "gold": {"repeat": 3, "sequence": 3, "zeros": 2},
+    "platinum": {"repeat": 4, "sequence": 4, "zeros": 3},
+}
+
+
+def read_classification(range_data):
+    """Return classification rules for a range from dialplan.json merged with the defaults, raises
+    TypeError, ValueError or KeyError if they're incorrectly formatted"""
+    rules = dict(DEFAULT_CLASSIFICATION)
+    rules.update(range_data.get("classification", {}))
+    rules["digits"] = int(rules["digits"])
+    if rules["digits"] < 1:
+        raise ValueError("Classification digits must be at least 1")
+    CLASSIFICATION_TIERS.index(rules["premium"].lower())
+    for tier in CLASSIFICATION_TIERS[1:]:
+        for feature, length in rules[tier].items():
+            if feature not in ("repeat", "sequence", "zeros"):
+                raise KeyError(feature)
+            int(length)
+    return rules
+
+
+def classify_numbers(range_start, range_end, rules):
+    """Return numpy array of the classification tier of every number in the range, worked out for all
+    numbers at once from the matrix of their last digits. numpy is only imported when a range is analysed,
+    for fast startup"""
+    import numpy as np
+
+    numbers = np.arange(range_start, range_end + 1, dtype=np.int64)
+    powers = 10 ** np.arange(rules["digits"] - 1, -1, -1, dtype=np.int64)
+    digits = (numbers[:, np.newaxis] // powers) % 10
+    steps = np.diff(digits, axis=1)
+
+    # Longest run of repeated digits & of ascending or descending digits, one digit position at a time
+    features = {
+        "repeat": np.ones(len(numbers), dtype=np.int64),
+        "sequence": np.ones(len(numbers), dtype=np.int64),
+    }
+    repeat_run = np.ones(len(numbers), dtype=np.int64)
+    ascending_run = np.ones(len(numbers), dtype=np.int64)
+    descending_run = np.ones(len(numbers), dtype=np.int64)
+    for position in range(steps.shape[1]):
+        repeat_run = np.where(steps[:, position] == 0, repeat_run + 1, 1)
+        ascending_run = np.where(steps[:, position] == 1, ascending_run + 1, 1)
+        descending_run = np.where(steps[:, position] == -1, descending_run + 1, 1)
+        np.maximum(features["repeat"], repeat_run, out=features["repeat"])
+        np.maximum(features["sequence"], ascending_run, out=features["sequence"])
+        np.maximum(features["sequence"], descending_run, out=features["sequence"])
+    features["zeros"] = np.cumprod(digits[:, ::-1] == 0, axis=1).sum(axis=1)
+
+    classification = np.zeros(len(numbers), dtype=np.int8)
+    for tier, tier_name in enumerate(CLASSIFICATION_TIERS[1:], start=1):
+        in_tier = np.zeros(len(numbers), dtype=bool)
+        for feature, length in rules[tier_name].items():
+            in_tier |= features[feature] >= int(length)
+        classification[in_tier] = tier
+    return classification
+
+
+# Segment tree over the numbers in a range, for next free, free block of size N & utilisation queries in
+# logarithmic time. Numbers can be reserved so concurrent provisioning jobs don't allocate the same numbers,
+# reservations are only held in memory for this run, not in CUCM, so another run can allocate the same numbers
+class NumberAllocator:
+    def __init__(self, directory_numbers):
+        """Constructor builds tree from the numbers marked as used in directory_numbers"""
+        self.directory_numbers = directory_numbers
+        self.size = len(directory_numbers.number)
+        self.reserved = {}
+        self.lock = threading.Lock()
+        # Per node: count of free numbers, free run at start, free run at end & longest free run. Arrays of
+        # C ints sized to the tree's depth, a range can be millions of numbers
+        nodes = 2 << max(0, self.size - 1).bit_length()
+        self.free_count = array("i", [0]) * nodes
+        self.prefix_free = array("i", [0]) * nodes
+        self.suffix_free = array("i", [0]) * nodes
+        self.longest_free = array("i", [0]) * nodes
+        self.build(1, 0, self.size)
+
+    def is_free(self, dn_index):
+        """Check number at index is neither used nor reserved"""
+        return (
+            not self.directory_numbers.is_used[dn_index]
+            and dn_index not in self.reserved
+        )
+
+    def pull_up(self, node, lo, mid, hi):
+        """Recalculate node from its children"""
+        left = 2 * node
+        right = left + 1
+        self.free_count[node] = self.free_count[left] + self.free_count[right]
+        self.prefix_free[node] = self.prefix_free[left]
+        if self.prefix_free[left] == mid - lo:
+            self.prefix_free[node] += self.prefix_free[right]
+        self.suffix_free[node] = self.suffix_free[right]
+        if self.suffix_free[right] == hi - mid:
+            self.suffix_free[node] += self.suffix_free[left]
+        self.longest_free[node] = max(
+            self.longest_free[left],
+            self.longest_free[right],
+            self.suffix_free[left] + self.prefix_free[right],
+        )
+
+    def build(self, node, lo, hi):
+        """Build subtree covering numbers lo to hi - 1"""
+        if hi - lo == 1:
+            free = 1 if self.is_free(lo) else 0
+            self.free_count[node] = free
+            self.prefix_free[node] = free
+            self.suffix_free[node] = free
+            self.longest_free[node] = free
+            return
+        mid = (lo + hi) // 2
+        self.build(2 * node, lo, mid)
+        self.build(2 * node + 1, mid, hi)
+        self.pull_up(node, lo, mid, hi)
+
+    def update(self, dn_index, node=1, lo=0, hi=None):
+        """Refresh the leaf for dn_index & its ancestors after it's been used, reserved or released"""
+        if hi is None:
+            hi = self.size
+        if hi - lo == 1:
+            free = 1 if self.is_free(lo) else 0
+            self.free_count[node] = free
+            self.prefix_free[node] = free
+            self.suffix_free[node] = free
+            self.longest_free[node] = free
+            return
+        mid = (lo + hi) // 2
+        if dn_index < mid:
+            self.update(dn_index, 2 * node, lo, mid)
+        else:
+            self.update(dn_index, 2 * node + 1, mid, hi)
+        self.pull_up(node, lo, mid, hi)
+
+    def first_free(self, start, node=1, lo=0, hi=None):
+        """Return index of first free number at or after index start, or -1 if none"""
+        if hi is None:
+            hi = self.size
+        if hi <= start or self.free_count[node] == 0:
+            return -1
+        if hi - lo == 1:
+            return lo
+        mid = (lo + hi) // 2
+        dn_index = self.first_free(start, 2 * node, lo, mid)
+        if dn_index == -1:
+            dn_index = self.first_free(start, 2 * node + 1, mid, hi)
+        return dn_index
+
+    def first_free_block(self, block_size, node=1, lo=0, hi=None):
+        """Return index of the start of the first run of block_size free numbers, or -1 if none"""
+        if hi is None:
+            hi = self.size
+        if self.longest_free[node] < block_size:
+            return -1
+        if hi - lo == 1:
+            return lo
+        mid = (lo + hi) // 2
+        left = 2 * node
+        right = left + 1
+        if self.longest_free[left] >= block_size:
+            return self.first_free_block(block_size, left, lo, mid)
+        if self.suffix_free[left] + self.prefix_free[right] >= block_size:
+            return mid - self.suffix_free[left]
+        return self.first_free_block(block_size, right, mid, hi)
+
+    def next_free(self, start_num=None):
+        """Return first free number at or after start_num, or None if the range is full"""
+        with self.lock:
+            start = 0
+            if start_num is not None:
+                start = max(0, int(start_num) - int(self.directory_numbers.number[0]))
+            dn_index = self.first_free(start)
+            return None if dn_index == -1 else self.directory_numbers.number[dn_index]
+
+    def free_block(self, block_size):
+        """Return list of the first block_size consecutive free numbers, or None if there's no such block"""
+        with self.lock:
+            dn_index = self.first_free_block(block_size)
+            if dn_index == -1:
+                return None
+            return self.directory_numbers.number[dn_index : dn_index + block_size]
+
+    def utilisation(self):
+        """Return fraction of numbers in the range that are used or reserved"""
+        return 1.0 - self.free_count[1] / self.size
+
+    def reserve(self, block_size, owner):
+        """Find & reserve the first block of block_size consecutive free numbers for owner, returns list of
+        numbers reserved or None if there's no such block"""
+        with self.lock:
+            dn_index = self.first_free_block(block_size)
+            if dn_index == -1:
+                return None
+            for reserve_index in range(dn_index, dn_index + block_size):
+                self.reserved[reserve_index] = owner
+                self.update(reserve_index)
+            return self.directory_numbers.number[dn_index : dn_index + block_size]
+
+    def release(self, owner, commit=False):
+        """Release numbers reserved by owner, marking them as used if they've been provisioned"""
+        with self.lock:
+            for dn_index in [i for i, o in self.reserved.items() if o == owner]:
+                del self.reserved[dn_index]
+                if commit:
+                    self.directory_numbers.is_used[dn_index] = True
+                self.update(dn_index)
+
+    def mark_used(self, num_str):
+        """Mark number as used, e.g. when it's been provisioned outside of a reservation"""
+        with self.lock:
+            dn_index = self.directory_numbers.index(num_str)
+            self.directory_numbers.is_used[dn_index] = True
+            self.update(dn_index)
+
+
+# Read buffer size for Route Plan Report CSV files, which can be hundreds of MB
+CSV_BUFFER_SIZE = 4 * 1024 * 1024
+# Number of unused DNs added to the listbox at a time
+LISTBOX_BATCH_SIZE = 1000
+# Maximum number of compiled patterns to cache & optional JSON file to persist the cache between runs
+PATTERN_CACHE_SIZE = 100000
+PATTERN_CACHE_FILE = ""
+# Symbols a dial plan pattern can match at a digit position, each is a bit in a digit position's mask
+PATTERN_SYMBOLS = "0123456789*#+"
+DIGITS_MASK = 0b1111111111
+
+
+def compile_pattern(pattern):
+    """Compile CUCM pattern into a tuple with a bitmask of the symbols matched for each digit position,
+    plus whether it ends in ! (one or more further digits). Returns None if the pattern can't be
+    compiled, e.g. it contains @ or is a URI"""
+    is_set = False
+    is_range = False
+    is_negate = False
+    is_open = False
+    set_mask = 0
+    last_char = ""
+    masks = []
+
+    for char in pattern:
+        if is_open:
+            # ! must be the last character
+            return None
+        if char == "[":
+            is_set = True
+            set_mask = 0
+        elif char == "^" and is_set == True:
+            is_negate = True
+        elif char == "]" and is_set == True:
+            if is_negate == True:
+                set_mask = DIGITS_MASK & ~set_mask
+                is_negate = False
+            if set_mask == 0:
+                return None
+            masks.append(set_mask)
+            is_set = False
+        elif char == "-" and is_set == True:
+            is_range = True
+        elif char in PATTERN_SYMBOLS:
+            if is_set == False:
+                masks.append(1 << PATTERN_SYMBOLS.index(char))
+            elif is_range == True:
+                if last_char not in "0123456789" or char not in "0123456789":
+                    return None
+                for range_char in range(int(last_char) + 1, int(char) + 1):
+                    set_mask |= 1 << range_char
+                is_range = False
+            else:
+                set_mask |= 1 << PATTERN_SYMBOLS.index(char)
+            last_char = char
+        elif char == "X":
+            masks.append(DIGITS_MASK)
+        elif char == "!":
+            is_open = True
+        elif char in ["\\", "."]:
+            # Escape for + & the pre-dot digit discard separator don't match anything themselves
+            continue
+        else:
+            return None
+    if is_set or len(masks) == 0:
+        return None
+    return tuple(masks), is_open
+
+
+def pattern_contains(masks, is_open, other_masks, other_open):
+    """Check every string matched by the other compiled pattern is also matched by this one"""
+    if is_open:
+        if len(other_masks) <= len(masks) and not (
+            other_open and len(other_masks) == len(masks)
+        ):
+            return False
+    elif other_open or len(other_masks) != len(masks):
+        return False
+    return all(
+        other_mask & mask == other_mask for mask, other_mask in zip(masks, other_masks)
+    )
+
+
+# Node in a PatternTrie, branches are keyed by digit position bitmask
+class PatternTrieNode:
+    __slots__ = [
+        "children",
+        "symbol_children",
+        "terminals",
+        "open_terminals",
+        "max_key",
+        "has_open",
+    ]
+
+    def __init__(self):
+        """Constructor initialises attributes"""
+        self.children = {}
+        self.symbol_children = None
+        self.terminals = []
+        self.open_terminals = []
+        self.max_key = None
+        self.has_open = False
+
+    def children_matching(self, mask):
+        """Return list of child nodes whose bitmask shares a symbol with mask"""
+        if mask & (mask - 1):
+            return [
+                child
+                for child_mask, child in self.children.items()
+                if child_mask & mask
+            ]
+        # Single symbol, e.g. a digit of a DN, use a lookup of children by symbol built on first use
+        if self.symbol_children is None:
+            self.symbol_children = {}
+            for child_mask, child in self.children.items():
+                for symbol in range(len(PATTERN_SYMBOLS)):
+                    if child_mask & (1 << symbol):
+                        self.symbol_children.setdefault(1 << symbol, []).append(child)
+        return self.symbol_children.get(mask, [])
+
+
+# Digit trie of dial plan patterns per partition, for overlap, shadowing & closest match analysis
+class PatternTrie:
+    def __init__(self, route_plan):
+        """Constructor builds a trie per partition from iterable of (pattern, partition), patterns that
+        can't be compiled are skipped"""
+        self.patterns = []
+        self.roots = {}
+
+        for pattern, partition in route_plan:
+            compiled = pattern_cache.get(pattern)
+            if compiled is None:
+                continue
+            masks, is_open = compiled
+            # Number of strings matched, fewest is the closest match, ! patterns match an unbounded number
+            num_matches = 1
+            for mask in masks:
+                num_matches *= bin(mask).count("1")
+            pattern_id = len(self.patterns)
+            key = (is_open, num_matches, pattern_id)
+            self.patterns.append((pattern, partition, masks, is_open, key))
+            node = self.roots.setdefault(partition, PatternTrieNode())
+            path = [node]
+            for mask in masks:
+                node = node.children.setdefault(mask, PatternTrieNode())
+                path.append(node)
+            if is_open:
+                node.open_terminals.append(pattern_id)
+            else:
+                node.terminals.append(pattern_id)
+            # Keep track of the widest pattern & any ! patterns below each node, for pruning searches
+            for path_node in path:
+                if path_node.max_key is None or key > path_node.max_key:
+                    path_node.max_key = key
+                path_node.has_open = path_node.has_open or is_open
+
+    def overlaps_of(self, pattern_id):
+        """Return list of ids of patterns in the same partition that match at least one string in common
+        with pattern_id & are wider than it, or end in ! on its path"""
+        pattern, partition, masks, is_open, key = self.patterns[pattern_id]
+        results = []
+        nodes = [self.roots[partition]]
+        for mask in masks:
+            next_nodes = []
+            for node in nodes:
+                if node.open_terminals:
+                    # ! patterns ending part way along match the remaining digits
+                    results.extend(p for p in node.open_terminals if p != pattern_id)
+                next_nodes.extend(
+                    child
+                    for child in node.children_matching(mask)
+                    if child.max_key > key or child.has_open
+                )
+            nodes = next_nodes
+        for node in nodes:
+            # Patterns of the same length are found from both sides, so only report the wider one
+            if is_open:
+                results.extend(
+                    p for p in node.open_terminals if self.patterns[p][4] > key
+                )
+            else:
+                results.extend(p for p in node.terminals if self.patterns[p][4] > key)
+        return results
+
+    def is_covered(self, masks, candidates, position=0):
+        """Check every string matched by masks from position onwards is matched by one of the
+        candidate patterns (all of the same length)"""
+        if position == len(masks):
+            return len(candidates) > 0
+        if not candidates:
+            return False
+        # Group the symbols at this position by which candidates match them
+        groups = {}
+        mask = masks[position]
+        for symbol in range(len(PATTERN_SYMBOLS)):
+            bit = 1 << symbol
+            if mask & bit:
+                matching = tuple(
+                    c for c in candidates if self.patterns[c][2][position] & bit
+                )
+                if not matching:
+                    return False
+                groups[matching] = True
+        return all(
+            self.is_covered(masks, list(matching), position + 1) for matching in groups
+        )
+
+    def find_overlaps(self):
+        """Return list of (pattern id, pattern id, relationship) for overlapping patterns in the same
+        partition, relationship is identical, contains or overlaps. Plus list of ids of patterns that
+        are shadowed, i.e. every string they match is matched more closely by other patterns
+        """
+        overlaps = []
+        narrower = {}
+        for pattern_id, (pattern, partition, masks, is_open, key) in enumerate(
+            self.patterns
+        ):
+            for other_id in self.overlaps_of(pattern_id):
+                other_masks, other_open = self.patterns[other_id][2:4]
+                if is_open == other_open and masks == other_masks:
+                    relationship = "identical"
+                elif pattern_contains(other_masks, other_open, masks, is_open):
+                    relationship = "contains"
+                else:
+                    relationship = "overlaps"
+                overlaps.append((other_id, pattern_id, relationship))
+                if not is_open and not other_open and len(masks) == len(other_masks):
+                    narrower.setdefault(other_id, []).append(pattern_id)
+
+        shadowed = [
+            pattern_id
+            for pattern_id, candidates in narrower.items()
+            if self.is_covered(self.patterns[pattern_id][2], candidates)
+        ]
+        return overlaps, sorted(shadowed)
+
+    def best_match(self, dialled, partitions=None):
+        """Return id of the closest matching pattern for a dialled string, searching partitions in the
+        order given (or all), or None if nothing matches"""
+        best = None
+        best_closeness = None
+        for partition in partitions if partitions is not None else self.roots:
+            if partition not in self.roots:
+                continue
+            nodes = [self.roots[partition]]
+            candidates = []
+            for position, char in enumerate(dialled):
+                if char not in PATTERN_SYMBOLS:
+                    return None
+                bit = 1 << PATTERN_SYMBOLS.index(char)
+                next_nodes = []
+                for node in nodes:
+                    candidates.extend(node.open_terminals)
+                    next_nodes.extend(node.children_matching(bit))
+                nodes = next_nodes
+            for node in nodes:
+                candidates.extend(node.terminals)
+            for candidate in candidates:
+                # Closest match is the fewest strings of the dialled length matched, earlier partition
+                # wins a tie
+                closeness = self.closeness(candidate, len(dialled))
+                if best is None or closeness < best_closeness:
+                    best = candidate
+                    best_closeness = closeness
+        return best
+
+    def closeness(self, pattern_id, length):
+        """Return number of strings of length matched by pattern_id, plus whether it ends in !"""
+        pattern, partition, masks, is_open, key = self.patterns[pattern_id]
+        if is_open:
+            return key[1] * 10 ** (length - len(masks)), True
+        return key[1], False
+
+
+# Bounded LRU cache of compiled patterns keyed by pattern text, dial plans repeat the same pattern in many
+# partitions & patterns are reused when switching between ranges
+class PatternCache:
+    def __init__(self, max_size=PATTERN_CACHE_SIZE):
+        """Constructor initialises attributes"""
+        self.max_size = max_size
+        self.compiled = OrderedDict()
+
+    def get(self, pattern):
+        """Return compiled pattern, compiling & caching it if not already cached"""
+        try:
+            self.compiled.move_to_end(pattern)
+            return self.compiled[pattern]
+        except KeyError:
+            compiled = compile_pattern(pattern)
+            self.compiled[pattern] = compiled
+            if len(self.compiled) > self.max_size:
+                self.compiled.popitem(last=False)
+            return compiled
+
+    def load(self, filename):
+        """Load previously saved compiled patterns from JSON file, if it exists"""
+        try:
+            with open(filename) as f:
+                for pattern, compiled in json.load(f):
+                    self.compiled[pattern] = (
+                        (tuple(compiled[0]), compiled[1]) if compiled else None
+                    )
+        except (FileNotFoundError, json.decoder.JSONDecodeError, TypeError, ValueError):
+            return
+        while len(self.compiled) > self.max_size:
+            self.compiled.popitem(last=False)
+
+    def save(self, filename):
+        """Save compiled patterns to JSON file, least recently used first"""
+        try:
+            with open(filename, "w") as f:
+                json.dump(list(self.compiled.items()), f)
+        except OSError:
+            pass
+
+
+pattern_cache = PatternCache()
+
+
+def expand_pattern(compiled, range_start, range_end):
+    """Return list of the digit strings a compiled pattern matches within the number range specified,
+    in ascending order. Only digits are expanded, so patterns matching * or # return an empty list & + is
+    ignored. Enumeration is pruned to the range, so wide patterns like XXXXXXXXXX are cheap
+    """
+    if compiled is None:
+        return []
+    plus_mask = 1 << PATTERN_SYMBOLS.index("+")
+    digit_lists = []
+    for mask in compiled[0]:
+        if mask == plus_mask:
+            continue
+        if mask & ~DIGITS_MASK:
+            # Strings containing * or # can't be parsed as an integer so return empty list as also
+            # not a valid PSTN number
+            return []
+        digit_lists.append([digit for digit in range(10) if mask & (1 << digit)])
+    num_digits = len(digit_lists)
+    if num_digits == 0:
+        return []
+    # Smallest & largest values of the remaining digits from each position, for pruning to the range
+    min_rest = [0] * (num_digits + 1)
+    max_rest = [0] * (num_digits + 1)
+    for position in range(num_digits - 1, -1, -1):
+        scale = 10 ** (num_digits - position - 1)
+        min_rest[position] = digit_lists[position][0] * scale + min_rest[position + 1]
+        max_rest[position] = digit_lists[position][-1] * scale + max_rest[position + 1]
+
+    numbers_in_use = []
+
+    def expand(position, value):
+        scale = 10 ** (num_digits - position)
+        if (
+            value * scale + max_rest[position] < range_start
+            or value * scale + min_rest[position] > range_end
+        ):
+            return
+        if position == num_digits:
+            numbers_in_use.append(str(value).zfill(num_digits))
+            return
+        for digit in digit_lists[position]:
+            expand(position + 1, value * 10 + digit)
+
+    expand(0, 0)
+    return numbers_in_use
+
+
+def parse_regex(pattern, range_start, range_end):
+    """Parse CUCM regex pattern and return list of the digit strings the regex matches within the
+    number range specified"""
+    # Plain DNs are the bulk of most Route Plans & don't need compiling
+    if pattern.isdigit() and pattern.isascii():
+        return [pattern] if range_start <= int(pattern) <= range_end else []
+    return expand_pattern(pattern_cache.get(pattern), range_start, range_end)
+
+
+def route_plan_csv_rows(csv_file):
+    """Generator of (pattern, partition) from each row of an open Route Plan Report CSV file, the columns
+    are found by name. csv.reader still splits every column of a row, but only the two are kept as rows
+    are read. Raises ValueError if the columns aren't found & IndexError for a short row
+    """
+    reader = csv.reader(csv_file)
+    header_row = next(reader, [])
+    pattern_index = None
+    partition_index = None
+    for index, column_header in enumerate(header_row):
+        if column_header in ("Pattern or URI", "Pattern/Directory Number"):
+            pattern_index = index
+        elif column_header == "Partition":
+            partition_index = index
+    if pattern_index is None or partition_index is None:
+        raise ValueError("Pattern or Partition column not found")
+    yield from map(itemgetter(pattern_index, partition_index), reader)
+
+
+# GUI and main code
+class GUIFrame(tk.Frame):
+    def __init__(self, parent):
+        """Constructor checks parameters and initialise variables"""
+        self.range_descriptions = []
+        self.numbers = []
+        self.input_filename = None
+        self.use_axl = False
+        self.axl_password = ""
+        self.route_plan = None
+        self.partition_patterns = None
+        self.axl_clusters = None
+        self.number_allocator = None
+
+        try:
+            with open("dialplan.json") as f:
+                self.json_data = json.load(f)
+                for range_data in self.json_data:
+                    try:
+                        if len(range_data["range_start"]) != len(
+                            range_data["range_end"]
+                        ):
+                            tk.messagebox.showerror(
+                                title="Error",
+                                message="The first and last numbers"
+                                " in range must be of equal length.",
+                            )
+                            sys.exit()
+                        elif int(range_data["range_start"]) >= int(
+                            range_data["range_end"]
+                        ):
+                            tk.messagebox.showerror(
+                                title="Error",
+                                message="The last number in range"
+                                " must be greater than the first.",
+                            )
+                            sys.exit()
+                    except (TypeError, ValueError, KeyError):
+                        tk.messagebox.showerror(
+                            title="Error",
+                            message="Number range parameters incorrect." " formatted.",
+                        )
+                        sys.exit()
+                    try:
+                        if not range_data["description"]:
+                            tk.messagebox.showerror(
+                                title="Error", message="Description must be specified."
+                            )
+                            sys.exit()
+                        self.range_descriptions.append(range_data["description"])
+                    except KeyError:
+                        tk.messagebox.showerror(
+                            title="Error", message="Description must be specified."
+                        )
+                        sys.exit()
+                    try:
+                        pass
+                        # Remove pass & uncomment to disallow DNs not in a partition
+                        # if not range_data["partition"]:
+                        #    tk.messagebox.showerror(title="Error", message="Partition must be specified.")
+                        #    sys.exit()
+                    except KeyError:
+                        tk.messagebox.showerror(
+                            title="Error", message="Partition must be specified."
+                        )
+                        sys.exit()
+                    try:
+                        read_classification(range_data)
+                    except (TypeError, ValueError, KeyError, AttributeError):
+                        tk.messagebox.showerror(
+                            title="Error",
+                            message="Number classification parameters incorrectly"
+                            " formatted.",
+                        )
+                        sys.exit()
+        except FileNotFoundError:
+            messagebox.showerror(title="Error", message="Unable to open JSON file.")
+            sys.exit()
+        except json.decoder.JSONDecodeError:
+            messagebox.showerror(title="Error", message="Unable to parse JSON file.")
+            sys.exit()
+
+        self.range_descriptions = sorted(self.range_descriptions)
+        for item in self.json_data:
+            if item["description"].upper() == self.range_descriptions[0].upper():
+                self.range_description = item["description"]
+                self.range_start = int(item["range_start"])
+                self.range_end = int(item["range_end"])
+                self.range_partition = item.get("partition", "")
+                self.classification_rules = read_classification(item)
+                self.directory_numbers = DirectoryNumbers(
+                    item["range_start"], item["range_end"]
+                )
+                break
+
+        tk.Frame.__init__(self, parent)
+        parent.geometry("320x480")
+        self.pack(fill=tk.BOTH, expand=True)
+        menu_bar = tk.Menu(self)
+        file_menu = tk.Menu(menu_bar, tearoff=0)
+        file_menu.add_command(label="Load AXL", command=self.open_json_file_dialog)
+        file_menu.add_command(label="Load CSV", command=self.open_csv_file_dialog)
+        file_menu.add_command(label="Export Unused DNs", command=self.export_unused_dns)
+        file_menu.add_separator()
+        file_menu.add_command(label="Exit", command=self.quit)
+        menu_bar.add_cascade(label="File", menu=file_menu)
+        analyse_menu = tk.Menu(menu_bar, tearoff=0)
+        analyse_menu.add_command(
+            label="Find Overlapping Patterns", command=self.find_overlaps
+        )
+        analyse_menu.add_command(label="Find Best Match", command=self.find_best_match)
+        analyse_menu.add_command(
+            label="Allocate Free Block", command=self.allocate_free_block
+        )
+        menu_bar.add_cascade(label="Analyse", menu=analyse_menu)
+        self.hide_premium = tk.BooleanVar()
+        options_menu = tk.Menu(menu_bar, tearoff=0)
+        options_menu.add_checkbutton(
+            label="Hide Premium Numbers", variable=self.hide_premium
+        )
+        self.collapse_runs = tk.BooleanVar()
+        options_menu.add_checkbutton(
+            label="Collapse Unused DN Ranges", variable=self.collapse_runs
+        )
+        menu_bar.add_cascade(label="Options", menu=options_menu)
+        parent.config(menu=menu_bar)
+        tk.Label(self, text="DN Range:").place(relx=0.4, rely=0.0, height=22, width=62)
+        self.range_combobox = ttk.Combobox(
+            self, values=self.range_descriptions, state="readonly"
+        )
+        self.range_combobox.current(0)
+        self.range_combobox.bind("<<ComboboxSelected>>", self.combobox_update)
+        self.range_combobox.place(relx=0.02, rely=0.042, relheight=0.06, relwidth=0.96)
+        tk.Button(self, text="Find Unused DNs", command=self.find_unused_dns).place(
+            relx=0.35, rely=0.12, height=22, width=100
+        )
+        self.unused_label_text = tk.StringVar()
+        self.unused_label_text.set("Unused DNs: ")
+        tk.Label(self, textvariable=self.unused_label_text).place(
+            relx=0.35, rely=0.18, height=22, width=110
+        )
+        list_box_frame = tk.Frame(self, bd=2, relief=tk.SUNKEN)
+        list_box_scrollbar_y = tk.Scrollbar(list_box_frame)
+        list_box_scrollbar_x = tk.Scrollbar(list_box_frame, orient=tk.HORIZONTAL)
+        self.list_box = tk.Listbox(
+            list_box_frame,
+            xscrollcommand=list_box_scrollbar_x.set,
+            yscrollcommand=list_box_scrollbar_y.set,
+        )
+        list_box_frame.place(relx=0.02, rely=0.22, relheight=0.73, relwidth=0.96)
+        list_box_scrollbar_y.place(relx=0.94, rely=0.0, relheight=1.0, relwidth=0.06)
+        list_box_scrollbar_x.place(relx=0.0, rely=0.94, relheight=0.06, relwidth=0.94)
+        self.list_box.place(relx=0.0, rely=0.0, relheight=0.94, relwidth=0.94)
+        list_box_scrollbar_y.config(command=self.list_box.yview)
+        list_box_scrollbar_x.config(command=self.list_box.xview)
+        self.entries_label_text = tk.StringVar()
+        self.entries_label_text.set("Dial Plan Entries Parsed: ")
+        tk.Label(self, textvariable=self.entries_label_text).place(
+            relx=0.21, rely=0.95, height=22, width=220
+        )
+
+    def read_axl(self):
+        """Read Route Plan via AXL, returns list of (pattern, partition) or None on error. Every cluster
+        in the AXL JSON file is queried concurrently & their Route Plans combined"""
+        try:
+            clusters = read_axl_json(self.input_filename)
+        except FileNotFoundError:
+            messagebox.showerror(title="Error", message="Unable to open JSON file.")
+            return None
+        except json.decoder.JSONDecodeError:
+            messagebox.showerror(title="Error", message="Unable to parse JSON file.")
+            return None
+        except AXLConfigError as e:
+            tk.messagebox.showerror(title="Error", message=str(e))
+            return None
+        self.axl_clusters = clusters
+
+        sql_statement = (
+            "SELECT n.dnorpattern, p.name FROM numplan n LEFT JOIN routepartition p ON "
+            "n.fkroutepartition=p.pkid ORDER BY n.pkid"
+        )
+
+        # Zeep & requests are only imported once a cluster is connected to, for fast startup
+        from axl_client import AXLConnection
+
+        def audit(axl_json):
+            axl = AXLConnection(axl_json, self.axl_password)
+            return axl.sql_query(sql_statement)
+
+        route_plan = []
+        for cluster, rows, error in fan_out(clusters, audit):
+            if error:
+                tk.messagebox.showerror(title="Error", message=f"{cluster}: {error}")
+                return None
+            for row in rows:
+                try:
+                    # Handle None results
+                    route_plan.append(
+                        (
+                            row["dnorpattern"] if row["dnorpattern"] else "",
+                            row["name"] if row["name"] else "",
+                        )
+                    )
+                except TypeError:
+                    continue
+        return route_plan
+
+    def read_csv_file(self):
+        """Read Route Plan Report CSV file, returns list of (pattern, partition) or None on error. The rows
+        are streamed from the file, the list is kept so switching ranges doesn't re-read it
+        """
+        try:
+            # encoding="utf-8-sig" is necessary for correct parsing fo UTF-8 encoding of CUCM Route
+            # Plan Report CSV file
+            with open(
+                self.input_filename,
+                encoding="utf-8-sig",
+                newline="",
+                buffering=CSV_BUFFER_SIZE,
+            ) as f:
+                return list(route_plan_csv_rows(f))
+        except FileNotFoundError:
+            tk.messagebox.showerror(title="Error", message="Unable to open CSV file.")
+            return None
+        except (ValueError, IndexError):
+            tk.messagebox.showerror(title="Error", message="Unable to parse CSV file.")
+            return None
+
+    def load_route_plan(self):
+        """Check AXL or CSV selected and hand over to correct method to read the Route Plan, which is kept
+        until another file is loaded so switching ranges doesn't re-read it"""
+        if self.route_plan is not None:
+            return self.route_plan
+        if self.use_axl:
+            if not self.input_filename:
+                tk.messagebox.showerror(title="Error", message="No AXL file selected.")
+                return None
+            else:
+                self.route_plan = self.read_axl()
+        else:
+            if not self.input_filename:
+                tk.messagebox.showerror(title="Error", message="No CSV file selected.")
+                return None
+            else:
+                with metrics.phase("csv_read"):
+                    self.route_plan = self.read_csv_file()
+        return self.route_plan
+
+    def mark_used_dns(self):
+        """Parse the Route Plan to mark numbers in the selected range as used, returns list of numbers
+        parsed or None on error"""
+        route_plan = self.load_route_plan()
+        if route_plan is None:
+            return None
+
+        # Patterns are grouped by partition once per Route Plan, so each range only looks up its own
+        if self.partition_patterns is None:
+            self.partition_patterns = {}
+            for pattern, partition in route_plan:
+                self.partition_patterns.setdefault(partition.upper(), []).append(
+                    pattern
+                )
+
+        # Update directory_numbers with numbers found to be in use
+        raw_route_plan = []
+        with metrics.phase("parsing"):
+            for pattern in self.partition_patterns.get(
+                self.range_partition.upper(), []
+            ):
+                for char_string in parse_regex(
+                    pattern, self.range_start, self.range_end
+                ):
+                    raw_route_plan.append(char_string)
+                    try:
+                        dn_index = self.directory_numbers.index(char_string)
+                        self.directory_numbers.is_used[dn_index] = True
+                    except (IndexError, ValueError):
+                        continue
+        return raw_route_plan
+
+    def unused_dn_rows(self):
+        """Yield unused numbers in the selected range as report rows, collapsed into runs of consecutive
+        numbers if selected"""
+        with metrics.phase("classification"):
+            self.directory_numbers.classify(self.classification_rules)
+        hide_tier = None
+        if self.hide_premium.get():
+            hide_tier = CLASSIFICATION_TIERS.index(
+                self.classification_rules["premium"].lower()
+            )
+        collapse_runs = self.collapse_runs.get()
+        numbers = self.directory_numbers.number
+        for first, last in self.directory_numbers.unused_runs(hide_tier):
+            if collapse_runs:
+                yield [numbers[first], numbers[last], last - first + 1]
+            else:
+                for num in range(first, last + 1):
+                    tier = self.directory_numbers.classification[num]
+                    yield [numbers[num], CLASSIFICATION_TIERS[tier].capitalize()]
+
+    def find_unused_dns(self):
+        """Parse the Route Plan to find unused numbers in the selected range"""
+        self.list_box.delete(0, tk.END)
+        metrics.reset()
+        raw_route_plan = self.mark_used_dns()
+        if raw_route_plan is None:
+            return
+
+        # Update TKinter display objects with results, in batches as large ranges can have many thousands
+        self.entries_label_text.set(
+            f"Dial Plan Entries Parsed: {str(len(raw_route_plan))}"
+        )
+        cntr = 0
+        batch = []
+        for row in self.unused_dn_rows():
+            if len(row) == 3:
+                cntr += row[2]
+                if row[2] > 1:
+                    batch.append(f"{row[0]} - {row[1]} / {self.range_partition}")
+                else:
+                    batch.append(f"{row[0]} / {self.range_partition}")
+            else:
+                cntr += 1
+                if row[1] != CLASSIFICATION_TIERS[0].capitalize():
+                    batch.append(f"{row[0]} / {self.range_partition} / {row[1]}")
+                else:
+                    batch.append(f"{row[0]} / {self.range_partition}")
+            if len(batch) == LISTBOX_BATCH_SIZE:
+                with metrics.phase("rendering"):
+                    self.list_box.insert(tk.END, *batch)
+                batch = []
+        if batch:
+            with metrics.phase("rendering"):
+                self.list_box.insert(tk.END, *batch)
+        self.unused_label_text.set(f"Unused DNs: {str(cntr)}")
+        # Metrics are only written for AXL, the metrics_file is configured in the AXL JSON
+        if self.use_axl and self.axl_clusters and not write_metrics(self.axl_clusters):
+            tk.messagebox.showerror(
+                title="Error", message="Unable to write metrics file."
+            )
+
+    def export_unused_dns(self):
+        """Write unused numbers in the selected range to CSV file, collapsed into runs if selected"""
+        output_filename = tk.filedialog.asksaveasfilename(
+            initialdir="/",
+            defaultextension=".csv",
+            filetypes=(("CSV files", "*.csv"), ("All files", "*.*")),
+        )
+        if not output_filename:
+            tk.messagebox.showerror(title="Error", message="No output file selected.")
+            return
+        raw_route_plan = self.mark_used_dns()
+        if raw_route_plan is None:
+            return
+
+        if self.collapse_runs.get():
+            header_row = ["First DN", "Last DN", "Count", "Partition"]
+        else:
+            header_row = ["DN", "Classification", "Partition"]
+        try:
+            with open(
+                output_filename, "w", newline="", encoding="utf-8-sig"
+            ) as csv_file:
+                writer = csv.writer(csv_file)
+                writer.writerow(header_row)
+                for row in self.unused_dn_rows():
+                    writer.writerow(row + [self.range_partition])
+        except OSError:
+            tk.messagebox.showerror(title="Error", message="Unable to write CSV file.")
+
+    def allocate_free_block(self):
+        """Prompt for a block size & reserve the first block of that many consecutive unused numbers in
+        the selected range, so repeated allocations hand out different blocks until the range is reloaded
+        """
+        block_size = tk.simpledialog.askinteger("Input", "Block Size?", minvalue=1)
+        if not block_size:
+            return
+        self.list_box.delete(0, tk.END)
+        if self.number_allocator is None:
+            raw_route_plan = self.mark_used_dns()
+            if raw_route_plan is None:
+                return
+            self.entries_label_text.set(
+                f"Dial Plan Entries Parsed: {str(len(raw_route_plan))}"
+            )
+            self.number_allocator = NumberAllocator(self.directory_numbers)
+
+        free_block = self.number_allocator.reserve(block_size, "GUI")
+        if free_block is None:
+            self.list_box.insert(tk.END, f"No free block of {str(block_size)}")
+        else:
+            self.list_box.insert(
+                tk.END, f"{free_block[0]} - {free_block[-1]} / {self.range_partition}"
+            )
+        self.unused_label_text.set(
+            f"Utilisation: {self.number_allocator.utilisation():.1%}"
+        )
+
+    def find_overlaps(self):
+        """List patterns that are shadowed by or overlap other patterns in the same partition"""
+        self.list_box.delete(0, tk.END)
+        route_plan = self.load_route_plan()
+        if route_plan is None:
+            return
+
+        pattern_trie = PatternTrie(route_plan)
+        overlaps, shadowed = pattern_trie.find_overlaps()
+        for pattern_id in shadowed:
+            pattern, partition = pattern_trie.patterns[pattern_id][:2]
+            self.list_box.insert(tk.END, f"{pattern} / {partition} is shadowed")
+        for pattern_id, other_id, relationship in overlaps:
+            pattern, partition = pattern_trie.patterns[pattern_id][:2]
+            other_pattern = pattern_trie.patterns[other_id][0]
+            self.list_box.insert(
+                tk.END, f"{pattern} {relationship} {other_pattern} / {partition}"
+            )
+        self.entries_label_text.set(
+            f"Dial Plan Entries Parsed: {str(len(pattern_trie.patterns))}"
+        )
+        self.unused_label_text.set(f"Overlaps: {str(len(overlaps))}")
+
+    def find_best_match(self):
+        """Prompt for a dialled string & show the closest matching pattern in the Route Plan"""
+        dialled = tk.simpledialog.askstring("Input", "Dialled Digits?")
+        if not dialled:
+            return
+        self.list_box.delete(0, tk.END)
+        route_plan = self.load_route_plan()
+        if route_plan is None:
+            return
+
+        pattern_trie = PatternTrie(route_plan)
+        pattern_id = pattern_trie.best_match(dialled)
+        if pattern_id is None:
+            self.list_box.insert(tk.END, f"{dialled}: no match")
+        else:
+            pattern, partition = pattern_trie.patterns[pattern_id][:2]
+            self.list_box.insert(tk.END, f"{dialled}: {pattern} / {partition}")
+        self.entries_label_text.set(
+            f"Dial Plan Entries Parsed: {str(len(pattern_trie.patterns))}"
+        )
+
+    def open_csv_file_dialog(self):
+        """Dialogue to prompt for CSV file to open"""
+        self.input_filename = tk.filedialog.askopenfilename(
+            initialdir="/", filetypes=(("CSV files", "*.csv"), ("All files", "*.*"))
+        )
+        self.use_axl = False
+        self.axl_password = ""
+        self.route_plan = None
+        self.partition_patterns = None
+        self.axl_clusters = None
+        self.number_allocator = None
+
+    def open_json_file_dialog(self):
+        """Dialogue to prompt for JSON file to open and AXL password"""
+        self.input_filename = tk.filedialog.askopenfilename(
+            initialdir="/", filetypes=(("JSON files", "*.json"), ("All files", "*.*"))
+        )
+        self.use_axl = True
+        self.axl_password = tk.simpledialog.askstring(
+            "Input", "AXL Password?", show="*"
+        )
+        self.route_plan = None
+        self.partition_patterns = None
+        self.axl_clusters = None
+        self.number_allocator = None
+
+    def combobox_update(self, event):
+        """Populate range variables when Combobox item selected"""
+        self.list_box.delete(0, tk.END)
+        self.unused_label_text.set("Unused DNs: ")
+        self.entries_label_text.set("Dial Plan Entries Parsed: ")
+        value = self.range_combobox.get()
+        for item in self.json_data:
+            if item["description"].upper() == value.upper():
+                self.range_description = item["description"]
+                self.range_start = int(item["range_start"])
+                self.range_end = int(item["range_end"])
+                self.range_partition = item["partition"]
+                self.classification_rules = read_classification(item)
+                self.directory_numbers = DirectoryNumbers(
+                    item["range_start"], item["range_end"]
+                )
+                self.number_allocator = None
+                break
+
+
+if __name__ == "__main__":
+    # Initialise TKinter GUI objects
+    root = tk.Tk()
+    root.title("Dial Plan Analyser v1.14")
+    if PATTERN_CACHE_FILE:
+        pattern_cache.load(PATTERN_CACHE_FILE)
+    GUIFrame(root)
+    root.mainloop()
+    if PATTERN_CACHE_FILE:
+        pattern_cache.save(PATTERN_CACHE_FILE)
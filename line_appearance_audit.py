@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2026, Chris Perkins
+Licence: BSD 3-Clause
+
+Single pass compliance audit of every line appearance on phones (tkclass=1) & device profiles (tkclass=254).
+Fetches the columns needed by the External Phone Number Mask, Line Text Label & DN recording checks in one
+AXL SQL query per cluster, then runs all three checks over the same rows. Writes one CSV file per check, in
+the same format as the individual tools so their update functions can use them.
+Number mask ranges are read from dialplan.json, mask check is skipped if it's not found.
+Recording check is only run if a CSV file of DNs is given, the AXL config JSON then also requires
+recording_profiles & application_user.
+
+v1.2 - Zeep & requests only imported once a cluster is connected to, for fast startup
+v1.1 - added phase timing & SOAP latency metrics, written to the metrics_file in the AXL JSON
+v1.0 - initial release
+
+Original AXL SQL query code courtesy of Jonathan Els - https://afterthenumber.com/2018/04/27/serializing-thin-axl-sql-query-responses-with-python-zeep/
+"""
+
+import sys, json, csv
+from getpass import getpass
+from axl_common import (
+    AXLConfigError,
+    check_label,
+    check_mask,
+    check_recording,
+    fan_out,
+    metrics,
+    read_axl_json,
+    read_recording_config,
+    write_metrics,
+)
+
+# Union of the columns used by each check, LEFT JOINs so lines missing privacy or recording config
+# are still mask & label checked. dn_recording_checker INNER JOINs them, so the recording check skips lines
+# missing either, to report the same lines
+SQL_STATEMENT = (
+    "SELECT d.name, d.description, d.tkclass, d.tkstatus_builtinbridge, n.dnorpattern, "
+    "n.description AS ndescription, n.alertingname, p.name AS pname, dnmap.pkid, dnmap.numplanindex, "
+    "dnmap.e164mask, dnmap.display, dnmap.label, dnmap.fkrecordingprofile, dnmap.tkpreferredmediasource, "
+    "dpd.pkid AS dpdpkid, dpd.tkstatus_callinfoprivate, rd.pkid AS rdpkid, rd.tkrecordingflag "
+    "FROM device d INNER JOIN devicenumplanmap dnmap ON dnmap.fkdevice=d.pkid INNER JOIN numplan n "
+    "ON dnmap.fknumplan=n.pkid LEFT JOIN routepartition p ON n.fkroutepartition=p.pkid "
+    "LEFT JOIN deviceprivacydynamic dpd ON dpd.fkdevice=d.pkid "
+    "LEFT JOIN recordingdynamic rd ON rd.fkdevicenumplanmap=dnmap.pkid "
+    "WHERE (d.tkclass=1 OR d.tkclass=254) ORDER BY d.name, dnmap.pkid"
+)
+MASK_HEADER = [
+    "DN",
+    "Partition",
+    "Device Name",
+    "Device Description",
+    "Number Mask",
+    "New Number Mask",
+    "pkid",
+    "Cluster",
+]
+LABEL_HEADER = [
+    "Device Name",
+    "DN",
+    "Alerting Name",
+    "Display Name",
+    "Line Text Label",
+    "New Line Label",
+    "pkid",
+    "Cluster",
+]
+RECORDING_HEADER = [
+    "Device Name",
+    "Device Description",
+    "DN",
+    "DN Description",
+    "AppUser Association",
+    "Comments",
+    "Cluster",
+]
+
+
+def field(row, column):
+    """Return column of row, handling None results"""
+    return row[column] if row[column] else ""
+
+
+def read_dialplan_json(filename):
+    """Read number mask ranges from dialplan.json, returns list of ranges or None if the file isn't found.
+    Raises json.decoder.JSONDecodeError or AXLConfigError"""
+    try:
+        with open(filename) as f:
+            json_data = json.load(f)
+    except FileNotFoundError:
+        return None
+    for range_data in json_data:
+        try:
+            if len(range_data["range_start"]) != len(range_data["range_end"]):
+                raise AXLConfigError(
+                    "The first and last numbers in range must be of equal length."
+                )
+            elif int(range_data["range_start"]) >= int(range_data["range_end"]):
+                raise AXLConfigError(
+                    "The last number in range must be greater than the first."
+                )
+        except (TypeError, ValueError, KeyError):
+            raise AXLConfigError("Number range parameters incorrectly formatted.")
+        if not range_data.get("mask"):
+            raise AXLConfigError("Number mask must be specified.")
+        if not range_data.get("partition"):
+            raise AXLConfigError("Partition must be specified.")
+    return json_data
+
+
+def audit_cluster(axl_json, password, mask_ranges, dn_list):
+    """Run every check over the line appearances of one cluster, returns lists of mask, label & recording
+    results"""
+    # Zeep & requests are only imported once a cluster is connected to, for fast startup
+    from axl_client import AXLConnection
+
+    axl = AXLConnection(axl_json, password)
+    app_user_devices = None
+    rp_pkids = None
+    if dn_list is not None:
+        app_user_devices, rp_pkids = read_recording_config(axl, axl_json)
+
+    rows = axl.sql_query(SQL_STATEMENT)
+    with metrics.phase("filtering"):
+        return check_rows(rows, mask_ranges, dn_list, app_user_devices, rp_pkids)
+
+
+def check_rows(rows, mask_ranges, dn_list, app_user_devices, rp_pkids):
+    """Run every check over line appearance rows, returns lists of mask, label & recording results"""
+    if dn_list is not None:
+        recording_results = {dn: [] for dn in dn_list}
+    mask_results = []
+    label_results = []
+    for row in rows:
+        if row is None:
+            continue
+        # External Phone Number Mask check is only for primary DNs
+        if mask_ranges is not None and row["numplanindex"] == "1":
+            correct_mask = check_mask(row, mask_ranges)
+            if correct_mask is not None:
+                mask_results.append(
+                    [
+                        field(row, "dnorpattern"),
+                        field(row, "pname"),
+                        field(row, "name"),
+                        field(row, "description"),
+                        field(row, "e164mask"),
+                        correct_mask,
+                        field(row, "pkid"),
+                    ]
+                )
+        new_label = check_label(row)
+        if new_label is not None:
+            label_results.append(
+                [
+                    field(row, "name"),
+                    field(row, "dnorpattern"),
+                    field(row, "alertingname"),
+                    field(row, "display"),
+                    field(row, "label"),
+                    new_label,
+                    field(row, "pkid"),
+                ]
+            )
+        if (
+            dn_list is not None
+            and row["dnorpattern"] in recording_results
+            and row["dpdpkid"]
+            and row["rdpkid"]
+        ):
+            result = check_recording(row, app_user_devices, rp_pkids)
+            if result:
+                recording_results[row["dnorpattern"]].append(result)
+
+    # Order as the individual tools do, mask by DN & recording in the order of the DN list
+    mask_results.sort(key=lambda result: result[0])
+    if dn_list is None:
+        return mask_results, label_results, None
+    return (
+        mask_results,
+        label_results,
+        [result for dn in dn_list for result in recording_results[dn]],
+    )
+
+
+def write_report(filename, header_row, results):
+    """Write results of a check to CSV file"""
+    try:
+        with open(filename, "w", newline="", encoding="utf-8-sig") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(header_row)
+            writer.writerows(results)
+    except OSError:
+        print(f"Error: Unable to write CSV file {filename}.")
+
+
+def main():
+    """Program entry point, reads config"""
+    if len(sys.argv) not in (3, 4):
+        print(
+            f"Usage: {sys.argv[0]} <AXL config JSON> <output filename prefix> [DN list CSV]"
+        )
+        sys.exit(1)
+
+    # Load JSON configuration parameters
+    required_keys = None
+    if len(sys.argv) == 4:
+        required_keys = {
+            "recording_profiles": "Recording profile(s) must be specified.",
+            "application_user": "Application username must be specified.",
+        }
+    try:
+        clusters = read_axl_json(sys.argv[1], required_keys=required_keys)
+    except FileNotFoundError:
+        print(f"Error: Unable to open JSON config file {sys.argv[1]}.")
+        sys.exit(1)
+    except json.decoder.JSONDecodeError:
+        print(f"Error: Unable to parse JSON config file {sys.argv[1]}.")
+        sys.exit(1)
+    except AXLConfigError as e:
+        print(f"Config Error: {e}")
+        sys.exit(1)
+    for axl_json in clusters:
+        if "recording_profiles" in axl_json:
+            axl_json["recording_profiles"] = [
+                i.upper() for i in axl_json["recording_profiles"]
+            ]
+    try:
+        mask_ranges = read_dialplan_json("dialplan.json")
+    except json.decoder.JSONDecodeError:
+        print("Error: Unable to parse JSON file dialplan.json.")
+        sys.exit(1)
+    except AXLConfigError as e:
+        print(f"Config Error: {e}")
+        sys.exit(1)
+    if mask_ranges is None:
+        print("dialplan.json not found, skipping number mask check.")
+
+    dn_list = None
+    if len(sys.argv) == 4:
+        try:
+            with open(sys.argv[3], encoding="utf-8-sig") as f:
+                reader = csv.reader(f)
+                dn_list = [row[0] for row in reader if row]
+        except FileNotFoundError:
+            print(f"Error: Unable to open CSV file {sys.argv[3]}.")
+            sys.exit(1)
+
+    password = getpass("Password: ")
+
+    # Audit every cluster concurrently
+    def audit(axl_json):
+        return audit_cluster(axl_json, password, mask_ranges, dn_list)
+
+    mask_results = []
+    label_results = []
+    recording_results = []
+    for cluster, result, error in fan_out(clusters, audit):
+        if error:
+            print(f"{cluster}, error: {error}")
+            continue
+        mask_results.extend(row + [cluster] for row in result[0])
+        label_results.extend(row + [cluster] for row in result[1])
+        if result[2] is not None:
+            recording_results.extend(row + [cluster] for row in result[2])
+
+    # Write one report per check & summarise
+    prefix = sys.argv[2]
+    with metrics.phase("csv_write"):
+        if mask_ranges is not None:
+            write_report(f"{prefix}_number_masks.csv", MASK_HEADER, mask_results)
+        write_report(f"{prefix}_line_labels.csv", LABEL_HEADER, label_results)
+        if dn_list is not None:
+            write_report(
+                f"{prefix}_dn_recording.csv", RECORDING_HEADER, recording_results
+            )
+    if mask_ranges is not None:
+        print(f"{len(mask_results)} External Phone Number Masks not matching.")
+    print(f"{len(label_results)} Line Text Labels not including the DN.")
+    if dn_list is not None:
+        print(f"{len(recording_results)} lines with recording config missing.")
+    if not write_metrics(clusters):
+        print("Error: Unable to write metrics file.")
+
+
+if __name__ == "__main__":
+    main()
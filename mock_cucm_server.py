@@ -0,0 +1,733 @@
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2026, Chris Perkins
+Licence: BSD 3-Clause
+
+Local stand-in for a CUCM publisher's AXL & RisPort70 SOAP services, for load testing & profiling the tools
+offline. Answers executeSQLQuery, executeSQLUpdate, listPhone & selectCmDeviceExt from a synthetic cluster of
+configurable size, with optional latency, request throttling & row limit faults, plus optional gzip of
+responses when the client accepts it & a bandwidth limit, to measure transfers over a WAN.
+The tools connect to https://<fqdn>:8443, so run with a certificate & set the fqdn in the AXL JSON to
+localhost, e.g. create a self-signed certificate with:
+openssl req -x509 -newkey rsa:2048 -nodes -keyout key.pem -out cert.pem -days 365 -subj /CN=localhost
+Use --write-wsdl to save the AXL WSDL for the wsdl_file in the AXL JSON.
+SQL is understood only as far as the queries the tools make, a SELECT's columns are filled in from the
+synthetic lines, Route Plan, application user & recording profiles by table & column name. Pages by SKIP &
+FIRST are sorted by the ORDER BY columns with ties in random order, as Informix doesn't keep the order of
+ties between queries, so a paged query without a unique sort key repeats & misses rows as it would on CUCM.
+
+v1.2 - added gzip of responses & bandwidth limit
+v1.1 - added SKIP & FIRST paging of SELECTs
+v1.0 - initial release
+"""
+
+import argparse, gzip, itertools, random, re, ssl, threading, time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.sax.saxutils import escape
+from lxml import etree
+
+SOAP_ENV_NS = "http://schemas.xmlsoap.org/soap/envelope/"
+AXL_NS = "http://www.cisco.com/AXL/API/14.0"
+RIS_NS = "http://schemas.cisco.com/ast/soap"
+RANGE_START = 1000000
+PARTITION = "PT_INTERNAL"
+NUMBER_MASK = "+4420700XXXXX"
+RECORDING_PROFILE_PKID = "00000000-0000-4000-8000-00000000a001"
+# Gzip compression level, as Tomcat uses by default, & size of the writes when limiting bandwidth
+GZIP_LEVEL = 6
+BANDWIDTH_CHUNK_BYTES = 16384
+APPLICATION_USER = "recorder"
+
+AXL_WSDL = f"""<?xml version="1.0" encoding="UTF-8"?>
+<definitions xmlns="http://schemas.xmlsoap.org/wsdl/" xmlns:soap="http://schemas.xmlsoap.org/wsdl/soap/"
+    xmlns:xsd="http://www.w3.org/2001/XMLSchema" xmlns:axlapi="{AXL_NS}"
+    xmlns:s0="http://www.cisco.com/AXLAPIService/" targetNamespace="http://www.cisco.com/AXLAPIService/">
+  <types>
+    <xsd:schema targetNamespace="{AXL_NS}" elementFormDefault="unqualified">
+      <xsd:element name="executeSQLQuery">
+        <xsd:complexType><xsd:sequence><xsd:element name="sql" type="xsd:string"/></xsd:sequence></xsd:complexType>
+      </xsd:element>
+      <xsd:element name="executeSQLQueryResponse">
+        <xsd:complexType><xsd:sequence><xsd:element name="return"><xsd:complexType><xsd:sequence>
+          <xsd:element name="row" type="xsd:anyType" minOccurs="0" maxOccurs="unbounded"/>
+        </xsd:sequence></xsd:complexType></xsd:element></xsd:sequence>
+          <xsd:attribute name="sequence" type="xsd:unsignedLong"/></xsd:complexType>
+      </xsd:element>
+      <xsd:element name="executeSQLUpdate">
+        <xsd:complexType><xsd:sequence><xsd:element name="sql" type="xsd:string"/></xsd:sequence></xsd:complexType>
+      </xsd:element>
+      <xsd:element name="executeSQLUpdateResponse">
+        <xsd:complexType><xsd:sequence><xsd:element name="return"><xsd:complexType><xsd:sequence>
+          <xsd:element name="rowsUpdated" type="xsd:int"/>
+        </xsd:sequence></xsd:complexType></xsd:element></xsd:sequence>
+          <xsd:attribute name="sequence" type="xsd:unsignedLong"/></xsd:complexType>
+      </xsd:element>
+      <xsd:element name="listPhone">
+        <xsd:complexType><xsd:sequence>
+          <xsd:element name="searchCriteria"><xsd:complexType><xsd:sequence>
+            <xsd:element name="name" type="xsd:string" minOccurs="0"/>
+          </xsd:sequence></xsd:complexType></xsd:element>
+          <xsd:element name="returnedTags"><xsd:complexType><xsd:sequence>
+            <xsd:element name="name" type="xsd:string" minOccurs="0"/>
+          </xsd:sequence></xsd:complexType></xsd:element>
+          <xsd:element name="skip" type="xsd:unsignedLong" minOccurs="0"/>
+          <xsd:element name="first" type="xsd:unsignedLong" minOccurs="0"/>
+        </xsd:sequence></xsd:complexType>
+      </xsd:element>
+      <xsd:element name="listPhoneResponse">
+        <xsd:complexType><xsd:sequence><xsd:element name="return"><xsd:complexType><xsd:sequence>
+          <xsd:element name="phone" minOccurs="0" maxOccurs="unbounded"><xsd:complexType>
+            <xsd:sequence><xsd:element name="name" type="xsd:string" minOccurs="0"/></xsd:sequence>
+            <xsd:attribute name="uuid" type="xsd:string"/>
+          </xsd:complexType></xsd:element>
+        </xsd:sequence></xsd:complexType></xsd:element></xsd:sequence>
+          <xsd:attribute name="sequence" type="xsd:unsignedLong"/></xsd:complexType>
+      </xsd:element>
+    </xsd:schema>
+  </types>
+  <message name="executeSQLQueryIn"><part element="axlapi:executeSQLQuery" name="axlParams"/></message>
+  <message name="executeSQLQueryOut"><part element="axlapi:executeSQLQueryResponse" name="axlParams"/></message>
+  <message name="executeSQLUpdateIn"><part element="axlapi:executeSQLUpdate" name="axlParams"/></message>
+  <message name="executeSQLUpdateOut"><part element="axlapi:executeSQLUpdateResponse" name="axlParams"/></message>
+  <message name="listPhoneIn"><part element="axlapi:listPhone" name="axlParams"/></message>
+  <message name="listPhoneOut"><part element="axlapi:listPhoneResponse" name="axlParams"/></message>
+  <portType name="AXLPort">
+    <operation name="executeSQLQuery"><input message="s0:executeSQLQueryIn"/><output message="s0:executeSQLQueryOut"/></operation>
+    <operation name="executeSQLUpdate"><input message="s0:executeSQLUpdateIn"/><output message="s0:executeSQLUpdateOut"/></operation>
+    <operation name="listPhone"><input message="s0:listPhoneIn"/><output message="s0:listPhoneOut"/></operation>
+  </portType>
+  <binding name="AXLAPIBinding" type="s0:AXLPort">
+    <soap:binding style="document" transport="http://schemas.xmlsoap.org/soap/http"/>
+    <operation name="executeSQLQuery"><soap:operation soapAction="CUCM:DB ver=14.0 executeSQLQuery" style="document"/>
+      <input><soap:body use="literal"/></input><output><soap:body use="literal"/></output></operation>
+    <operation name="executeSQLUpdate"><soap:operation soapAction="CUCM:DB ver=14.0 executeSQLUpdate" style="document"/>
+      <input><soap:body use="literal"/></input><output><soap:body use="literal"/></output></operation>
+    <operation name="listPhone"><soap:operation soapAction="CUCM:DB ver=14.0 listPhone" style="document"/>
+      <input><soap:body use="literal"/></input><output><soap:body use="literal"/></output></operation>
+  </binding>
+  <service name="AXLAPIService">
+    <port binding="s0:AXLAPIBinding" name="AXLAPIService"><soap:address location="https://localhost:8443/axl/"/></port>
+  </service>
+</definitions>
+"""
+
+RIS_WSDL = f"""<?xml version="1.0" encoding="UTF-8"?>
+<definitions xmlns="http://schemas.xmlsoap.org/wsdl/" xmlns:soap="http://schemas.xmlsoap.org/wsdl/soap/"
+    xmlns:xsd="http://www.w3.org/2001/XMLSchema" xmlns:tns="{RIS_NS}" targetNamespace="{RIS_NS}">
+  <types>
+    <xsd:schema targetNamespace="{RIS_NS}" elementFormDefault="qualified">
+      <xsd:complexType name="SelectItem"><xsd:sequence>
+        <xsd:element name="Item" type="xsd:string"/>
+      </xsd:sequence></xsd:complexType>
+      <xsd:complexType name="CmSelectionCriteria"><xsd:sequence>
+        <xsd:element name="MaxReturnedDevices" type="xsd:unsignedInt" minOccurs="0"/>
+        <xsd:element name="DeviceClass" type="xsd:string" minOccurs="0"/>
+        <xsd:element name="Model" type="xsd:unsignedInt" minOccurs="0"/>
+        <xsd:element name="Status" type="xsd:string" minOccurs="0"/>
+        <xsd:element name="NodeName" type="xsd:string" minOccurs="0"/>
+        <xsd:element name="SelectBy" type="xsd:string" minOccurs="0"/>
+        <xsd:element name="SelectItems" minOccurs="0"><xsd:complexType><xsd:sequence>
+          <xsd:element name="item" type="tns:SelectItem" minOccurs="0" maxOccurs="unbounded"/>
+        </xsd:sequence></xsd:complexType></xsd:element>
+        <xsd:element name="Protocol" type="xsd:string" minOccurs="0"/>
+        <xsd:element name="DownloadStatus" type="xsd:string" minOccurs="0"/>
+      </xsd:sequence></xsd:complexType>
+      <xsd:complexType name="IPAddressArrayType"><xsd:sequence>
+        <xsd:element name="IP" type="xsd:string"/>
+        <xsd:element name="IPAddrType" type="xsd:string"/>
+        <xsd:element name="Attribute" type="xsd:string"/>
+      </xsd:sequence></xsd:complexType>
+      <xsd:complexType name="CmDevice"><xsd:sequence>
+        <xsd:element name="Name" type="xsd:string"/>
+        <xsd:element name="DirNumber" type="xsd:string" minOccurs="0"/>
+        <xsd:element name="DeviceClass" type="xsd:string" minOccurs="0"/>
+        <xsd:element name="Status" type="xsd:string" minOccurs="0"/>
+        <xsd:element name="IPAddress" minOccurs="0"><xsd:complexType><xsd:sequence>
+          <xsd:element name="item" type="tns:IPAddressArrayType" minOccurs="0" maxOccurs="unbounded"/>
+        </xsd:sequence></xsd:complexType></xsd:element>
+      </xsd:sequence></xsd:complexType>
+      <xsd:complexType name="CmNode"><xsd:sequence>
+        <xsd:element name="ReturnCode" type="xsd:string"/>
+        <xsd:element name="Name" type="xsd:string"/>
+        <xsd:element name="NoChange" type="xsd:boolean"/>
+        <xsd:element name="CmDevices"><xsd:complexType><xsd:sequence>
+          <xsd:element name="item" type="tns:CmDevice" minOccurs="0" maxOccurs="unbounded"/>
+        </xsd:sequence></xsd:complexType></xsd:element>
+      </xsd:sequence></xsd:complexType>
+      <xsd:element name="selectCmDeviceExt"><xsd:complexType><xsd:sequence>
+        <xsd:element name="StateInfo" type="xsd:string"/>
+        <xsd:element name="CmSelectionCriteria" type="tns:CmSelectionCriteria"/>
+      </xsd:sequence></xsd:complexType></xsd:element>
+      <xsd:element name="selectCmDeviceExtResponse"><xsd:complexType><xsd:sequence>
+        <xsd:element name="selectCmDeviceReturn"><xsd:complexType><xsd:sequence>
+          <xsd:element name="SelectCmDeviceResult"><xsd:complexType><xsd:sequence>
+            <xsd:element name="TotalDevicesFound" type="xsd:unsignedInt"/>
+            <xsd:element name="CmNodes"><xsd:complexType><xsd:sequence>
+              <xsd:element name="item" type="tns:CmNode" minOccurs="0" maxOccurs="unbounded"/>
+            </xsd:sequence></xsd:complexType></xsd:element>
+          </xsd:sequence></xsd:complexType></xsd:element>
+          <xsd:element name="StateInfo" type="xsd:string"/>
+        </xsd:sequence></xsd:complexType></xsd:element>
+      </xsd:sequence></xsd:complexType></xsd:element>
+    </xsd:schema>
+  </types>
+  <message name="selectCmDeviceExtIn"><part element="tns:selectCmDeviceExt" name="parameters"/></message>
+  <message name="selectCmDeviceExtOut"><part element="tns:selectCmDeviceExtResponse" name="parameters"/></message>
+  <portType name="RisPortType">
+    <operation name="selectCmDeviceExt"><input message="tns:selectCmDeviceExtIn"/><output message="tns:selectCmDeviceExtOut"/></operation>
+  </portType>
+  <binding name="RisBinding" type="tns:RisPortType">
+    <soap:binding style="document" transport="http://schemas.xmlsoap.org/soap/http"/>
+    <operation name="selectCmDeviceExt"><soap:operation soapAction="selectCmDeviceExt"/>
+      <input><soap:body use="literal"/></input><output><soap:body use="literal"/></output></operation>
+  </binding>
+  <service name="RISService70">
+    <port binding="tns:RisBinding" name="RisPort70"><soap:address location="https://localhost:8443/realtimeservice2/services/RISService70"/></port>
+  </service>
+</definitions>
+"""
+
+
+class MockFault(Exception):
+    """SOAP fault to return to the client, with the HTTP status to send it with"""
+
+    def __init__(self, message, status=500):
+        """Constructor initialises attributes"""
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+# Synthetic cluster, lines & Route Plan entries are generated from their index so millions of rows take
+# no memory, only values changed by executeSQLUpdate are stored
+class SyntheticCluster:
+    def __init__(self, num_lines, num_route_plan, error_rate):
+        """Constructor initialises attributes"""
+        self.num_lines = num_lines
+        self.num_route_plan = num_route_plan
+        self.error_rate = error_rate
+        self.updates = {}
+        self.lock = threading.Lock()
+
+    def is_error(self, index, salt):
+        """Deterministically pick a proportion of error_rate of the lines to be non-compliant"""
+        return (index * 2654435761 + salt * 40503) % 1000 < self.error_rate * 1000
+
+    def line_pkid(self, index):
+        """Return devicenumplanmap pkid of line index"""
+        return f"{index:08x}-0000-4000-8000-{index:012x}"
+
+    def line_index(self, pkid):
+        """Return line index of a devicenumplanmap pkid, or None if not a line"""
+        match = re.fullmatch(r"([0-9a-f]{8})-0000-4000-8000-[0-9a-f]{12}", pkid)
+        if match is None or int(match.group(1), 16) >= self.num_lines:
+            return None
+        return int(match.group(1), 16)
+
+    def line(self, index):
+        """Return dictionary of table.column to value for line index, one line per phone or device profile"""
+        dn = str(RANGE_START + index)
+        first_name = f"First{index}"
+        last_name = f"Last{index}"
+        # Every tenth line is on a device profile, a few lines have no recordingdynamic row
+        is_profile = index % 10 == 9
+        no_recording = self.is_error(index, 7)
+        line = {
+            "device.pkid": f"{index:08x}-0000-4000-8000-d{index:011x}",
+            "device.name": f"UDP{index:09d}" if is_profile else f"SEP{index:012X}",
+            "device.description": f"{first_name} {last_name} {dn}",
+            "device.tkclass": "254" if is_profile else "1",
+            "device.tkstatus_builtinbridge": "0" if self.is_error(index, 1) else "1",
+            "numplan.pkid": f"{index:08x}-0000-4000-8000-e{index:011x}",
+            "numplan.dnorpattern": dn,
+            "numplan.description": f"{first_name} {last_name}",
+            "numplan.alertingname": f"{first_name} {last_name}",
+            "routepartition.name": PARTITION,
+            "devicenumplanmap.pkid": self.line_pkid(index),
+            "devicenumplanmap.numplanindex": "1",
+            "devicenumplanmap.e164mask": "" if self.is_error(index, 2) else NUMBER_MASK,
+            "devicenumplanmap.display": f"{first_name} {last_name}",
+            "devicenumplanmap.label": (
+                f"{first_name} {last_name}"
+                if self.is_error(index, 3)
+                else f"{first_name[0]} {last_name}-{dn}"
+            ),
+            "devicenumplanmap.fkrecordingprofile": (
+                None if self.is_error(index, 4) else RECORDING_PROFILE_PKID
+            ),
+            "devicenumplanmap.tkpreferredmediasource": "2",
+            "deviceprivacydynamic.pkid": f"{index:08x}-0000-4000-8000-b{index:011x}",
+            "deviceprivacydynamic.tkstatus_callinfoprivate": "0",
+            "recordingdynamic.pkid": (
+                None if no_recording else f"{index:08x}-0000-4000-8000-c{index:011x}"
+            ),
+            "recordingdynamic.tkrecordingflag": (
+                None if no_recording else "0" if self.is_error(index, 5) else "1"
+            ),
+        }
+        with self.lock:
+            line.update(self.updates.get(line["devicenumplanmap.pkid"], {}))
+        return line
+
+    def route_plan_entry(self, index):
+        """Return dictionary of table.column to value for Route Plan entry index, a mix of DNs & patterns"""
+        if index % 20 == 19:
+            pattern = f"{RANGE_START // 1000 + index % 900}XXX"
+            partition = "PT_PATTERNS"
+        else:
+            pattern = str(RANGE_START + index)
+            partition = PARTITION
+        return {
+            "numplan.pkid": f"{index:08x}-0000-4000-8000-f{index:011x}",
+            "numplan.dnorpattern": pattern,
+            "numplan.description": "",
+            "routepartition.name": partition,
+        }
+
+    def update(self, table, column, value, pkid):
+        """Update a devicenumplanmap column of a line, returns number of rows updated"""
+        index = self.line_index(pkid)
+        if table != "devicenumplanmap" or index is None:
+            return 0
+        with self.lock:
+            self.updates.setdefault(pkid, {})[f"{table}.{column}"] = value
+        return 1
+
+    def is_phone(self, name):
+        """Check name is a phone in the cluster"""
+        match = re.fullmatch(r"SEP([0-9A-F]{12})", name)
+        return match is not None and int(match.group(1), 16) < self.num_lines
+
+
+def split_columns(select_list):
+    """Return list of (table alias, column, output tag) from the column list of a SELECT"""
+    columns = []
+    for column in select_list.split(","):
+        match = re.fullmatch(
+            r"\s*(?:(\w+)\.)?(\w+)(?:\s+AS\s+(\w+))?\s*", column, re.IGNORECASE
+        )
+        if match:
+            alias, name, tag = match.groups()
+            columns.append((alias, name.lower(), (tag or name).lower()))
+    return columns
+
+
+def table_aliases(sql_statement):
+    """Return dictionary of alias to table name for the tables in FROM & JOIN clauses"""
+    aliases = {}
+    for table, alias in re.findall(
+        r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?!ON\b|INNER\b|LEFT\b|WHERE\b|ORDER\b)(\w+))?",
+        sql_statement,
+        re.IGNORECASE,
+    ):
+        aliases[table.lower()] = table.lower()
+        if alias:
+            aliases[alias.lower()] = table.lower()
+    return aliases
+
+
+def order_key(sql_statement, aliases, default_table):
+    """Return function giving the sort key of a record for the ORDER BY of a SELECT, ties are broken at
+    random so their order differs between queries"""
+    match = re.search(r"\bORDER BY\s+(.*)$", sql_statement, re.IGNORECASE)
+    names = [
+        f"{aliases.get(alias, default_table) if alias else default_table}.{name}"
+        for alias, name, _ in split_columns(match.group(1) if match else "")
+    ]
+
+    def key(record):
+        return tuple(record.get(name) or "" for name in names) + (random.random(),)
+
+    return key
+
+
+def line_filter(sql_statement):
+    """Return function checking a line matches the WHERE conditions the tools use"""
+    where = sql_statement.split(" WHERE ", 1)[-1] if " WHERE " in sql_statement else ""
+    dn_match = re.search(r"n\.dnorpattern='([^']*)'", where)
+    ranges = re.findall(r"BETWEEN '(\d+)' AND '(\d+)'", where)
+    primary_only = "numplanindex=1" in where
+    label_filter = "INSTR(" in where.upper()
+    # A line without a row in an INNER JOINed table isn't returned
+    inner_tables = {
+        table.lower()
+        for table in re.findall(r"\bINNER JOIN (\w+)", sql_statement, re.IGNORECASE)
+    }
+
+    def is_match(line):
+        dn = line["numplan.dnorpattern"]
+        if any(line.get(f"{table}.pkid", "") is None for table in inner_tables):
+            return False
+        if dn_match and dn != dn_match.group(1):
+            return False
+        if ranges and not any(
+            len(dn) == len(start) and start <= dn <= end for start, end in ranges
+        ):
+            return False
+        if primary_only and line["devicenumplanmap.numplanindex"] != "1":
+            return False
+        if label_filter and dn in (line["devicenumplanmap.label"] or ""):
+            return False
+        return True
+
+    return is_match
+
+
+# SOAP request handler & main code
+class MockCUCMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    cluster = None
+    latency = 0.0
+    max_rows = 0
+    throttle = None
+
+    def log_message(self, format, *args):
+        """Only log requests when verbose"""
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_xml(self, body, status=200):
+        """Send XML response, gzipped if enabled & accepted by the client, at the bandwidth limit if set"""
+        data = body.encode("utf-8")
+        compress = self.server.compress and re.search(
+            r"\bgzip\b", self.headers.get("Accept-Encoding", "")
+        )
+        if compress:
+            data = gzip.compress(data, compresslevel=GZIP_LEVEL)
+        self.send_response(status)
+        self.send_header("Content-Type", "text/xml; charset=utf-8")
+        if compress:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if not self.server.bandwidth:
+            self.wfile.write(data)
+            return
+        # Each response is sent at the bandwidth limit, as over a WAN link
+        for start in range(0, len(data), BANDWIDTH_CHUNK_BYTES):
+            chunk = data[start : start + BANDWIDTH_CHUNK_BYTES]
+            self.wfile.write(chunk)
+            time.sleep(len(chunk) / self.server.bandwidth)
+
+    def do_GET(self):
+        """Serve the WSDLs"""
+        if self.path.startswith("/realtimeservice2/services/RISService70"):
+            self.send_xml(RIS_WSDL)
+        elif self.path.startswith("/axl"):
+            self.send_xml(AXL_WSDL)
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        """Dispatch a SOAP request to the operation in its body"""
+        request = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        try:
+            self.server.check_throttle()
+            body = etree.fromstring(request).find(f"{{{SOAP_ENV_NS}}}Body")
+            operation = body[0]
+            handler = {
+                "executeSQLQuery": self.execute_sql_query,
+                "executeSQLUpdate": self.execute_sql_update,
+                "listPhone": self.list_phone,
+                "selectCmDeviceExt": self.select_cm_device_ext,
+            }.get(etree.QName(operation).localname)
+            if handler is None:
+                raise MockFault(f"Unknown operation {operation.tag}")
+            self.send_xml(envelope(handler(operation)))
+        except MockFault as e:
+            self.send_xml(fault_envelope(e.message), e.status)
+        except (etree.XMLSyntaxError, TypeError, IndexError):
+            self.send_xml(fault_envelope("Unable to parse request"), 500)
+
+    def execute_sql_query(self, operation):
+        """Answer a SELECT from the synthetic cluster"""
+        sql_statement = " ".join(operation.findtext("sql", "").split())
+        match = re.match(
+            r"SELECT\s+(?:SKIP\s+(\d+)\s+)?(?:FIRST\s+(\d+)\s+)?(.*?)\s+FROM\s",
+            sql_statement,
+            re.IGNORECASE,
+        )
+        if match is None:
+            raise MockFault("A syntax error has occurred.")
+        skip, first, select_list = match.groups()
+        columns = split_columns(select_list)
+        aliases = table_aliases(sql_statement)
+        tables = set(aliases.values())
+        default_table = aliases.get(
+            re.search(r"\bFROM\s+(\w+)", sql_statement, re.IGNORECASE).group(1).lower()
+        )
+        cluster = self.server.cluster
+
+        if "applicationuserdevicemap" in tables:
+            # Application user is associated with all but the error rate of phones
+            records = (
+                cluster.line(index)
+                for index in range(cluster.num_lines)
+                if not cluster.is_error(index, 6)
+            )
+        elif "recordingprofile" in tables:
+            records = [
+                {
+                    "recordingprofile.pkid": RECORDING_PROFILE_PKID,
+                    "recordingprofile.name": "Recording Profile",
+                }
+            ]
+        elif "device" in tables:
+            is_match = line_filter(sql_statement)
+            records = (
+                line
+                for line in map(cluster.line, range(cluster.num_lines))
+                if is_match(line)
+            )
+        elif tables == {"devicenumplanmap"}:
+            records = []
+            for pkid in re.findall(r"'([^']*)'", sql_statement.split(" WHERE ", 1)[-1]):
+                index = cluster.line_index(pkid)
+                if index is not None:
+                    records.append(cluster.line(index))
+        elif "numplan" in tables:
+            records = map(cluster.route_plan_entry, range(cluster.num_route_plan))
+        else:
+            records = []
+
+        rows = []
+        # Pages are sorted so they're only consistent if the ORDER BY ends in a unique key
+        if skip is not None:
+            records = sorted(
+                records, key=order_key(sql_statement, aliases, default_table)
+            )
+        records = itertools.islice(
+            records, int(skip or 0), int(skip or 0) + int(first) if first else None
+        )
+        for record in records:
+            row = ["<row>"]
+            for alias, name, tag in columns:
+                table = aliases.get(alias, default_table) if alias else default_table
+                value = record.get(f"{table}.{name}")
+                if value is None:
+                    row.append(f"<{tag}/>")
+                else:
+                    row.append(f"<{tag}>{escape(value)}</{tag}>")
+            row.append("</row>")
+            rows.append("".join(row))
+            if self.server.max_rows and len(rows) > self.server.max_rows:
+                total = len(rows) + sum(1 for _ in records)
+                raise MockFault(
+                    f"Query request too large. Total rows matched: {total} rows. "
+                    f"Suggestive Row Fetch: less than {self.server.max_rows} rows"
+                )
+        return (
+            f'<ns:executeSQLQueryResponse xmlns:ns="{AXL_NS}"><return>'
+            + "".join(rows)
+            + "</return></ns:executeSQLQueryResponse>"
+        )
+
+    def execute_sql_update(self, operation):
+        """Apply an UPDATE of one column by pkid to the synthetic cluster"""
+        sql_statement = " ".join(operation.findtext("sql", "").split())
+        match = re.fullmatch(
+            r"UPDATE (\w+) SET (\w+)='((?:[^']|'')*)' WHERE pkid='([^']*)'",
+            sql_statement,
+            re.IGNORECASE,
+        )
+        if match is None:
+            raise MockFault("A syntax error has occurred.")
+        table, column, value, pkid = match.groups()
+        rows_updated = self.server.cluster.update(
+            table.lower(), column.lower(), value.replace("''", "'"), pkid
+        )
+        return (
+            f'<ns:executeSQLUpdateResponse xmlns:ns="{AXL_NS}"><return>'
+            f"<rowsUpdated>{rows_updated}</rowsUpdated></return></ns:executeSQLUpdateResponse>"
+        )
+
+    def list_phone(self, operation):
+        """List phones whose name matches the searchCriteria, % is a wildcard"""
+        name = operation.findtext("searchCriteria/name", "%")
+        name_regex = re.compile(
+            ".*".join(re.escape(part) for part in name.split("%")), re.IGNORECASE
+        )
+        skip = int(operation.findtext("skip") or 0)
+        first = int(operation.findtext("first") or 0)
+        cluster = self.server.cluster
+        phones = []
+        for index in range(cluster.num_lines):
+            if index % 10 == 9:
+                continue
+            phone_name = f"SEP{index:012X}"
+            if name_regex.fullmatch(phone_name):
+                phones.append(
+                    f'<phone uuid="{{{cluster.line(index)["device.pkid"].upper()}}}">'
+                    f"<name>{phone_name}</name></phone>"
+                )
+        if first:
+            phones = phones[skip : skip + first]
+        else:
+            phones = phones[skip:]
+        return (
+            f'<ns:listPhoneResponse xmlns:ns="{AXL_NS}"><return>'
+            + "".join(phones)
+            + "</return></ns:listPhoneResponse>"
+        )
+
+    def select_cm_device_ext(self, operation):
+        """Return registration of the phones in SelectItems, all but the error rate are registered"""
+        ris = f"{{{RIS_NS}}}"
+        cluster = self.server.cluster
+        devices = []
+        for item in operation.iter(f"{ris}Item"):
+            name = item.text or ""
+            if not cluster.is_phone(name):
+                continue
+            index = int(name[3:], 16)
+            if cluster.is_error(index, 7):
+                continue
+            ip_address = f"127.{((index >> 16) & 127) + 128}.{(index >> 8) & 255}.{index & 255 or 1}"
+            devices.append(
+                f"<ns:item><ns:Name>{name}</ns:Name><ns:DirNumber>{RANGE_START + index}-Registered"
+                f"</ns:DirNumber><ns:DeviceClass>Phone</ns:DeviceClass><ns:Status>Registered</ns:Status>"
+                f"<ns:IPAddress><ns:item><ns:IP>{ip_address}</ns:IP><ns:IPAddrType>ipv4</ns:IPAddrType>"
+                f"<ns:Attribute>Unknown</ns:Attribute></ns:item></ns:IPAddress></ns:item>"
+            )
+        return (
+            f'<ns:selectCmDeviceExtResponse xmlns:ns="{RIS_NS}"><ns:selectCmDeviceReturn>'
+            f"<ns:SelectCmDeviceResult><ns:TotalDevicesFound>{len(devices)}</ns:TotalDevicesFound>"
+            f"<ns:CmNodes><ns:item><ns:ReturnCode>Ok</ns:ReturnCode><ns:Name>localhost</ns:Name>"
+            f"<ns:NoChange>false</ns:NoChange><ns:CmDevices>{''.join(devices)}</ns:CmDevices>"
+            f"</ns:item></ns:CmNodes></ns:SelectCmDeviceResult><ns:StateInfo></ns:StateInfo>"
+            f"</ns:selectCmDeviceReturn></ns:selectCmDeviceExtResponse>"
+        )
+
+
+def envelope(body):
+    """Wrap body in a SOAP envelope"""
+    return (
+        f'<?xml version="1.0" encoding="UTF-8"?><soapenv:Envelope xmlns:soapenv="{SOAP_ENV_NS}">'
+        f"<soapenv:Body>{body}</soapenv:Body></soapenv:Envelope>"
+    )
+
+
+def fault_envelope(message):
+    """Return SOAP fault envelope in the form CUCM uses for AXL errors"""
+    return envelope(
+        f"<soapenv:Fault><faultcode>soapenv:Server</faultcode><faultstring>{escape(message)}</faultstring>"
+        f"<detail><axlError><axlcode>-1</axlcode><axlmessage>{escape(message)}</axlmessage>"
+        f"<request>executeSQLQuery</request></axlError></detail></soapenv:Fault>"
+    )
+
+
+class MockCUCMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address,
+        cluster,
+        latency=0.0,
+        max_rows=0,
+        max_requests_a_minute=0,
+        compress=False,
+        bandwidth=0.0,
+        verbose=False,
+    ):
+        """Constructor initialises attributes"""
+        super().__init__(address, MockCUCMHandler)
+        self.cluster = cluster
+        self.latency = latency
+        self.max_rows = max_rows
+        self.max_requests_a_minute = max_requests_a_minute
+        self.compress = compress
+        # Bytes a second
+        self.bandwidth = bandwidth
+        self.verbose = verbose
+        self.request_times = deque()
+        self.throttle_lock = threading.Lock()
+
+    def check_throttle(self):
+        """Raise fault if requests in the last minute exceed the limit, as CUCM does when throttling"""
+        if self.max_requests_a_minute <= 0:
+            return
+        with self.throttle_lock:
+            now = time.monotonic()
+            while self.request_times and now - self.request_times[0] >= 60.0:
+                self.request_times.popleft()
+            if len(self.request_times) >= self.max_requests_a_minute:
+                raise MockFault(
+                    "AXL Web Service is throttled, too many requests. Retry later", 503
+                )
+            self.request_times.append(now)
+
+
+def main():
+    """Program entry point, parses arguments & runs server until interrupted"""
+    parser = argparse.ArgumentParser(description="Mock CUCM AXL & RisPort70 server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8443)
+    parser.add_argument("--certfile", help="PEM certificate, serves HTTPS if given")
+    parser.add_argument("--keyfile", help="PEM private key for the certificate")
+    parser.add_argument("--lines", type=int, default=10000, help="Number of lines")
+    parser.add_argument(
+        "--route-plan", type=int, default=10000, help="Number of Route Plan entries"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.05, help="Proportion non-compliant"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Seconds to delay each response"
+    )
+    parser.add_argument(
+        "--max-rows", type=int, default=0, help="Fault queries returning more rows"
+    )
+    parser.add_argument(
+        "--max-requests-a-minute",
+        type=int,
+        default=0,
+        help="Throttle with faults above this rate",
+    )
+    parser.add_argument(
+        "--gzip", action="store_true", help="Gzip responses if the client accepts it"
+    )
+    parser.add_argument(
+        "--bandwidth",
+        type=float,
+        default=0.0,
+        help="Megabits a second each response is sent at, to simulate a WAN",
+    )
+    parser.add_argument("--write-wsdl", help="Save AXL WSDL to this file & exit")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    if args.write_wsdl:
+        with open(args.write_wsdl, "w", encoding="utf-8") as f:
+            f.write(AXL_WSDL)
+        return
+
+    server = MockCUCMServer(
+        (args.host, args.port),
+        SyntheticCluster(args.lines, args.route_plan, args.error_rate),
+        latency=args.latency,
+        max_rows=args.max_rows,
+        max_requests_a_minute=args.max_requests_a_minute,
+        compress=args.gzip,
+        bandwidth=args.bandwidth * 1000000 / 8,
+        verbose=args.verbose,
+    )
+    scheme = "http"
+    if args.certfile:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(args.certfile, args.keyfile)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        scheme = "https"
+    print(f"Mock CUCM listening on {scheme}://{args.host}:{args.port}/axl/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
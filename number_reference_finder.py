@@ -1,305 +1,466 @@
-#!/usr/bin/env python3
-
-"""
-Copyright (c) 2018 - 2019, Chris Perkins
-Licence: BSD 3-Clause
-
-Checks NumPlan for CFA, CFB, CFNA, CFNC, CFUR, AAR Destination Mask or Called Party Transformation
-that reference a given number, SQL wildcard % can be used
-
-v1.2 - code tidying
-v1.1 - fixes some edge cases
-v1.0 - original release
-
-Original AXL SQL query code courtesy of Jonathan Els - https://afterthenumber.com/2018/04/27/serializing-thin-axl-sql-query-responses-with-python-zeep/
-
-To Do:
-Improve the GUI
-"""
-
-import sys, json
-import tkinter as tk
-import requests
-from tkinter import ttk
-from tkinter import filedialog, simpledialog, messagebox
-from collections import OrderedDict
-from zeep import Client
-from zeep.cache import SqliteCache
-from zeep.transports import Transport
-from zeep.plugins import HistoryPlugin
-from zeep.exceptions import Fault
-from zeep.helpers import serialize_object
-from requests import Session
-from requests.auth import HTTPBasicAuth
-from urllib3 import disable_warnings
-from urllib3.exceptions import InsecureRequestWarning
-from lxml import etree
-
-# GUI and main code
-class GUIFrame(tk.Frame):
-
-    # tkPatternUsage Mappings
-    pattern_usage = {
-        "0": "Call Park",
-        "1": "Conference",
-        "2": "Directory Number",
-        "3": "Translation Pattern",
-        "4": "Call Pick Up Group",
-        "5": "Route Pattern",
-        "6": "Message Waiting",
-        "7": "Hunt Pilot",
-        "8": "Voice Mail Port",
-        "9": "Domain Routing",
-        "10": "IP Address Routing",
-        "11": "Device Template",
-        "12": "Directed Call Park",
-        "13": "Device Intercom",
-        "14": "Translation Intercom",
-        "15": "Translation Calling Party Number",
-        "16": "Mobility Handoff",
-        "17": "Mobility Enterprise Feature Access",
-        "18": "Mobility IVR",
-        "19": "Device Intercom Template",
-        "20": "Called Party Number Transformation",
-        "21": "Call Control Discovery Learned Pattern",
-        "22": "URI Routing",
-        "23": "ILS Learned Enterprise Number",
-        "24": "ILS Learned E164 Number",
-        "25": "ILS Learned Enterprise Numeric Pattern",
-        "26": "ILS Learned E164 Numeric Pattern",
-        "27": "Alternate Number",
-        "28": "ILS Learned URI",
-        "29": "ILS Learned PSTN Failover Rule",
-        "30": "ILS Imported E164 Number",
-        "104": "Centralized Conference Number",
-        "105": "Emergency Location ID Number",
-    }
-
-    def __init__(self, parent):
-        """Constructor checks parameters and initialise variables"""
-        self.input_filename = None
-        self.axl_password = ""
-        tk.Frame.__init__(self, parent)
-        parent.geometry("320x480")
-        self.pack(fill=tk.BOTH, expand=True)
-        menu_bar = tk.Menu(self)
-        file_menu = tk.Menu(menu_bar, tearoff=0)
-        file_menu.add_command(label="Load AXL", command=self.open_json_file_dialog)
-        file_menu.add_separator()
-        file_menu.add_command(label="Exit", command=self.quit)
-        menu_bar.add_cascade(label="File", menu=file_menu)
-        parent.config(menu=menu_bar)
-        tk.Label(self, text="Number Pattern to Find:").place(
-            relx=0.2, rely=0.0, height=22, width=200
-        )
-        self.search_pattern_text = tk.StringVar()
-        tk.Entry(self, textvariable=self.search_pattern_text).place(
-            relx=0.2, rely=0.05, height=22, width=200
-        )
-        tk.Button(self, text="Find References", command=self.find_references).place(
-            relx=0.35, rely=0.12, height=22, width=100
-        )
-        self.records_label_text = tk.StringVar()
-        self.records_label_text.set("Dial Plan Records: ")
-        tk.Label(self, textvariable=self.records_label_text).place(
-            relx=0.35, rely=0.18, height=22, width=110
-        )
-        list_box_frame = tk.Frame(self, bd=2, relief=tk.SUNKEN)
-        list_box_scrollbar_y = tk.Scrollbar(list_box_frame)
-        list_box_scrollbar_x = tk.Scrollbar(list_box_frame, orient=tk.HORIZONTAL)
-        self.list_box = tk.Listbox(
-            list_box_frame,
-            xscrollcommand=list_box_scrollbar_x.set,
-            yscrollcommand=list_box_scrollbar_y.set,
-        )
-        list_box_frame.place(relx=0.02, rely=0.22, relheight=0.75, relwidth=0.96)
-        list_box_scrollbar_y.place(relx=0.94, rely=0.0, relheight=1.0, relwidth=0.06)
-        list_box_scrollbar_x.place(relx=0.0, rely=0.94, relheight=0.06, relwidth=0.94)
-        self.list_box.place(relx=0.0, rely=0.0, relheight=0.94, relwidth=0.94)
-        list_box_scrollbar_y.config(command=self.list_box.yview)
-        list_box_scrollbar_x.config(command=self.list_box.xview)
-
-    def element_list_to_ordered_dict(self, elements):
-        """Convert list to OrderedDict"""
-        return [
-            OrderedDict((element.tag, element.text) for element in row)
-            for row in elements
-        ]
-
-    def sql_query(self, service, sql_statement):
-        """Execute SQL query via AXL and return results"""
-        try:
-            axl_resp = service.executeSQLQuery(sql=sql_statement)
-            try:
-                return self.element_list_to_ordered_dict(
-                    serialize_object(axl_resp)["return"]["rows"]
-                )
-            except KeyError:
-                # Single tuple response
-                return self.element_list_to_ordered_dict(
-                    serialize_object(axl_resp)["return"]["row"]
-                )
-            except TypeError:
-                # No SQL tuples
-                return serialize_object(axl_resp)["return"]
-        except requests.exceptions.ConnectionError as e:
-            tk.messagebox.showerror(title="Error", message=str(e))
-            return None
-
-    def read_axl(self, search_string):
-        """Read and parse NumPlan via AXL"""
-        try:
-            self.list_box.delete(0, tk.END)
-            self.records_label_text.set("Dial Plan Records: ")
-            with open(self.input_filename) as f:
-                axl_json_data = json.load(f)
-                for axl_json in axl_json_data:
-                    try:
-                        if not axl_json["fqdn"]:
-                            tk.messagebox.showerror(
-                                title="Error", message="FQDN must be specified."
-                            )
-                            return
-                    except KeyError:
-                        tk.messagebox.showerror(
-                            title="Error", message="FQDN must be specified."
-                        )
-                        return
-                    try:
-                        if not axl_json["username"]:
-                            tk.messagebox.showerror(
-                                title="Error", message="Username must be specified."
-                            )
-                            return
-                    except KeyError:
-                        tk.messagebox.showerror(
-                            title="Error", message="Username must be specified."
-                        )
-                        return
-                    try:
-                        if not axl_json["wsdl_file"]:
-                            tk.messagebox.showerror(
-                                title="Error", message="WSDL file must be specified."
-                            )
-                            return
-                    except KeyError:
-                        tk.messagebox.showerror(
-                            title="Error", message="WSDL file must be specified."
-                        )
-                        return
-        except FileNotFoundError:
-            messagebox.showerror(title="Error", message="Unable to open JSON file.")
-            return
-        except json.decoder.JSONDecodeError:
-            messagebox.showerror(title="Error", message="Unable to parse JSON file.")
-            return
-
-        sql_statement = (
-            f"SELECT n.DNOrPattern, n.Description, n.tkPatternUsage FROM NumPlan n LEFT JOIN "
-            f"CallForwardDynamic cfd ON cfd.fkNumPlan=n.pkid WHERE n.CFAptDestination LIKE '"
-            f"{search_string}' OR n.CFBDestination LIKE '"
-            f"{search_string}' OR n.CFBIntDestination LIKE '"
-            f"{search_string}' OR n.CFNADestination LIKE '"
-            f"{search_string}' OR n.CFNAIntDestination LIKE '"
-            f"{search_string}' OR n.PFFDestination LIKE '"
-            f"{search_string}' OR n.PFFIntDestination LIKE '"
-            f"{search_string}' OR n.CFURDestination LIKE '"
-            f"{search_string}' OR n.CFURIntDestination LIKE '"
-            f"{search_string}' OR n.AARDestinationMask LIKE '"
-            f"{search_string}' OR n.CalledPartyTransformationMask LIKE '"
-            f"{search_string}' OR cfd.CFADestination LIKE '"
-            f"{search_string}' ORDER BY n.DNOrPattern"
-        )
-        axl_binding_name = "{http://www.cisco.com/AXLAPIService/}AXLAPIBinding"
-        axl_address = f"https://{axl_json['fqdn']}:8443/axl/"
-        session = Session()
-        session.verify = False
-        session.auth = HTTPBasicAuth(axl_json["username"], self.axl_password)
-        transport = Transport(cache=SqliteCache(), session=session, timeout=60)
-        history = HistoryPlugin()
-        try:
-            client = Client(
-                wsdl=axl_json["wsdl_file"], transport=transport, plugins=[history]
-            )
-        except FileNotFoundError as e:
-            tk.messagebox.showerror(title="Error", message=str(e))
-            return
-        axl = client.create_service(axl_binding_name, axl_address)
-
-        # Update TKinter display objects with results
-        cntr = 0
-        try:
-            for row in self.sql_query(service=axl, sql_statement=sql_statement):
-                try:
-                    # Handle None results
-                    n_dnorpattern = row["dnorpattern"] if row["dnorpattern"] else ""
-                    n_description = row["description"] if row["description"] else ""
-                    n_tkpatternusage = (
-                        row["tkpatternusage"] if row["tkpatternusage"] else "2"
-                    )  # Assume DN if unknown
-                    self.list_box.insert(
-                        tk.END,
-                        f'{n_dnorpattern} "{n_description}", '
-                        f"{self.pattern_usage[n_tkpatternusage]}",
-                    )
-                    cntr += 1
-                except TypeError:
-                    continue
-        except TypeError:
-            pass
-        except Fault as thin_axl_error:
-            tk.messagebox.showerror(title="Error", message=thin_axl_error.message)
-            return
-        self.records_label_text.set(f"Dial Plan Records: {str(cntr)}")
-
-    def find_references(self):
-        """Validate parameters then call AXL query"""
-        if not self.input_filename:
-            tk.messagebox.showerror(title="Error", message="No AXL file selected.")
-            return
-        # Check for invalid characters
-        search_string = self.search_pattern_text.get()
-        if len(search_string) == 0:
-            tk.messagebox.showerror(title="Error", message="Search pattern is blank.")
-            return
-        for range_char in search_string:
-            if range_char not in [
-                "0",
-                "1",
-                "2",
-                "3",
-                "4",
-                "5",
-                "6",
-                "7",
-                "8",
-                "9",
-                "*",
-                "#",
-                "X",
-                "%",
-            ]:
-                tk.messagebox.showerror(
-                    title="Error", message="Invalid characters in search pattern."
-                )
-                return
-
-        self.read_axl(search_string)
-
-    def open_json_file_dialog(self):
-        """Dialogue to prompt for JSON file to open and AXL password"""
-        self.input_filename = tk.filedialog.askopenfilename(
-            initialdir="/", filetypes=(("JSON files", "*.json"), ("All files", "*.*"))
-        )
-        self.axl_password = tk.simpledialog.askstring(
-            "Input", "AXL Password?", show="*"
-        )
-
-
-if __name__ == "__main__":
-    disable_warnings(InsecureRequestWarning)
-    # Initialise TKinter GUI objects
-    root = tk.Tk()
-    root.title("Number Reference Finder v1.2")
-    GUIFrame(root)
-    root.mainloop()
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2018 - 2019, Chris Perkins
+Licence: BSD 3-Clause
+
+Checks NumPlan for CFA, CFB, CFNA, CFNC, CFUR, AAR Destination Mask or Called Party Transformation
+that reference a given number, SQL wildcard % can be used. The reference columns are pulled once via AXL
+into a local reverse index, so repeated searches don't re-scan NumPlan, use File > Refresh Index to re-pull.
+Batch Find resolves every number or pattern in the first column of a CSV file & outputs a combined report
+
+v1.8 - Zeep & requests only imported once a cluster is connected to, for fast startup
+v1.7 - added phase timing & SOAP latency metrics of the index build, written to the metrics_file in the AXL JSON
+v1.6 - results name the forwarding field(s) that matched
+v1.5 - added batch search of numbers & patterns from a CSV file
+v1.4 - searches a locally built reverse index instead of a 12 column LIKE query per search
+v1.3 - queries every cluster in the AXL JSON file concurrently
+v1.2 - code tidying
+v1.1 - fixes some edge cases
+v1.0 - original release
+
+Original AXL SQL query code courtesy of Jonathan Els - https://afterthenumber.com/2018/04/27/serializing-thin-axl-sql-query-responses-with-python-zeep/
+
+To Do:
+Improve the GUI
+"""
+
+import sys, json, csv, bisect, re
+import tkinter as tk
+from tkinter import ttk
+from tkinter import filedialog, simpledialog, messagebox
+from collections import OrderedDict
+from axl_common import (
+    AXLConfigError,
+    fan_out,
+    metrics,
+    read_axl_json,
+    write_metrics,
+)
+
+# NumPlan & CallForwardDynamic columns that can reference another number & their forward type
+REFERENCE_COLUMNS = OrderedDict(
+    [
+        ("n.CFAptDestination", "CF Alternate Party"),
+        ("n.CFBDestination", "CFB External"),
+        ("n.CFBIntDestination", "CFB Internal"),
+        ("n.CFNADestination", "CFNA External"),
+        ("n.CFNAIntDestination", "CFNA Internal"),
+        ("n.PFFDestination", "CFNC External"),
+        ("n.PFFIntDestination", "CFNC Internal"),
+        ("n.CFURDestination", "CFUR External"),
+        ("n.CFURIntDestination", "CFUR Internal"),
+        ("n.AARDestinationMask", "AAR Destination Mask"),
+        ("n.CalledPartyTransformationMask", "Called Party Transformation Mask"),
+        ("cfd.CFADestination", "CFA"),
+    ]
+)
+
+# Reverse index of every destination referenced in NumPlan
+class ReferenceIndex:
+    def __init__(self, rows):
+        """Constructor builds index of destination -> list of (entry index, column) from rows of
+        NumPlan entries with their reference columns"""
+        self.entries = []
+        self.references = {}
+        # AXL returns lower case column names without the table alias
+        self.column_keys = [
+            (column, column.split(".")[1].lower()) for column in REFERENCE_COLUMNS
+        ]
+
+        for row in rows:
+            try:
+                entry_index = len(self.entries)
+                # Handle None results
+                self.entries.append(
+                    (
+                        row["dnorpattern"] if row["dnorpattern"] else "",
+                        row["description"] if row["description"] else "",
+                        row["tkpatternusage"] if row["tkpatternusage"] else "2",
+                    )
+                )
+                for column, key in self.column_keys:
+                    destination = row[key]
+                    if destination:
+                        self.references.setdefault(destination, []).append(
+                            (entry_index, column)
+                        )
+            except (KeyError, TypeError):
+                continue
+        self.destinations = sorted(self.references)
+
+    def lookup(self, search_string):
+        """Return list of (dnorpattern, description, tkpatternusage, list of columns) referencing
+        destinations matching search_string, SQL wildcards % & _ can be used"""
+        wildcard_index = min(
+            [i for i in (search_string.find("%"), search_string.find("_")) if i >= 0],
+            default=-1,
+        )
+        if wildcard_index == -1:
+            # Exact match
+            destinations = [search_string] if search_string in self.references else []
+        else:
+            # Narrow to destinations with the literal prefix, then match the rest of the pattern
+            prefix = search_string[:wildcard_index]
+            first = bisect.bisect_left(self.destinations, prefix)
+            last = bisect.bisect_left(self.destinations, prefix + "\U0010ffff")
+            destinations = self.destinations[first:last]
+            if search_string != prefix + "%":
+                regex = re.compile(
+                    "".join(
+                        ".*" if char == "%" else "." if char == "_" else re.escape(char)
+                        for char in search_string
+                    ),
+                    re.DOTALL,
+                )
+                destinations = [d for d in destinations if regex.fullmatch(d)]
+
+        matches = OrderedDict()
+        for destination in destinations:
+            for entry_index, column in self.references[destination]:
+                columns = matches.setdefault(entry_index, [])
+                if column not in columns:
+                    columns.append(column)
+        return sorted(
+            (self.entries[entry_index] + (columns,))
+            for entry_index, columns in matches.items()
+        )
+
+
+# GUI and main code
+class GUIFrame(tk.Frame):
+
+    # tkPatternUsage Mappings
+    pattern_usage = {
+        "0": "Call Park",
+        "1": "Conference",
+        "2": "Directory Number",
+        "3": "Translation Pattern",
+        "4": "Call Pick Up Group",
+        "5": "Route Pattern",
+        "6": "Message Waiting",
+        "7": "Hunt Pilot",
+        "8": "Voice Mail Port",
+        "9": "Domain Routing",
+        "10": "IP Address Routing",
+        "11": "Device Template",
+        "12": "Directed Call Park",
+        "13": "Device Intercom",
+        "14": "Translation Intercom",
+        "15": "Translation Calling Party Number",
+        "16": "Mobility Handoff",
+        "17": "Mobility Enterprise Feature Access",
+        "18": "Mobility IVR",
+        "19": "Device Intercom Template",
+        "20": "Called Party Number Transformation",
+        "21": "Call Control Discovery Learned Pattern",
+        "22": "URI Routing",
+        "23": "ILS Learned Enterprise Number",
+        "24": "ILS Learned E164 Number",
+        "25": "ILS Learned Enterprise Numeric Pattern",
+        "26": "ILS Learned E164 Numeric Pattern",
+        "27": "Alternate Number",
+        "28": "ILS Learned URI",
+        "29": "ILS Learned PSTN Failover Rule",
+        "30": "ILS Imported E164 Number",
+        "104": "Centralized Conference Number",
+        "105": "Emergency Location ID Number",
+    }
+
+    def __init__(self, parent):
+        """Constructor checks parameters and initialise variables"""
+        self.input_filename = None
+        self.axl_password = ""
+        self.reference_indexes = OrderedDict()
+        self.failed_clusters = []
+        tk.Frame.__init__(self, parent)
+        parent.geometry("320x480")
+        self.pack(fill=tk.BOTH, expand=True)
+        menu_bar = tk.Menu(self)
+        file_menu = tk.Menu(menu_bar, tearoff=0)
+        file_menu.add_command(label="Load AXL", command=self.open_json_file_dialog)
+        file_menu.add_command(label="Refresh Index", command=self.refresh_index)
+        file_menu.add_separator()
+        file_menu.add_command(label="Exit", command=self.quit)
+        menu_bar.add_cascade(label="File", menu=file_menu)
+        parent.config(menu=menu_bar)
+        tk.Label(self, text="Number Pattern to Find:").place(
+            relx=0.2, rely=0.0, height=22, width=200
+        )
+        self.search_pattern_text = tk.StringVar()
+        tk.Entry(self, textvariable=self.search_pattern_text).place(
+            relx=0.2, rely=0.05, height=22, width=200
+        )
+        tk.Button(self, text="Find References", command=self.find_references).place(
+            relx=0.12, rely=0.12, height=22, width=110
+        )
+        tk.Button(self, text="Batch Find", command=self.batch_find_references).place(
+            relx=0.53, rely=0.12, height=22, width=110
+        )
+        self.records_label_text = tk.StringVar()
+        self.records_label_text.set("Dial Plan Records: ")
+        tk.Label(self, textvariable=self.records_label_text).place(
+            relx=0.35, rely=0.18, height=22, width=110
+        )
+        list_box_frame = tk.Frame(self, bd=2, relief=tk.SUNKEN)
+        list_box_scrollbar_y = tk.Scrollbar(list_box_frame)
+        list_box_scrollbar_x = tk.Scrollbar(list_box_frame, orient=tk.HORIZONTAL)
+        self.list_box = tk.Listbox(
+            list_box_frame,
+            xscrollcommand=list_box_scrollbar_x.set,
+            yscrollcommand=list_box_scrollbar_y.set,
+        )
+        list_box_frame.place(relx=0.02, rely=0.22, relheight=0.75, relwidth=0.96)
+        list_box_scrollbar_y.place(relx=0.94, rely=0.0, relheight=1.0, relwidth=0.06)
+        list_box_scrollbar_x.place(relx=0.0, rely=0.94, relheight=0.06, relwidth=0.94)
+        self.list_box.place(relx=0.0, rely=0.0, relheight=0.94, relwidth=0.94)
+        list_box_scrollbar_y.config(command=self.list_box.yview)
+        list_box_scrollbar_x.config(command=self.list_box.xview)
+
+    def build_indexes(self):
+        """Pull NumPlan reference columns via AXL once & build a ReferenceIndex per cluster, every
+        cluster in the AXL JSON file is queried concurrently. Clusters that failed are retried on the next
+        call & listed in failed_clusters. Returns True if indexes are available
+        """
+        if self.reference_indexes and not self.failed_clusters:
+            return True
+        metrics.reset()
+        try:
+            clusters = read_axl_json(self.input_filename)
+        except FileNotFoundError:
+            messagebox.showerror(title="Error", message="Unable to open JSON file.")
+            return False
+        except json.decoder.JSONDecodeError:
+            messagebox.showerror(title="Error", message="Unable to parse JSON file.")
+            return False
+        except AXLConfigError as e:
+            tk.messagebox.showerror(title="Error", message=str(e))
+            return False
+        # Clusters already indexed are kept, so only those that failed last time are queried again
+        clusters = [
+            axl_json
+            for axl_json in clusters
+            if axl_json["fqdn"] not in self.reference_indexes
+        ]
+
+        # Only NumPlan entries that reference something are needed
+        select_columns = ", ".join(REFERENCE_COLUMNS)
+        where_clause = " OR ".join(f"{column}<>''" for column in REFERENCE_COLUMNS)
+        sql_statement = (
+            f"SELECT n.DNOrPattern, n.Description, n.tkPatternUsage, {select_columns} FROM NumPlan n "
+            f"LEFT JOIN CallForwardDynamic cfd ON cfd.fkNumPlan=n.pkid WHERE {where_clause} "
+            f"ORDER BY n.pkid, cfd.pkid"
+        )
+
+        # Zeep & requests are only imported once a cluster is connected to, for fast startup
+        from axl_client import AXLConnection
+
+        def audit(axl_json):
+            axl = AXLConnection(axl_json, self.axl_password)
+            rows = axl.sql_query(sql_statement)
+            with metrics.phase("indexing"):
+                return ReferenceIndex(rows)
+
+        self.failed_clusters = []
+        for cluster, index, error in fan_out(clusters, audit):
+            if error:
+                self.failed_clusters.append(cluster)
+                tk.messagebox.showerror(title="Error", message=f"{cluster}: {error}")
+                continue
+            self.reference_indexes[cluster] = index
+        if not write_metrics(clusters):
+            tk.messagebox.showerror(
+                title="Error", message="Unable to write metrics file."
+            )
+        return len(self.reference_indexes) > 0
+
+    def read_axl(self, search_string):
+        """Find NumPlan entries referencing search_string using the reverse index of each cluster"""
+        self.list_box.delete(0, tk.END)
+        self.records_label_text.set("Dial Plan Records: ")
+        if not self.build_indexes():
+            return
+
+        # Update TKinter display objects with results, tagged by cluster if more than one
+        cntr = 0
+        for cluster, index in self.reference_indexes.items():
+            cluster_tag = f", {cluster}" if len(self.reference_indexes) > 1 else ""
+            for n_dnorpattern, n_description, n_tkpatternusage, columns in index.lookup(
+                search_string
+            ):
+                # Name the field(s) that matched, so there's no need to look up the entry in CUCM
+                forward_types = " & ".join(
+                    REFERENCE_COLUMNS[column] for column in columns
+                )
+                self.list_box.insert(
+                    tk.END,
+                    f'{n_dnorpattern} "{n_description}", '
+                    f"{self.pattern_usage.get(n_tkpatternusage, n_tkpatternusage)}, "
+                    f"{forward_types}{cluster_tag}",
+                )
+                cntr += 1
+        self.records_label_text.set(f"Dial Plan Records: {str(cntr)}")
+
+    def is_valid_search(self, search_string):
+        """Check search pattern only has valid characters, showing an error if not"""
+        if len(search_string) == 0:
+            tk.messagebox.showerror(title="Error", message="Search pattern is blank.")
+            return False
+        for range_char in search_string:
+            if range_char not in [
+                "0",
+                "1",
+                "2",
+                "3",
+                "4",
+                "5",
+                "6",
+                "7",
+                "8",
+                "9",
+                "*",
+                "#",
+                "X",
+                "%",
+            ]:
+                tk.messagebox.showerror(
+                    title="Error",
+                    message=f"Invalid characters in search pattern {search_string}.",
+                )
+                return False
+        return True
+
+    def find_references(self):
+        """Validate parameters then call AXL query"""
+        if not self.input_filename:
+            tk.messagebox.showerror(title="Error", message="No AXL file selected.")
+            return
+        # Check for invalid characters
+        search_string = self.search_pattern_text.get()
+        if not self.is_valid_search(search_string):
+            return
+
+        self.read_axl(search_string)
+
+    def batch_find_references(self):
+        """Resolve every number or pattern in the first column of a CSV file against one pull of the
+        reference columns & write a combined report of which forward type references which number
+        """
+        if not self.input_filename:
+            tk.messagebox.showerror(title="Error", message="No AXL file selected.")
+            return
+        csv_input_filename = tk.filedialog.askopenfilename(
+            initialdir="/", filetypes=(("CSV files", "*.csv"), ("All files", "*.*"))
+        )
+        if not csv_input_filename:
+            tk.messagebox.showerror(title="Error", message="No CSV file selected.")
+            return
+        # Parse input CSV file, ignoring blank rows & duplicates
+        try:
+            with open(csv_input_filename, encoding="utf-8-sig") as f:
+                reader = csv.reader(f)
+                search_list = list(
+                    OrderedDict.fromkeys(
+                        row[0].strip() for row in reader if row and row[0].strip()
+                    )
+                )
+        except FileNotFoundError:
+            tk.messagebox.showerror(title="Error", message="Unable to open CSV file.")
+            return
+        for search_string in search_list:
+            if not self.is_valid_search(search_string):
+                return
+        output_filename = tk.filedialog.asksaveasfilename(
+            initialdir="/",
+            defaultextension=".csv",
+            filetypes=(("CSV files", "*.csv"), ("All files", "*.*")),
+        )
+        if not output_filename:
+            tk.messagebox.showerror(title="Error", message="No output file selected.")
+            return
+
+        self.list_box.delete(0, tk.END)
+        self.records_label_text.set("Dial Plan Records: ")
+        if not self.build_indexes():
+            return
+        # Numbers would be reported as unreferenced, i.e. safe to reclaim, on a cluster that wasn't indexed
+        if self.failed_clusters:
+            tk.messagebox.showerror(
+                title="Error",
+                message=f"Report not written as {', '.join(self.failed_clusters)} not indexed.",
+            )
+            return
+
+        # Search patterns without references are listed with blank fields, e.g. DNs safe to reclaim
+        cntr = 0
+        result_list = [
+            [
+                "Search Pattern",
+                "DN or Pattern",
+                "Description",
+                "Pattern Usage",
+                "Forward Type",
+                "Cluster",
+            ]
+        ]
+        for search_string in search_list:
+            num_references = 0
+            for cluster, index in self.reference_indexes.items():
+                for (
+                    n_dnorpattern,
+                    n_description,
+                    n_tkpatternusage,
+                    columns,
+                ) in index.lookup(search_string):
+                    for column in columns:
+                        result_list.append(
+                            [
+                                search_string,
+                                n_dnorpattern,
+                                n_description,
+                                self.pattern_usage.get(
+                                    n_tkpatternusage, n_tkpatternusage
+                                ),
+                                REFERENCE_COLUMNS[column],
+                                cluster,
+                            ]
+                        )
+                    num_references += 1
+            if num_references == 0:
+                result_list.append([search_string, "", "", "", "", ""])
+            self.list_box.insert(tk.END, f"{search_string}: {num_references}")
+            cntr += num_references
+        self.records_label_text.set(f"Dial Plan Records: {str(cntr)}")
+
+        try:
+            with open(
+                output_filename, "w", newline="", encoding="utf-8-sig"
+            ) as csv_file:
+                writer = csv.writer(csv_file)
+                writer.writerows(result_list)
+        except OSError:
+            tk.messagebox.showerror(title="Error", message="Unable to write CSV file.")
+
+    def refresh_index(self):
+        """Discard reverse indexes so they're rebuilt from AXL on the next search"""
+        self.reference_indexes.clear()
+        self.failed_clusters = []
+
+    def open_json_file_dialog(self):
+        """Dialogue to prompt for JSON file to open and AXL password"""
+        self.reference_indexes.clear()
+        self.failed_clusters = []
+        self.input_filename = tk.filedialog.askopenfilename(
+            initialdir="/", filetypes=(("JSON files", "*.json"), ("All files", "*.*"))
+        )
+        self.axl_password = tk.simpledialog.askstring(
+            "Input", "AXL Password?", show="*"
+        )
+
+
+if __name__ == "__main__":
+    # Initialise TKinter GUI objects
+    root = tk.Tk()
+    root.title("Number Reference Finder v1.8")
+    GUIFrame(root)
+    root.mainloop()